@@ -5,7 +5,14 @@ Hubix Bot HTTP API — Admin panel backend
 from aiohttp import web
 import os
 import secrets
+import math
 import string
+import time
+
+from utils import metrics
+from utils.queryprofile import PROFILER as QUERY_PROFILER, SNAPSHOT_SORTS
+from utils.memberstats import MEMBER_STATS
+from utils.msgcache import MESSAGE_CACHE
 
 API_KEY = os.getenv("API_KEY", "hubix-change-this-key")
 API_PORT = int(os.getenv("PORT", os.getenv("API_PORT", "8080")))
@@ -22,6 +29,20 @@ class BotAPI:
         self.bot = bot
         self.app = web.Application(middlewares=[self.auth_middleware])
         self._setup_routes()
+        self.started_at = time.time()
+        metrics.REGISTRY.gauge("hubix_guilds", "Guilds the bot is in.", lambda: len(self.bot.guilds))
+        metrics.REGISTRY.gauge(
+            "hubix_gateway_latency_seconds", "Gateway heartbeat latency.",
+            lambda: 0 if math.isnan(self.bot.latency) else self.bot.latency
+        )
+        metrics.REGISTRY.gauge("hubix_loop_lag_seconds", "Most recent event-loop scheduling delay.",
+                               lambda: self.bot.loop_lag.samples[-1] if self.bot.loop_lag.samples else 0)
+        metrics.REGISTRY.gauge("hubix_message_cache_entries", "Messages held for edit / delete logging.",
+                               lambda: len(MESSAGE_CACHE))
+        metrics.REGISTRY.gauge("hubix_member_stats_guilds", "Guilds with seeded member counters.",
+                               lambda: len(MEMBER_STATS))
+        metrics.REGISTRY.gauge("hubix_uptime_seconds", "Seconds since the API started.",
+                               lambda: round(time.time() - self.started_at, 1))
 
     @web.middleware
     async def auth_middleware(self, request, handler):
@@ -37,6 +58,9 @@ class BotAPI:
     def _setup_routes(self):
         r = self.app.router
         r.add_get('/api/health', self.health)
+        r.add_get('/api/metrics', self.metrics)
+        r.add_get('/api/debug/queries', self.debug_queries)
+        r.add_get('/api/debug/loop', self.debug_loop)
         r.add_get('/api/stats', self.get_stats)
         r.add_get('/api/guilds', self.get_guilds)
         r.add_get('/api/subscriptions', self.get_subscriptions)
@@ -63,8 +87,35 @@ class BotAPI:
             'bot': self.bot.user.name if self.bot.user else 'unknown',
             'guilds': len(self.bot.guilds),
             'latency': round(self.bot.latency * 1000),
+            'loop_lag': self.bot.loop_lag.summary(),
         })
 
+    # ── Metrics ───────────────────────────────────
+
+    async def metrics(self, request):
+        return web.Response(
+            body=metrics.REGISTRY.render().encode(),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+        )
+
+    # ── Debug ─────────────────────────────────────
+
+    async def debug_queries(self, request):
+        sort = request.query.get('sort', 'total')
+        if sort not in SNAPSHOT_SORTS:
+            return web.json_response({'error': f"sort must be one of: {', '.join(SNAPSHOT_SORTS)}"}, status=400)
+        if request.query.get('reset') == '1':
+            QUERY_PROFILER.reset()
+        try:
+            limit = max(1, int(request.query.get('limit', 50)))
+        except ValueError:
+            limit = 50
+        return web.json_response(QUERY_PROFILER.snapshot(sort, limit))
+
+    async def debug_loop(self, request):
+        monitor = self.bot.loop_lag
+        return web.json_response({**monitor.summary(), 'debug': monitor.debug, 'recent': list(monitor.stalls)})
+
     # ── Stats ─────────────────────────────────────
 
     async def get_stats(self, request):
@@ -77,6 +128,7 @@ class BotAPI:
         return web.json_response({
             'servers': len(self.bot.guilds),
             'users': total_users,
+            'members': MEMBER_STATS.stats(),
             'latency': round(self.bot.latency * 1000),
             'subscriptions': sub_stats,
             'keys': key_stats,
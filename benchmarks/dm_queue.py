@@ -0,0 +1,119 @@
+"""
+Replay AutoMod violations through the real take_action and count warning DMs.
+
+    python -m benchmarks.dm_queue
+    python -m benchmarks.dm_queue --spammers 50 --violations 30 --closed-share 0.3
+    python -m benchmarks.dm_queue --direct     # one DM per violation (the old path)
+
+A few spammers trip the filter --violations times each over --duration
+seconds while --casual members trip it once; --closed-share of all of them
+have DMs closed. Each DM goes through the fake guild's REST model (latency,
+5 per 5 s per DM channel like Discord's). Reports DM REST calls, how many
+delivered or hit a closed inbox, 429-style waits, and the time until the
+last DM settled, against a temporary database.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.fakes import FakeBot, FakeGuild, FakeMessage, use_temp_db
+import utils.database as database
+import utils.dmqueue as dmqueue
+
+SETTINGS = {"enabled": 1, "max_warns": 5, "warn_action": "mute", "warn_expire_days": 30}
+
+
+class DirectDMs:
+    """The pre-queue behaviour: every violation DMs straight away, no memory of closed inboxes."""
+
+    def __init__(self, render):
+        self.render = render
+        self.tasks = []
+
+    def add(self, user, item, key=None):
+        async def send():
+            try:
+                await user.send(**self.render([item]))
+            except Exception:
+                pass
+        self.tasks.append(asyncio.create_task(send()))
+
+    def discard(self, user_id, key=None):
+        pass
+
+    async def drain(self):
+        await asyncio.gather(*self.tasks)
+
+
+async def replay(spammers, violations, casual, duration, closed_share, rest_latency, window, direct, seed):
+    use_temp_db()
+    await database.init_db()
+    dmqueue._closed.clear()
+
+    from cogs.automod import AutoMod
+
+    guild = FakeGuild("spam-target", rest_latency=rest_latency, rate_limits={"dms": (5, 5.0)})
+    channel = guild.add_channel("general")
+    bot = FakeBot([guild])
+    cog = AutoMod(bot)
+    cog.warn_dms = DirectDMs(cog.render_warning_dm) if direct else dmqueue.DMQueue(cog.render_warning_dm, window)
+
+    rnd = random.Random(seed)
+    offenders = [(guild.add_member(f"spammer{i}"), violations) for i in range(spammers)]
+    offenders += [(guild.add_member(f"casual{i}"), 1) for i in range(casual)]
+    closed = 0
+    for member, _ in offenders:
+        member.dms_closed = rnd.random() < closed_share
+        closed += member.dms_closed
+
+    schedule = sorted((rnd.uniform(0, duration), member) for member, n in offenders for _ in range(n))
+    started = time.perf_counter()
+    for at, member in schedule:
+        delay = at - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        message = FakeMessage(channel, member, "buy cheap nitro discord.gg/spam")
+        await cog.take_action(message, "Discord Invite Link", SETTINGS, severity="medium", delete_msg=False)
+    if not direct:
+        await asyncio.sleep(window)   # let the last windows close on their own
+    await cog.warn_dms.drain()
+    elapsed = time.perf_counter() - started
+
+    delivered = sum(len(m.dms) for m, _ in offenders)
+    return {
+        "violations": len(schedule), "offenders": len(offenders), "closed_users": closed,
+        "dm_calls": guild.stats["dms"], "delivered": delivered,
+        "closed_attempts": guild.stats["dms"] - delivered,
+        "rate_limited": guild.stats["rate_limited"], "seconds": elapsed,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--spammers", type=int, default=20)
+    ap.add_argument("--violations", type=int, default=30, help="violations per spammer")
+    ap.add_argument("--casual", type=int, default=100, help="members with a single violation")
+    ap.add_argument("--duration", type=float, default=4.0)
+    ap.add_argument("--closed-share", type=float, default=0.3)
+    ap.add_argument("--rest-latency", type=float, default=0.05)
+    ap.add_argument("--window", type=float, default=dmqueue.DM_COALESCE_WINDOW)
+    ap.add_argument("--direct", action="store_true", help="send every DM immediately (old path)")
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    r = asyncio.run(replay(a.spammers, a.violations, a.casual, a.duration, a.closed_share,
+                           a.rest_latency, a.window, a.direct, a.seed))
+    mode = "direct" if a.direct else f"queued ({a.window:g}s window, {dmqueue.DM_CONCURRENCY} in flight)"
+    print(f"\n  {r['violations']} violations from {r['offenders']} members "
+          f"({r['closed_users']} with DMs closed) — {mode}\n")
+    print(f"  DM REST calls       {r['dm_calls']:>7}")
+    print(f"  delivered           {r['delivered']:>7}")
+    print(f"  closed-DM attempts  {r['closed_attempts']:>7}")
+    print(f"  rate-limit waits    {r['rate_limited']:>7}")
+    print(f"  settled after       {r['seconds']:>7.2f} s")
+
+
+if __name__ == "__main__":
+    main()
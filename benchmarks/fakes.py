@@ -0,0 +1,434 @@
+"""
+Lightweight stand-ins for the discord.py objects the cogs touch, so hot paths
+can be driven offline against a throwaway nexify.db.
+"""
+
+import asyncio
+import itertools
+import os
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+import utils.database as database
+
+_ids = itertools.count(10_000_000)
+
+
+def next_id():
+    return next(_ids)
+
+
+def use_temp_db(path=None):
+    """Point utils.database at a fresh file so benchmarks never touch nexify.db."""
+    path = path or os.path.join(tempfile.mkdtemp(prefix="hubix-bench-"), "nexify.db")
+    database.DB_PATH = path
+    return path
+
+
+class FakeAsset:
+    def __init__(self, url="https://cdn.discordapp.com/embed/avatars/0.png"):
+        self.url = url
+
+
+class FakeRole:
+    def __init__(self, guild, name="role", position=1, role_id=None, color=0, hoist=False, mentionable=False):
+        self.id = role_id or next_id()
+        self.guild = guild
+        self.name = name
+        self.position = position
+        self.mention = f"<@&{self.id}>"
+        self.color = discord.Colour(color)
+        self.hoist = hoist
+        self.mentionable = mentionable
+
+    async def edit(self, name=None, color=None, hoist=None, mentionable=None, reason=None):
+        await self.guild._rest("roles")
+        self.name = name if name is not None else self.name
+        self.color = color if color is not None else self.color
+        self.hoist = hoist if hoist is not None else self.hoist
+        self.mentionable = mentionable if mentionable is not None else self.mentionable
+
+    def __lt__(self, other):
+        return self.position < other.position
+
+    def __eq__(self, other):
+        return isinstance(other, FakeRole) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeUser:
+    def __init__(self, name="user", user_id=None, bot=False, age_days=365):
+        self.id = user_id or next_id()
+        self.name = name
+        self.bot = bot
+        self.mention = f"<@{self.id}>"
+        self.display_name = name
+        self.display_avatar = FakeAsset()
+        self.created_at = datetime.now(timezone.utc) - timedelta(days=age_days)
+        self.dms = []
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, content=None, **kwargs):
+        self.dms.append((content, kwargs))
+
+
+class FakeMember(FakeUser):
+    def __init__(self, guild, name="member", **kwargs):
+        super().__init__(name, **kwargs)
+        self.guild = guild
+        self.roles = [guild.default_role] if guild.default_role else []
+        self.joined_at = datetime.now(timezone.utc)
+        self.nick = None
+        self.status = "online"
+        self.add_roles_calls = 0
+        self.guild_permissions = FakePermissions()
+        self.dms_closed = False
+
+    async def send(self, content=None, **kwargs):
+        self.guild.stats["dms"] += 1
+        await self.guild._rest(f"dms:{self.id}")
+        if self.dms_closed:
+            raise discord.Forbidden(FakeHTTPResponse(403, "Forbidden"),
+                                    {"code": 50007, "message": "Cannot send messages to this user"})
+        self.dms.append((content, kwargs))
+
+    async def add_roles(self, *roles, reason=None):
+        self.add_roles_calls += 1
+        self.guild.stats["add_roles"] += 1
+        await self.guild._rest(f"members:{self.id}")
+        self.roles.extend(roles)
+
+    async def timeout(self, *args, **kwargs):
+        self.guild.stats["timeouts"] += 1
+
+
+class FakeHTTPResponse:
+    """Enough of an aiohttp response for discord.HTTPException."""
+
+    def __init__(self, status, reason):
+        self.status = status
+        self.reason = reason
+
+
+class FakePermissions:
+    administrator = False
+    manage_guild = False
+    manage_messages = False
+
+
+class FakeChannel:
+    def __init__(self, guild, name="general", channel_id=None, kind="text", category=None, overwrites=None):
+        self.id = channel_id or next_id()
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.type = kind
+        self.category_id = category.id if category else None
+        self.overwrites = dict(overwrites or {})
+        self.position = 0
+        self.sent = []
+        self.deleted = []
+
+    @property
+    def category(self):
+        return self.guild.get_channel(self.category_id)
+
+    async def send(self, content=None, **kwargs):
+        self.guild.stats["messages_sent"] += 1
+        await self.guild._rest(f"messages:{self.id}")
+        msg = FakeMessage(self, self.guild.me, content or "")
+        msg.embeds = [kwargs["embed"]] if kwargs.get("embed") else []
+        self.sent.append(msg)
+        return msg
+
+    def get_partial_message(self, message_id):
+        msg = next((m for m in self.sent if m.id == message_id), None)
+        if msg is None:
+            msg = FakeMessage(self, self.guild.me)
+            msg.id = message_id
+        return msg
+
+    async def delete_messages(self, messages, **kwargs):
+        messages = list(messages)
+        if len(messages) == 1:
+            # discord.py sends a single id down the plain delete route
+            return await self.get_partial_message(messages[0].id).delete()
+        self.guild.stats["bulk_deletes"] += 1
+        await self.guild._rest(f"messages:{self.id}")
+        self.deleted.extend(m.id for m in messages)
+
+    async def edit(self, name=None, category=None, overwrites=None, reason=None, **kwargs):
+        self.guild.stats["channel_edits"] += 1
+        await self.guild._rest(f"channel:{self.id}")
+        if name is not None:
+            self.name = name
+        if category is not None:
+            self.category_id = category.id
+        if overwrites is not None:
+            self.overwrites = dict(overwrites)
+
+    async def delete(self, reason=None):
+        self.guild.stats["channel_deletes"] += 1
+        await self.guild._rest(f"channel:{self.id}")
+        self.guild.channels.remove(self)
+
+    async def create_text_channel(self, name, **kwargs):
+        return await self.guild._create_channel(name, "text", category=self, **kwargs)
+
+    async def create_voice_channel(self, name, **kwargs):
+        return await self.guild._create_channel(name, "voice", category=self, **kwargs)
+
+
+class FakeAttachment:
+    def __init__(self, filename="image.png"):
+        self.id = next_id()
+        self.filename = filename
+        self.url = f"https://cdn.discordapp.com/attachments/{self.id}/{filename}"
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content="", attachments=None):
+        # A real snowflake for "now", so age checks (the 14-day bulk-delete limit) work
+        self.id = discord.utils.time_snowflake(datetime.now(timezone.utc)) + next_id() % (1 << 22)
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.attachments = attachments or []
+        self.mentions = []
+        self.role_mentions = []
+        self.mention_everyone = False
+        self.webhook_id = None
+        self.embeds = []
+        self.created_at = datetime.now(timezone.utc)
+        self.jump_url = f"https://discord.com/channels/{self.guild.id}/{channel.id}/{self.id}"
+
+    def edited(self, content):
+        """Copy of this message with new content, as on_message_edit's `after`."""
+        after = FakeMessage(self.channel, self.author, content, self.attachments)
+        after.id = self.id
+        after.jump_url = self.jump_url
+        return after
+
+    async def edit(self, content=None, **kwargs):
+        self.guild.stats["message_edits"] += 1
+        await self.guild._rest(f"messages:{self.channel.id}")
+        if kwargs.get("embed"):
+            self.embeds = [kwargs["embed"]]
+
+    async def delete(self):
+        self.guild.stats["deletes"] += 1
+        await self.guild._rest(f"messages:{self.channel.id}")
+        self.channel.deleted.append(self.id)
+
+
+class FakeRawMessageDelete:
+    def __init__(self, message, cached_message=None):
+        self.message_id = message.id
+        self.channel_id = message.channel.id
+        self.guild_id = message.guild.id
+        self.cached_message = cached_message
+
+
+class FakeRawMessageUpdate:
+    def __init__(self, after, cached_message=None):
+        self.message_id = after.id
+        self.channel_id = after.channel.id
+        self.guild_id = after.guild.id
+        self.data = {"id": str(after.id), "content": after.content,
+                     "edited_timestamp": datetime.now(timezone.utc).isoformat()}
+        self.message = after
+        self.cached_message = cached_message
+
+
+class FakeRawMemberRemove:
+    def __init__(self, user, guild_id):
+        self.user = user
+        self.guild_id = guild_id
+
+
+class FakeInvite:
+    def __init__(self, guild, code, inviter, uses=0):
+        self.guild = guild
+        self.code = code
+        self.inviter = inviter
+        self.uses = uses
+
+
+class FakeGuild:
+    """`rate_limits` maps a route prefix to (requests, per_seconds). A call past
+    the limit costs a round trip plus the wait, like discord.py retrying a 429;
+    "messages"/"channel"/"members" routes are tracked per object."""
+
+    def __init__(self, name="guild", guild_id=None, rest_latency=0.0, rate_limits=None):
+        self.id = guild_id or next_id()
+        self.name = name
+        self.icon = None
+        self.rest_latency = rest_latency
+        self.rate_limits = rate_limits or {}
+        self._route_hits = {}
+        self.stats = {k: 0 for k in ("invites_calls", "messages_sent", "add_roles",
+                                     "deletes", "bulk_deletes", "timeouts", "rest_calls",
+                                     "rate_limited", "roles_created", "channels_created",
+                                     "channel_edits", "channel_deletes", "message_edits", "dms")}
+        self.default_role = FakeRole(self, "@everyone", position=0, role_id=self.id)
+        self.roles = [self.default_role]
+        self.channels = []
+        self.members = []
+        self.invite_list = []
+        self.me = FakeMember(self, "Hubix", bot=True)
+        self.me.top_role = self.add_role("Hubix", position=100)
+        self.member_count = 0
+
+    async def _rest(self, route):
+        self.stats["rest_calls"] += 1
+        limit = self.rate_limits.get(route.split(":")[0])
+        if limit:
+            count, per = limit
+            hits = self._route_hits.setdefault(route, deque())
+            while True:
+                now = time.monotonic()
+                while hits and now - hits[0] >= per:
+                    hits.popleft()
+                if len(hits) < count:
+                    break
+                self.stats["rate_limited"] += 1
+                await asyncio.sleep(self.rest_latency)  # the 429 round trip
+                await asyncio.sleep(per - (now - hits[0]))
+            hits.append(time.monotonic())
+        await asyncio.sleep(self.rest_latency)
+
+    @property
+    def text_channels(self):
+        return [c for c in self.channels if c.type == "text"]
+
+    @property
+    def voice_channels(self):
+        return [c for c in self.channels if c.type == "voice"]
+
+    @property
+    def categories(self):
+        return [c for c in self.channels if c.type == "category"]
+
+    def add_role(self, name, position=1, **kwargs):
+        role = FakeRole(self, name, position, **kwargs)
+        self.roles.append(role)
+        return role
+
+    def add_channel(self, name="general", kind="text", category=None):
+        ch = FakeChannel(self, name, kind=kind, category=category)
+        self.channels.append(ch)
+        return ch
+
+    async def _create_channel(self, name, kind, category=None, overwrites=None, position=None, reason=None):
+        self.stats["channels_created"] += 1
+        await self._rest("channels")
+        ch = FakeChannel(self, name, kind=kind, category=category, overwrites=overwrites)
+        ch.position = position or 0
+        self.channels.append(ch)
+        return ch
+
+    async def create_category(self, name, **kwargs):
+        return await self._create_channel(name, "category", **kwargs)
+
+    async def create_role(self, name="new role", color=None, hoist=False, mentionable=False, reason=None):
+        self.stats["roles_created"] += 1
+        await self._rest("roles")
+        role = FakeRole(self, name, position=1, color=color.value if color else 0,
+                        hoist=hoist, mentionable=mentionable)
+        for r in self.roles:
+            if r.position >= 1 and r is not self.default_role:
+                r.position += 1
+        self.roles.append(role)
+        return role
+
+    async def edit_role_positions(self, positions, reason=None):
+        await self._rest("roles")
+        for role, pos in positions.items():
+            role.position = pos
+
+    async def edit(self, name=None, reason=None, **kwargs):
+        await self._rest("guild")
+        if name is not None:
+            self.name = name
+
+    def add_member(self, name="member", **kwargs):
+        m = FakeMember(self, name, **kwargs)
+        self.members.append(m)
+        self.member_count += 1
+        return m
+
+    def remove_member(self, member):
+        self.members.remove(member)
+        self.member_count -= 1
+
+    def add_invite(self, code, inviter, uses=0):
+        inv = FakeInvite(self, code, inviter, uses)
+        self.invite_list.append(inv)
+        return inv
+
+    def get_channel(self, cid):
+        return next((c for c in self.channels if c.id == cid), None)
+
+    def get_role(self, rid):
+        return next((r for r in self.roles if r.id == rid), None)
+
+    def get_member(self, uid):
+        return next((m for m in self.members if m.id == uid), None)
+
+    async def invites(self):
+        self.stats["invites_calls"] += 1
+        await self._rest("invites")
+        return [FakeInvite(self, i.code, i.inviter, i.uses) for i in self.invite_list]
+
+
+class FakeResponse:
+    def __init__(self):
+        self.sent = []
+
+    def is_done(self):
+        return bool(self.sent)
+
+    async def send_message(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+    async def defer(self, **kwargs):
+        self.sent.append((None, kwargs))
+
+    async def edit_message(self, **kwargs):
+        self.sent.append((None, kwargs))
+
+
+class FakeInteraction:
+    def __init__(self, guild, user, data=None):
+        self.id = next_id()
+        self.guild = guild
+        self.user = user
+        self.channel = None
+        self.data = data or {}
+        self.response = FakeResponse()
+
+
+class FakeBot:
+    def __init__(self, guilds=()):
+        self.guilds = list(guilds)
+        self.user = FakeUser("Hubix", bot=True)
+        self.latency = 0.05
+
+    @property
+    def loop(self):
+        return asyncio.get_running_loop()
+
+    def get_guild(self, gid):
+        return next((g for g in self.guilds if g.id == gid), None)
+
+    async def wait_until_ready(self):
+        return None
@@ -0,0 +1,286 @@
+"""
+Generate a nexify.db shaped like a large fleet, for scale-testing utils/database.py.
+
+    python -m benchmarks.fleetgen --tier large --out /tmp/fleet-large.db
+    python -m benchmarks.fleetgen --tier medium --scale 2.5 --out /tmp/fleet.db
+
+Guild sizes follow a Pareto distribution (a few huge servers, a long tail of
+small ones) and every table's rows are shared out by guild size. Inside a
+guild, inviters, warned users, ticket openers and customers are drawn from a
+heavy-tailed distribution too, so each guild has a handful of hot users.
+The schema comes from init_db(); invite_counters (and stat_counters when
+STAT_COUNTERS=1) are derived from the generated rows the same way a
+migrated production database gets them.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+import utils.database as database
+
+# Row targets per tier; everything else scales off these
+TIERS = {
+    "small": {"guilds": 200, "invite_tracks": 20_000, "ticket_messages": 20_000,
+              "automod_actions": 20_000, "orders": 2_000, "license_keys": 1_000},
+    "medium": {"guilds": 2_000, "invite_tracks": 200_000, "ticket_messages": 200_000,
+               "automod_actions": 200_000, "orders": 10_000, "license_keys": 10_000},
+    "large": {"guilds": 5_000, "invite_tracks": 1_000_000, "ticket_messages": 1_000_000,
+              "automod_actions": 1_000_000, "orders": 50_000, "license_keys": 30_000},
+    "xl": {"guilds": 10_000, "invite_tracks": 3_000_000, "ticket_messages": 3_000_000,
+           "automod_actions": 3_000_000, "orders": 100_000, "license_keys": 50_000},
+}
+
+GUILD_BASE = 900_000_000_000_000_000
+USER_BASE = 700_000_000_000_000_000
+OBJECT_BASE = 800_000_000_000_000_000  # channel / message ids
+PLAN_MIX = (("free", 0.70), ("basic", 0.15), ("premium", 0.10), ("business", 0.05))
+ORDER_STATUS = (("delivered", 0.70), ("pending", 0.15), ("cancelled", 0.10), ("processing", 0.05))
+ACTIONS = (("delete", 0.6), ("warn", 0.3), ("timeout", 0.08), ("kick", 0.02))
+REASONS = ("Spam Detected (Message Flood)", "Discord Invite Link", "Excessive Caps (85%)",
+           "Blocked Word Detected", "Mention Spam (8/5)", "Emoji Spam (14/10)")
+CHAT = ("hi, my order hasn't arrived", "can you check this please", "thanks!", "any update?",
+        "here is the screenshot", "I paid with paypal", "still waiting on delivery", "resolved, thank you")
+
+BATCH = 50_000
+
+
+def user_id(guild_index, n):
+    return USER_BASE + guild_index * 10_000_000 + n
+
+
+def hot(rnd, population, alpha=1.1):
+    """Index into `population` users, heavily skewed toward the first few."""
+    return min(population - 1, int(rnd.paretovariate(alpha)) - 1)
+
+
+def stamp(rnd, now, days=365):
+    return (now - timedelta(seconds=rnd.randrange(days * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def share(total, weights, total_weight):
+    return [int(total * w / total_weight + 0.5) for w in weights]
+
+
+def pick(rnd, options):
+    names, weights = zip(*options)
+    return rnd.choices(names, weights)[0]
+
+
+def insert(db, table, columns, rows):
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    buf = []
+    count = 0
+    for row in rows:
+        buf.append(row)
+        if len(buf) >= BATCH:
+            db.executemany(sql, buf)
+            count += len(buf)
+            buf.clear()
+    if buf:
+        db.executemany(sql, buf)
+        count += len(buf)
+    return count
+
+
+def populate(db, spec, seed):
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    guilds = spec["guilds"]
+    weights = [rnd.paretovariate(1.16) for _ in range(guilds)]
+    weights.sort(reverse=True)
+    total_weight = sum(weights)
+    members = [max(20, int(w * 400)) for w in weights]
+    gid = [GUILD_BASE + g for g in range(guilds)]
+    counts = {}
+
+    def per_guild(key):
+        return share(spec[key], weights, total_weight)
+
+    counts["subscriptions"] = insert(db, "subscriptions", ("guild_id", "plan", "expires_at", "total_paid", "payment_count"), (
+        (gid[g], plan, None if plan == "free" else stamp(rnd, now + timedelta(days=60), 90),
+         0.0 if plan == "free" else rnd.choice((5.0, 10.0, 25.0)) * rnd.randint(1, 12), rnd.randint(0, 12))
+        for g in range(guilds) for plan in [pick(rnd, PLAN_MIX)]
+    ))
+    counts["subscription_logs"] = insert(db, "subscription_logs", ("guild_id", "action", "new_plan", "performed_by", "created_at"), (
+        (gid[g], "activate", pick(rnd, PLAN_MIX), USER_BASE, stamp(rnd, now))
+        for g in range(guilds) for _ in range(rnd.randint(1, 4))
+    ))
+    insert(db, "invite_settings", ("guild_id", "log_channel_id", "enabled"),
+           ((gid[g], gid[g] + 1, 1) for g in range(guilds)))
+    insert(db, "automod_settings", ("guild_id", "enabled"), ((gid[g], 1) for g in range(guilds)))
+
+    # ─── Invites ─────────────────────────────────────────
+    leaves = []
+
+    def tracks():
+        for g, n in enumerate(per_guild("invite_tracks")):
+            inviters = max(5, members[g] // 50)
+            for k in range(n):
+                inviter = user_id(g, hot(rnd, inviters))
+                invited = user_id(g, inviters + k)
+                if rnd.random() < 0.15:
+                    leaves.append((gid[g], inviter, invited, stamp(rnd, now, 180)))
+                yield gid[g], inviter, invited, f"c{g}x{inviter % 97}", stamp(rnd, now)
+
+    counts["invite_tracks"] = insert(db, "invite_tracks", ("guild_id", "inviter_id", "invited_id", "invite_code", "joined_at"), tracks())
+    counts["invite_leaves"] = insert(db, "invite_leaves", ("guild_id", "inviter_id", "left_id", "left_at"), leaves)
+
+    # ─── AutoMod ─────────────────────────────────────────
+    def actions():
+        for g, n in enumerate(per_guild("automod_actions")):
+            for _ in range(n):
+                yield (gid[g], user_id(g, hot(rnd, members[g], 0.9)), pick(rnd, ACTIONS),
+                       rnd.choice(REASONS), "#general", stamp(rnd, now))
+
+    def warns():
+        for g, n in enumerate(per_guild("automod_actions")):
+            for _ in range(n // 4):
+                created = now - timedelta(seconds=rnd.randrange(60 * 86400))
+                yield (gid[g], user_id(g, hot(rnd, members[g], 0.9)), USER_BASE, rnd.choice(REASONS),
+                       created.strftime("%Y-%m-%d %H:%M:%S"), (created + timedelta(days=30)).isoformat(),
+                       int(rnd.random() < 0.8))
+
+    counts["automod_actions"] = insert(db, "automod_actions", ("guild_id", "user_id", "action_type", "reason", "details", "created_at"), actions())
+    counts["automod_warns"] = insert(db, "automod_warns", ("guild_id", "user_id", "moderator_id", "reason", "created_at", "expires_at", "active"), warns())
+
+    # ─── Tickets ─────────────────────────────────────────
+    ticket_rows, message_rows = [], []
+    ticket_id = 0
+    for g, n in enumerate(per_guild("ticket_messages")):
+        remaining = n
+        number = 0
+        while remaining > 0:
+            ticket_id += 1
+            number += 1
+            opener = user_id(g, hot(rnd, members[g]))
+            size = min(remaining, max(1, int(rnd.expovariate(1 / 20))))
+            remaining -= size
+            status = "open" if rnd.random() < 0.1 else "closed"
+            opened = stamp(rnd, now)
+            ticket_rows.append((ticket_id, gid[g], OBJECT_BASE + ticket_id, opener, "Support", number, status, opened,
+                                None if status == "open" else opened))
+            for _ in range(size):
+                author = opener if rnd.random() < 0.6 else USER_BASE + g
+                message_rows.append((ticket_id, author, f"user{author % 100000}", rnd.choice(CHAT), opened))
+    counts["tickets"] = insert(db, "tickets", ("id", "guild_id", "channel_id", "user_id", "category_name", "ticket_number",
+                                               "status", "created_at", "closed_at"), ticket_rows)
+    counts["ticket_messages"] = insert(db, "ticket_messages", ("ticket_id", "user_id", "username", "content", "created_at"), message_rows)
+
+    # ─── Shop (the biggest 30% of guilds run one) ────────
+    shops = range(max(1, guilds * 3 // 10))
+    shop_weights = weights[:len(shops)]
+    insert(db, "shop_settings", ("guild_id", "enabled"), ((gid[g], 1) for g in shops))
+    products = {}
+    product_rows = []
+    for g in shops:
+        for p in range(rnd.randint(3, 30)):
+            products.setdefault(g, []).append((len(product_rows) + 1, f"Product {p}", float(rnd.choice((2, 5, 10, 20, 50)))))
+            product_rows.append((len(product_rows) + 1, gid[g], f"Product {p}", "", products[g][-1][2], rnd.choice(("Accounts", "Boosts", "Services"))))
+    counts["products"] = insert(db, "products", ("id", "guild_id", "name", "description", "price", "category"), product_rows)
+
+    order_rows, review_rows, profiles = [], [], {}
+    for g, n in zip(shops, share(spec["orders"], shop_weights, sum(shop_weights))):
+        customers = max(5, members[g] // 20)
+        for number in range(1, n + 1):
+            pid, name, price = rnd.choice(products[g])
+            customer = user_id(g, hot(rnd, customers))
+            status = pick(rnd, ORDER_STATUS)
+            created = stamp(rnd, now)
+            order_rows.append((len(order_rows) + 1, gid[g], number, customer, pid, name, price, status, created, created,
+                               created if status == "delivered" else None))
+            prof = profiles.setdefault((gid[g], customer), [0, 0.0, 0, created, created])
+            prof[0] += 1
+            if status == "delivered":
+                prof[1] += price
+                prof[2] += 1
+                if rnd.random() < 0.4:
+                    review_rows.append((gid[g], len(order_rows), customer, rnd.choices((5, 4, 3, 2, 1), (60, 20, 10, 5, 5))[0],
+                                        "great service" if rnd.random() < 0.5 else "", created))
+            prof[3], prof[4] = min(prof[3], created), max(prof[4], created)
+    counts["orders"] = insert(db, "orders", ("id", "guild_id", "order_number", "user_id", "product_id", "product_name", "price",
+                                             "status", "created_at", "updated_at", "completed_at"), order_rows)
+    counts["order_reviews"] = insert(db, "order_reviews", ("guild_id", "order_id", "user_id", "rating", "comment", "created_at"), review_rows)
+    counts["customer_profiles"] = insert(db, "customer_profiles", ("guild_id", "user_id", "total_orders", "total_spent",
+                                                                   "completed_orders", "first_order_at", "last_order_at"),
+                                         ((g, u, *p) for (g, u), p in profiles.items()))
+
+    # ─── License keys ────────────────────────────────────
+    def keys():
+        for n in range(spec["license_keys"]):
+            redeemed = rnd.random() < 0.6
+            g = rnd.randrange(guilds)
+            yield (f"HUBIX-{n:04X}-{rnd.getrandbits(32):08X}", pick(rnd, PLAN_MIX[1:]), rnd.choice((7, 30, 90, 365)),
+                   USER_BASE, stamp(rnd, now), int(redeemed), user_id(g, 0) if redeemed else None,
+                   gid[g] if redeemed else None, stamp(rnd, now) if redeemed else None)
+
+    counts["license_keys"] = insert(db, "license_keys", ("key", "plan", "duration_days", "created_by", "created_at", "redeemed",
+                                                         "redeemed_by", "redeemed_guild_id", "redeemed_at"), keys())
+
+    # ─── Giveaways ───────────────────────────────────────
+    giveaway_rows, entry_rows = [], []
+    for g in range(guilds):
+        for _ in range(rnd.randint(0, 3) if g < guilds // 2 else 0):
+            active = rnd.random() < 0.2
+            end = now + timedelta(hours=rnd.randint(1, 72)) if active else now - timedelta(days=rnd.randint(1, 300))
+            giveaway_rows.append((len(giveaway_rows) + 1, gid[g], gid[g] + 2, OBJECT_BASE - len(giveaway_rows) - 1, user_id(g, 0),
+                                  "Nitro", end.isoformat(), int(not active)))
+            for u in rnd.sample(range(members[g]), min(members[g], int(rnd.expovariate(1 / 150)) + 1)):
+                entry_rows.append((len(giveaway_rows), user_id(g, u)))
+    counts["giveaways"] = insert(db, "giveaways", ("id", "guild_id", "channel_id", "message_id", "host_id", "prize", "end_time", "ended"), giveaway_rows)
+    counts["giveaway_entries"] = insert(db, "giveaway_entries", ("giveaway_id", "user_id"), entry_rows)
+    return counts
+
+
+async def _finish(path):
+    database.DB_PATH = path
+    async with database._connect() as db:
+        await database.backfill_invite_counters(db)
+        await database.backfill_review_aggregates(db)
+        await db.commit()
+    if database.STAT_COUNTERS:
+        await database.init_db()
+
+
+def generate(path, tier="small", scale=1.0, seed=1):
+    """Build a fleet database at `path` (overwritten) and return {table: rows}."""
+    spec = {k: max(1, int(v * scale)) for k, v in TIERS[tier].items()}
+    if os.path.exists(path):
+        os.remove(path)
+    previous = database.DB_PATH
+    database.DB_PATH = path
+    try:
+        asyncio.run(database.init_db())
+        db = sqlite3.connect(path)
+        db.execute("PRAGMA journal_mode=OFF")
+        db.execute("PRAGMA synchronous=OFF")
+        with db:
+            counts = populate(db, spec, seed)
+        db.close()
+        asyncio.run(_finish(path))
+        counts["invite_counters"] = sqlite3.connect(path).execute("SELECT COUNT(*) FROM invite_counters").fetchone()[0]
+    finally:
+        database.DB_PATH = previous
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tier", choices=TIERS, default="small")
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply every row target of the tier")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", required=True, help="database file to (over)write")
+    a = ap.parse_args()
+    started = time.perf_counter()
+    counts = generate(a.out, a.tier, a.scale, a.seed)
+    print(f"\n  {a.out} — tier {a.tier} x{a.scale:g}, built in {time.perf_counter() - started:.1f}s\n")
+    for table, n in counts.items():
+        print(f"  {table:<22}{n:>12,}")
+
+
+if __name__ == "__main__":
+    main()
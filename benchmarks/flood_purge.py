@@ -0,0 +1,128 @@
+"""
+Replay a message flood and a spam raid through the real AutoMod.on_message.
+
+    python -m benchmarks.flood_purge
+    python -m benchmarks.flood_purge --flooders 20 --flood-messages 15 --raiders 300
+    python -m benchmarks.flood_purge --single     # one delete per violation (the old path)
+
+--flooders each post --flood-messages distinct messages over --duration
+seconds, spread over --channels channels, tripping the message-flood check
+(5 in 5 s by default); --raiders each post one all-caps message in the same
+window. Deletes go through the fake guild's REST model (latency, 5 per
+second per channel). Reports spam left behind, delete REST calls,
+rate-limit waits and the time until the last delete settled, against a
+temporary database.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.fakes import FakeBot, FakeGuild, FakeMessage, use_temp_db
+import utils.database as database
+
+
+class SingleDeletes:
+    """The pre-batching behaviour: each violation deletes its own message and a
+    flood verdict deletes only the message that tripped it."""
+
+    def __init__(self):
+        self.tasks = []
+
+    def add(self, channel, message_id):
+        async def delete():
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except Exception:
+                pass
+        self.tasks.append(asyncio.create_task(delete()))
+
+    def purge(self, channel, message_ids):
+        self.add(channel, max(message_ids))
+
+    def prune(self):
+        pass
+
+    async def drain(self):
+        await asyncio.gather(*self.tasks)
+
+
+async def replay(flooders, flood_messages, raiders, channels, duration, rest_latency, single, seed):
+    use_temp_db()
+    await database.init_db()
+
+    from cogs.automod import AutoMod
+
+    guild = FakeGuild("flood-target", rest_latency=rest_latency, rate_limits={"messages": (5, 1.0)})
+    rooms = [guild.add_channel(f"chat{i}") for i in range(channels)]
+    await database.create_automod_settings(guild.id)
+    await database.update_automod_setting(guild.id, "enabled", 1)
+
+    bot = FakeBot([guild])
+    cog = AutoMod(bot)
+    if single:
+        cog.deleter = SingleDeletes()
+
+    rnd = random.Random(seed)
+    plan = []
+    for i in range(flooders):
+        member = guild.add_member(f"flooder{i}")
+        home = rnd.sample(rooms, min(2, channels))
+        start = rnd.uniform(0, duration / 2)
+        for n in range(flood_messages):
+            at = start + n * (duration / 2) / flood_messages
+            plan.append((at, member, rnd.choice(home), f"buy now {i} {n} {rnd.random():.6f}"))
+    for i in range(raiders):
+        member = guild.add_member(f"raider{i}")
+        plan.append((rnd.uniform(0, duration), member, rnd.choice(rooms), f"FREE NITRO CLICK HERE NOW {i}"))
+    plan.sort(key=lambda p: p[0])
+
+    spam = set()
+    tasks = []
+    started = time.perf_counter()
+    for at, member, channel, content in plan:
+        delay = at - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        message = FakeMessage(channel, member, content)
+        spam.add(message.id)
+        tasks.append(asyncio.create_task(cog.on_message(message)))
+    await asyncio.gather(*tasks)
+    await cog.deleter.drain()
+    await cog.warn_dms.drain()
+    elapsed = time.perf_counter() - started
+
+    deleted = {m for room in rooms for m in room.deleted}
+    return {
+        "spam": len(spam), "left": len(spam - deleted),
+        "deletes": guild.stats["deletes"], "bulk_deletes": guild.stats["bulk_deletes"],
+        "rate_limited": guild.stats["rate_limited"], "seconds": elapsed,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--flooders", type=int, default=10)
+    ap.add_argument("--flood-messages", type=int, default=15, help="messages per flooder")
+    ap.add_argument("--raiders", type=int, default=200, help="members posting one all-caps message")
+    ap.add_argument("--channels", type=int, default=4)
+    ap.add_argument("--duration", type=float, default=4.0)
+    ap.add_argument("--rest-latency", type=float, default=0.05)
+    ap.add_argument("--single", action="store_true", help="delete one message per call (old path)")
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    r = asyncio.run(replay(a.flooders, a.flood_messages, a.raiders, a.channels, a.duration,
+                           a.rest_latency, a.single, a.seed))
+    mode = "single deletes" if a.single else "bulk purge + per-channel batching"
+    print(f"\n  {r['spam']} spam messages over {a.channels} channels — {mode}\n")
+    print(f"  spam left behind     {r['left']:>6}")
+    print(f"  single deletes       {r['deletes']:>6}")
+    print(f"  bulk deletes         {r['bulk_deletes']:>6}")
+    print(f"  rate-limit waits     {r['rate_limited']:>6}")
+    print(f"  settled after        {r['seconds']:>6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
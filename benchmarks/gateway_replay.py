@@ -0,0 +1,349 @@
+"""
+Replay a gateway event stream through the real message and member listeners.
+
+    python -m benchmarks.gateway_replay --events 20000
+    python -m benchmarks.gateway_replay --events 20000 --record stream.jsonl
+    python -m benchmarks.gateway_replay --replay stream.jsonl
+
+Builds fake guilds (AutoMod, logging, invite tracking, auto role and an open
+ticket configured in a temporary nexify.db) and dispatches every event to
+each listener subscribed to it as its own task, the way discord.py does:
+
+  message   AutoMod.on_message, Tickets.on_message, Utility.on_message
+  edit      AutoMod.on_raw_message_edit, Utility.on_raw_message_edit
+  delete    Utility.on_raw_message_delete
+  join      Invites.on_member_join, Utility.on_member_join
+  leave     Invites.on_raw_member_remove, Utility.on_raw_member_remove
+
+Reports events/sec, p50/p99/max per listener, DB connections and statements
+per call (each listener gets its own query profiler) and REST calls made
+against the fakes. --record writes the synthetic stream as JSONL so the same
+events can be replayed after a change.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import random
+import time
+from collections import defaultdict, deque
+
+from benchmarks.fakes import (
+    FakeAttachment, FakeBot, FakeGuild, FakeMessage, FakeRawMemberRemove, FakeRawMessageDelete, FakeRawMessageUpdate,
+    use_temp_db
+)
+import utils.database as database
+from bot import MAX_MESSAGES
+from utils import queryprofile
+from utils.badwords import get_all_bad_words
+from utils.msgcache import MESSAGE_CACHE
+
+CHAT = [
+    "hey everyone", "anyone around?", "gg that was close", "lol", "check the pinned message",
+    "what time is the event tonight", "brb", "thanks for the help!", "does anyone know how to set this up",
+    "that update looks great", "same", "ok", "can a mod help me with my order", "good morning",
+    "I think the server is lagging", "haha yes", "where do I find the rules", "nice one",
+]
+SPICY = [
+    "join my server discord.gg/abc123 free nitro",
+    "LOOK AT THIS RIGHT NOW EVERYONE PLEASE",
+    "https://a.example.com https://b.example.com https://c.example.com https://d.example.com",
+    "😂" * 15,
+    "spam\n" * 40,
+    "lorem ipsum dolor sit amet " * 90,
+    "heyyyyyyyyyyyyyyyyyyyy",
+]
+PLANS = ("free", "premium", "business")
+
+# type -> share of the synthetic stream
+MIX = {"message": 0.80, "edit": 0.07, "delete": 0.07, "join": 0.03, "leave": 0.03}
+
+# Writes queued for group commit run in the writer task, which starts from an
+# empty context and so lands in the default bucket
+WRITER = "(group-commit writer)"
+current = contextvars.ContextVar("listener", default=WRITER)
+
+
+# ═══════════════════════════════════════════════════════════════
+#  EVENT STREAM
+# ═══════════════════════════════════════════════════════════════
+
+def synthesize(events, guilds, channels, members, seed):
+    """Yield a world header followed by `events` JSON-able event dicts."""
+    rnd = random.Random(seed)
+    yield {"type": "world", "guilds": guilds, "channels": channels, "members": members}
+    spicy = SPICY + [f"you are such a {get_all_bad_words()[0]}"]
+    alive = {g: list(range(members)) for g in range(guilds)}
+    next_member = {g: members for g in range(guilds)}
+    sent = []
+    kinds, weights = zip(*MIX.items())
+    for n in range(events):
+        kind = rnd.choices(kinds, weights)[0]
+        g = rnd.randrange(guilds)
+        if kind in ("edit", "delete") and not sent:
+            kind = "message"
+        if kind == "leave" and len(alive[g]) < 2:
+            kind = "join"
+        if kind == "message":
+            pool = alive[g]
+            # A few chatty members write most messages
+            author = pool[min(len(pool) - 1, int(rnd.paretovariate(1.2)) - 1)]
+            channel = -1 if rnd.random() < 0.1 else rnd.randrange(channels)
+            content = rnd.choice(spicy) if rnd.random() < 0.15 else rnd.choice(CHAT)
+            sent.append(n)
+            yield {"type": "message", "id": n, "guild": g, "channel": channel, "author": author,
+                   "content": content, "attachments": int(rnd.random() < 0.05)}
+        elif kind == "edit":
+            yield {"type": "edit", "id": rnd.choice(sent[-500:]), "content": rnd.choice(CHAT) + " (edited)"}
+        elif kind == "delete":
+            yield {"type": "delete", "id": sent.pop(rnd.randrange(max(0, len(sent) - 500), len(sent)))}
+        elif kind == "join":
+            alive[g].append(next_member[g])
+            yield {"type": "join", "guild": g, "member": next_member[g], "age_days": rnd.choice((0, 2, 30, 400))}
+            next_member[g] += 1
+        else:
+            member = alive[g].pop(rnd.randrange(len(alive[g])))
+            yield {"type": "leave", "guild": g, "member": member}
+
+
+def load_stream(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# ═══════════════════════════════════════════════════════════════
+#  WORLD
+# ═══════════════════════════════════════════════════════════════
+
+async def build_world(spec, rest_latency):
+    guilds = []
+    for g in range(spec["guilds"]):
+        guild = FakeGuild(f"guild{g}", rest_latency=rest_latency)
+        guild.text = [guild.add_channel(f"chat-{c}") for c in range(spec["channels"])]
+        guild.mod_log = guild.add_channel("mod-log")
+        guild.member_log = guild.add_channel("member-log")
+        guild.invite_log = guild.add_channel("invite-log")
+        guild.ticket = guild.add_channel("ticket-0001")
+        guild.by_index = {m: guild.add_member(f"g{g}m{m}") for m in range(spec["members"])}
+        inviter = guild.by_index[0]
+        guild.add_invite(f"g{g}code", inviter)
+        auto_role = guild.add_role("Member", position=5)
+
+        await database.create_subscription(guild.id, plan=PLANS[g % len(PLANS)])
+        await database.create_automod_settings(guild.id)
+        await database.update_automod_setting(guild.id, "enabled", 1)
+        await database.update_automod_setting(guild.id, "log_channel_id", guild.mod_log.id)
+        await database.update_logging_setting(guild.id, "enabled", 1)
+        await database.update_logging_setting(guild.id, "log_channel_id", guild.member_log.id)
+        await database.set_invite_log_channel(guild.id, guild.invite_log.id)
+        await database.set_auto_role(guild.id, auto_role.id)
+        await database.create_ticket(guild.id, guild.ticket.id, inviter.id, "Support", 1)
+        guilds.append(guild)
+    return guilds
+
+
+# ═══════════════════════════════════════════════════════════════
+#  REPLAY
+# ═══════════════════════════════════════════════════════════════
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+async def replay(stream, rest_latency, rate, inflight, record):
+    use_temp_db()
+    current.set("setup")
+    await database.init_db()
+
+    from cogs.automod import AutoMod
+    from cogs.invites import Invites
+    from cogs.tickets import Tickets
+    from cogs.utility import Utility
+
+    stream = iter(stream)
+    spec = next(stream)
+    if spec.get("type") != "world":
+        raise SystemExit("event stream must start with a world record")
+    out = open(record, "w", encoding="utf-8") if record else None
+    if out:
+        out.write(json.dumps(spec) + "\n")
+
+    guilds = await build_world(spec, rest_latency)
+    bot = FakeBot(guilds)
+    automod, invites, tickets, utility = AutoMod(bot), Invites(bot), Tickets(bot), Utility(bot)
+    for guild in guilds:
+        await invites.cache_guild_invites(guild)
+        for key in guild.stats:
+            guild.stats[key] = 0
+    utility.refresh_message_cache.cancel()
+    await MESSAGE_CACHE.refresh()
+
+    listeners = {
+        "message": [("AutoMod.on_message", automod.on_message), ("Tickets.on_message", tickets.on_message),
+                    ("Utility.on_message", utility.on_message)],
+        "edit": [("AutoMod.on_raw_message_edit", automod.on_raw_message_edit),
+                 ("Utility.on_raw_message_edit", utility.on_raw_message_edit)],
+        "delete": [("Utility.on_raw_message_delete", utility.on_raw_message_delete)],
+        "join": [("Invites.on_member_join", invites.on_member_join),
+                 ("Utility.on_member_join", utility.on_member_join)],
+        "leave": [("Invites.on_raw_member_remove", invites.on_raw_member_remove),
+                  ("Utility.on_raw_member_remove", utility.on_raw_member_remove)],
+    }
+
+    # Every utils.database call opens one connection; attribute it to the listener task
+    profilers = defaultdict(lambda: queryprofile.QueryProfiler(enabled=True, slow_ms=float("inf")))
+    connections = defaultdict(int)
+
+    def connect():
+        name = current.get()
+        connections[name] += 1
+        return queryprofile.connect(database.DB_PATH, profilers[name])
+
+    original_connect = database._connect
+    database._connect = connect
+
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+    first_error = {}
+    messages = {}
+    dpy_cache = deque(maxlen=MAX_MESSAGES)   # ids discord.py's own message cache would still hold
+    counts = defaultdict(int)
+    slots = asyncio.Semaphore(inflight)
+    pending = set()
+
+    async def call(name, fn, args):
+        current.set(name)
+        started = time.perf_counter()
+        try:
+            await fn(*args)
+        except Exception as e:
+            errors[name] += 1
+            first_error.setdefault(name, e)
+        finally:
+            timings[name].append(time.perf_counter() - started)
+
+    async def dispatch(kind, args):
+        try:
+            await asyncio.gather(*(call(name, fn, args) for name, fn in listeners[kind]))
+        finally:
+            slots.release()
+
+    def to_args(ev):
+        kind = ev["type"]
+        if kind == "message":
+            guild = guilds[ev["guild"]]
+            channel = guild.ticket if ev["channel"] == -1 else guild.text[ev["channel"] % len(guild.text)]
+            msg = FakeMessage(channel, guild.by_index[ev["author"]], ev["content"],
+                              [FakeAttachment() for _ in range(ev.get("attachments", 0))])
+            messages[ev["id"]] = msg
+            dpy_cache.append(ev["id"])
+            return (msg,)
+        if kind == "edit":
+            before = messages.get(ev["id"])
+            if before is None:
+                return None
+            after = messages[ev["id"]] = before.edited(ev["content"])
+            return (FakeRawMessageUpdate(after, before if ev["id"] in dpy_cache else None),)
+        if kind == "delete":
+            msg = messages.pop(ev["id"], None)
+            if msg is None:
+                return None
+            return (FakeRawMessageDelete(msg, msg if ev["id"] in dpy_cache else None),)
+        guild = guilds[ev["guild"]]
+        if kind == "join":
+            member = guild.by_index[ev["member"]] = guild.add_member(
+                f"g{ev['guild']}m{ev['member']}", age_days=ev.get("age_days", 365))
+            return (member,)
+        member = guild.by_index.pop(ev["member"], None)
+        if member is None:
+            return None
+        guild.remove_member(member)
+        return (FakeRawMemberRemove(member, guild.id),)
+
+    gap = 1 / rate if rate else 0
+    started = time.perf_counter()
+    try:
+        for ev in stream:
+            if out:
+                out.write(json.dumps(ev) + "\n")
+            args = to_args(ev)
+            if args is None:
+                continue
+            counts[ev["type"]] += 1
+            await slots.acquire()
+            task = asyncio.create_task(dispatch(ev["type"], args))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            if gap:
+                await asyncio.sleep(gap)
+            elif not counts[ev["type"]] % 64:
+                await asyncio.sleep(0)  # let the reader yield like a socket would
+        await asyncio.gather(*pending)
+        await invites.join_batcher.drain()
+        await utility.join_batcher.drain()
+        await automod.deleter.drain()
+        await automod.warn_dms.drain()
+    finally:
+        elapsed = time.perf_counter() - started
+        database._connect = original_connect
+        if out:
+            out.close()
+
+    total = sum(counts.values())
+    rest = defaultdict(int)
+    for guild in guilds:
+        for key, value in guild.stats.items():
+            rest[key] += value
+
+    print(f"\n  Gateway replay — {total} events, {spec['guilds']} guilds, "
+          f"{'unthrottled' if not rate else f'{rate:.0f}/s'}, {inflight} in flight")
+    print(f"  {'wall time':<28}{elapsed:.2f}s")
+    print(f"  {'events/sec':<28}{total / elapsed:,.0f}")
+    print(f"  {'messages/sec':<28}{counts['message'] / elapsed:,.0f}")
+    print(f"  {'mix':<28}" + ", ".join(f"{k} {v}" for k, v in counts.items()))
+    print(f"\n  {'listener':<28}{'calls':>7}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'conn/call':>11}{'stmt/call':>11}{'errors':>8}")
+    for name in (n for group in listeners.values() for n, _ in group):
+        ordered = sorted(timings[name])
+        if not ordered:
+            continue
+        statements = sum(s.calls for s in profilers[name].shapes.values())
+        print(f"  {name:<28}{len(ordered):>7}{percentile(ordered, 0.5) * 1000:>9.2f}"
+              f"{percentile(ordered, 0.99) * 1000:>9.2f}{ordered[-1] * 1000:>9.2f}"
+              f"{connections[name] / len(ordered):>11.2f}{statements / len(ordered):>11.2f}{errors[name]:>8}")
+    if connections[WRITER]:
+        statements = sum(s.calls for s in profilers[WRITER].shapes.values())
+        print(f"  {WRITER:<28}{'':>34}{connections[WRITER]:>11}{statements:>11}")
+    all_statements = sum(s.calls for name, p in profilers.items() if name != "setup" for s in p.shapes.values())
+    all_connections = sum(v for name, v in connections.items() if name != "setup")
+    print(f"\n  {'DB per event':<28}{all_connections / total:.2f} connections, "
+          f"{all_statements / total:.2f} statements" if total else "")
+    print(f"  {'REST calls':<28}{rest['rest_calls']}  (sent {rest['messages_sent']}, "
+          f"deleted {rest['deletes']}, bulk deleted {rest['bulk_deletes']}, timeouts {rest['timeouts']}, add_roles {rest['add_roles']})")
+    print(f"  {'message cache':<28}{MESSAGE_CACHE.stats()}")
+    for name, e in first_error.items():
+        print(f"  first error in {name}: {type(e).__name__}: {e}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--events", type=int, default=20000, help="synthetic events to generate")
+    ap.add_argument("--guilds", type=int, default=6)
+    ap.add_argument("--channels", type=int, default=5, help="chat channels per guild")
+    ap.add_argument("--members", type=int, default=200, help="starting members per guild")
+    ap.add_argument("--rate", type=float, default=0, help="events per second to feed (0 = as fast as possible)")
+    ap.add_argument("--inflight", type=int, default=256, help="events dispatched but not yet finished")
+    ap.add_argument("--rest-latency", type=float, default=0.0, help="simulated seconds per REST call")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--record", help="write the replayed stream to this JSONL file")
+    ap.add_argument("--replay", help="replay a recorded JSONL stream instead of generating one")
+    a = ap.parse_args()
+    stream = load_stream(a.replay) if a.replay else synthesize(a.events, a.guilds, a.channels, a.members, a.seed)
+    asyncio.run(replay(stream, a.rest_latency, a.rate, a.inflight, a.record))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Member cache policy: RSS at 100k and 1M members.
+
+    python -m benchmarks.member_cache
+    python -m benchmarks.member_cache --members 100000,1000000 --guilds 1000
+
+For each MEMBER_CACHE policy (utils.membercache) and member total, a fresh
+process builds the guilds through discord.py's own ConnectionState with that
+policy's MemberCacheFlags:
+
+  GUILD_CREATE     per guild (Pareto-sized), carrying the bot, the members in
+                   voice (--voice-share) and their voice states, as Discord
+                   sends for large guilds
+  chunking         every guild for "full" (chunk_guilds_at_startup); for the
+                   other policies only --lazy-share of guilds, chunked on
+                   demand (serverinfo, a required-role giveaway draw) — kept
+                   under "joined", used and dropped under "voice" / "none"
+  joins            --join-share of members arriving after startup, through
+                   GUILD_MEMBER_ADD
+
+and reports RSS growth, members and users held, and build time.
+"""
+
+import argparse
+import gc
+import multiprocessing
+import random
+import time
+
+import discord
+
+from utils.membercache import MEMBER_CACHE_POLICIES, chunk_at_startup, member_cache_flags
+
+BASE_ID = 1_200_000_000_000_000_000
+ROLES = 12
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+
+def member_payload(uid, rnd, guild_id=None):
+    data = {
+        "user": {"id": str(uid), "username": f"user{uid % 10 ** 7}", "discriminator": "0",
+                 "avatar": f"{uid:032x}"[-32:] if rnd.random() < 0.7 else None,
+                 "global_name": f"User {uid % 10 ** 5}" if rnd.random() < 0.5 else None},
+        "roles": [str(BASE_ID + 10 ** 9 + r) for r in rnd.sample(range(ROLES), rnd.randint(0, 3))],
+        "joined_at": "2024-03-01T12:00:00.000000+00:00", "deaf": False, "mute": False, "flags": 0,
+        "nick": f"nick{uid % 1000}" if rnd.random() < 0.1 else None,
+    }
+    if guild_id is not None:
+        data["guild_id"] = str(guild_id)
+    return data
+
+
+def guild_sizes(members, guilds, rnd):
+    weights = [rnd.paretovariate(1.1) for _ in range(guilds)]
+    total = sum(weights)
+    return [max(2, int(members * w / total)) for w in weights]
+
+
+def build(policy, members, guilds, voice_share, lazy_share, join_share, seed):
+    rnd = random.Random(seed)
+    intents = discord.Intents.default()
+    intents.members = True
+    client = discord.Client(intents=intents, member_cache_flags=member_cache_flags(policy),
+                            chunk_guilds_at_startup=chunk_at_startup(policy), max_messages=None)
+    state = client._connection
+    state.clear()
+    state.user = discord.ClientUser(state=state, data={"id": str(BASE_ID), "username": "Hubix",
+                                                        "discriminator": "0", "avatar": None, "bot": True})
+    gc.collect()
+    before = rss_bytes()
+    started = time.perf_counter()
+
+    sizes = guild_sizes(members, guilds, rnd)
+    lazy = set(rnd.sample(range(guilds), max(1, int(guilds * lazy_share))))
+    next_uid = BASE_ID + 10 ** 10
+    for g, size in enumerate(sizes):
+        guild_id = BASE_ID + 1 + g
+        voice_channel = BASE_ID + 10 ** 8 + g
+        in_voice = [next_uid + i for i in range(size) if rnd.random() < voice_share]
+        data = {
+            "id": str(guild_id), "name": f"guild{g}", "member_count": size, "large": size > 250,
+            "features": [], "emojis": [], "stickers": [],
+            "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                       "hoist": False, "managed": False, "mentionable": False}] +
+                     [{"id": str(BASE_ID + 10 ** 9 + r), "name": f"role{r}", "permissions": "0", "position": r + 1,
+                       "color": 0, "hoist": False, "managed": False, "mentionable": False} for r in range(ROLES)],
+            "channels": [{"id": str(voice_channel), "type": 2, "name": "voice", "position": 0,
+                          "bitrate": 64000, "user_limit": 0, "permission_overwrites": []}],
+            "members": [member_payload(BASE_ID, rnd)] + [member_payload(uid, rnd) for uid in in_voice],
+            "voice_states": [{"user_id": str(uid), "channel_id": str(voice_channel), "session_id": "s",
+                              "deaf": False, "mute": False, "self_deaf": False, "self_mute": False,
+                              "self_video": False, "suppress": False, "request_to_speak_timestamp": None}
+                             for uid in in_voice],
+        }
+        data["members"][0]["user"]["bot"] = True
+        guild = state._add_guild_from_data(data)
+
+        if chunk_at_startup(policy) or g in lazy:
+            # What a GUILD_MEMBERS_CHUNK answer does; cached unless the policy drops it
+            keep = policy in ("full", "joined")
+            for i in range(0, size, 1000):
+                chunk = [discord.Member(data=member_payload(uid, rnd), guild=guild, state=state)
+                         for uid in range(next_uid + i, next_uid + min(size, i + 1000))]
+                if keep:
+                    for m in chunk:
+                        guild._add_member(m)
+                del chunk
+        for uid in range(next_uid + size, next_uid + size + int(size * join_share)):
+            state.parse_guild_member_add(member_payload(uid, rnd, guild_id))
+        next_uid += size * 2
+
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    cached = sum(len(g._members) for g in state._guilds.values())
+    return {"rss": rss_bytes() - before, "members": cached, "users": len(state._users), "seconds": elapsed}
+
+
+def measure(policy, args):
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(build, (policy, *args))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--members", default="100000,1000000", help="comma-separated member totals")
+    ap.add_argument("--guilds", type=int, default=1000)
+    ap.add_argument("--voice-share", type=float, default=0.01)
+    ap.add_argument("--lazy-share", type=float, default=0.05, help="guilds chunked on demand")
+    ap.add_argument("--join-share", type=float, default=0.02, help="members joining after startup")
+    ap.add_argument("--policies", default=",".join(reversed(MEMBER_CACHE_POLICIES)))
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    for total in (int(n) for n in a.members.split(",")):
+        args = (total, a.guilds, a.voice_share, a.lazy_share, a.join_share, a.seed)
+        print(f"\n  {total:,} members over {a.guilds} guilds — {a.voice_share:.0%} in voice, "
+              f"{a.lazy_share:.0%} of guilds chunked on demand, {a.join_share:.0%} joined since start\n")
+        print(f"  {'policy':<10}{'RSS':>12}{'members':>12}{'users':>12}{'build s':>10}")
+        full = None
+        for policy in a.policies.split(","):
+            r = measure(policy, args)
+            full = full if full is not None else r["rss"]
+            share = f"  ({r['rss'] / full:.0%} of {a.policies.split(',')[0]})" if full else ""
+            print(f"  {policy:<10}{r['rss'] / 2 ** 20:>8.1f} MiB{r['members']:>12,}{r['users']:>12,}"
+                  f"{r['seconds']:>10.2f}{share}")
+
+
+if __name__ == "__main__":
+    main()
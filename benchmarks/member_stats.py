@@ -0,0 +1,135 @@
+"""
+/serverinfo member counts: scanning guild.members vs utils.memberstats.
+
+    python -m benchmarks.member_stats
+    python -m benchmarks.member_stats --members 10000,100000,1000000
+
+For one guild of each size, fully cached through discord.py's own
+ConnectionState (what the old command needed), reports:
+
+  scan     the two passes serverinfo made over guild.members (bots, online)
+           on every invocation
+  seed     MemberStats.seed over the same list — once per guild, at its
+           first chunk
+  read     the O(1) counters the command reads now
+  events   µs per GUILD_MEMBER_ADD / REMOVE / PRESENCE_UPDATE applied to the
+           counters, on top of discord.py's own parsing of the event
+
+and checks the counters still match a fresh scan after the events.
+"""
+
+import argparse
+import random
+import time
+
+import discord
+
+from benchmarks.member_cache import BASE_ID, member_payload
+from utils.memberstats import MemberStats
+
+STATUSES = ("online", "idle", "dnd", "offline", "offline", "offline")
+
+
+def build(size, rnd):
+    client = discord.Client(intents=discord.Intents.all(), member_cache_flags=discord.MemberCacheFlags.all(),
+                            enable_raw_presences=True, max_messages=None)
+    state = client._connection
+    state.clear()
+    guild_id = BASE_ID + 1
+    guild = state._add_guild_from_data({
+        "id": str(guild_id), "name": "guild", "member_count": size, "large": True, "features": [],
+        "emojis": [], "stickers": [], "channels": [], "members": [],
+        "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                   "hoist": False, "managed": False, "mentionable": False}],
+    })
+    for uid in range(BASE_ID + 10, BASE_ID + 10 + size):
+        data = member_payload(uid, rnd)
+        data["user"]["bot"] = rnd.random() < 0.03
+        member = discord.Member(data=data, guild=guild, state=state)
+        member.status = rnd.choice(STATUSES)
+        guild._add_member(member)
+    return state, guild
+
+
+def scan(guild):
+    bots = sum(1 for m in guild.members if m.bot)
+    online = sum(1 for m in guild.members if m.status != discord.Status.offline)
+    return bots, online
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def run(size, events, seed):
+    rnd = random.Random(seed)
+    state, guild = build(size, rnd)
+    stats = MemberStats(track_presences=True)
+    repeat = max(3, 1_000_000 // size)
+
+    scan_s, _ = timed(lambda: scan(guild), repeat)
+    seed_s, _ = timed(lambda: stats.seed(guild.id, guild.members), max(3, repeat // 3))
+    read_s, _ = timed(lambda: (stats.get(guild.id).bots, len(stats.get(guild.id).online)), 100_000)
+
+    ids = [m.id for m in guild.members]
+    next_uid = BASE_ID + 10 + size
+    state_s = counter_s = 0.0
+    for _ in range(events):
+        roll = rnd.random()
+        if roll < 0.1:
+            data = member_payload(next_uid, rnd, guild.id)
+            next_uid += 1
+            started = time.perf_counter()
+            state.parse_guild_member_add(data)
+            mid = time.perf_counter()
+            stats.member_join(guild.id, guild.get_member(int(data["user"]["id"])))
+            ids.append(int(data["user"]["id"]))
+        elif roll < 0.2 and ids:
+            uid = ids.pop(rnd.randrange(len(ids)))
+            data = {"guild_id": str(guild.id), "user": member_payload(uid, rnd)["user"]}
+            data["user"]["bot"] = guild.get_member(uid).bot
+            started = time.perf_counter()
+            state.parse_guild_member_remove(data)
+            mid = time.perf_counter()
+            stats.member_remove(guild.id, discord.User(state=state, data=data["user"]))
+        else:
+            uid = rnd.choice(ids)
+            status = rnd.choice(STATUSES)
+            data = {"guild_id": str(guild.id), "user": {"id": str(uid)}, "status": status,
+                    "activities": [], "client_status": {"desktop": status}}
+            started = time.perf_counter()
+            state.parse_presence_update(data)
+            mid = time.perf_counter()
+            stats.presence(guild.id, uid, discord.Status(status))
+        state_s += mid - started
+        counter_s += time.perf_counter() - mid
+
+    counted = stats.get(guild.id)
+    return {
+        "scan": scan_s, "seed": seed_s, "read": read_s,
+        "event_dpy": state_s / events, "event_stats": counter_s / events,
+        "matches": (counted.bots, len(counted.online)) == scan(guild)
+        and counted.humans + counted.bots == len(guild.members),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--members", default="10000,100000,1000000", help="comma-separated guild sizes")
+    ap.add_argument("--events", type=int, default=50_000)
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    print(f"\n  {'members':>10}{'scan ms':>10}{'seed ms':>10}{'read µs':>10}"
+          f"{'event µs (dpy + counters)':>28}{'match':>7}")
+    for size in (int(n) for n in a.members.split(",")):
+        r = run(size, a.events, a.seed)
+        print(f"  {size:>10,}{r['scan'] * 1e3:>10.2f}{r['seed'] * 1e3:>10.2f}{r['read'] * 1e6:>10.3f}"
+              f"{r['event_dpy'] * 1e6:>18.2f} + {r['event_stats'] * 1e6:.2f}{'yes' if r['matches'] else 'NO':>7}")
+
+
+if __name__ == "__main__":
+    main()
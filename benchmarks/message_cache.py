@@ -0,0 +1,186 @@
+"""
+Message content cache: coverage and memory for edit / delete logging.
+
+    python -m benchmarks.message_cache
+    python -m benchmarks.message_cache --guilds 1000 --messages 500000 --logging-share 0.1
+
+Replays a synthetic stream (Pareto-skewed guild traffic; 7% edits and 7%
+deletes, most aimed at recent messages, some at older ones) against real
+discord.Message objects built through discord.py's ConnectionState, and
+compares:
+
+  discord.py cache     the global deque of max_messages full Messages
+                       (default 1000, and larger sizes) that on_message_edit /
+                       on_message_delete depended on
+  compact cache        utils.msgcache for the guilds that log messages, next
+                       to discord.py's cache lowered to bot.MAX_MESSAGES
+
+For each: share of edits / deletes in logging guilds that found the original
+(what the log could show), retained bytes (tracemalloc), RSS growth over the
+replay (separate process, no tracemalloc) and µs per edit / delete lookup.
+"""
+
+import argparse
+import multiprocessing
+import random
+import time
+import tracemalloc
+
+import discord
+
+from utils.msgcache import MESSAGE_CACHE_PER_GUILD, MessageCache
+
+CHAT = [
+    "hey everyone", "anyone around?", "gg that was close", "lol", "check the pinned message",
+    "what time is the event tonight", "does anyone know how to set this up properly, I tried twice",
+    "can a mod help me with my order, it's been two days and I still have nothing", "good morning",
+]
+BASE_ID = 1_100_000_000_000_000_000
+
+
+def build_state(guilds, max_messages):
+    client = discord.Client(intents=discord.Intents.all(), max_messages=max_messages)
+    state = client._connection
+    state.clear()
+    channels = []
+    for g in range(guilds):
+        data = {
+            "id": str(BASE_ID + g), "name": f"guild{g}", "roles": [], "emojis": [], "stickers": [],
+            "features": [], "member_count": 1, "members": [],
+            "channels": [{"id": str(BASE_ID + 10 ** 6 + g), "type": 0, "name": "chat", "position": 0,
+                          "permission_overwrites": []}],
+        }
+        guild = discord.Guild(data=data, state=state)
+        state._add_guild(guild)
+        channels.append(guild.text_channels[0])
+    return state, channels
+
+
+def synthesize(guilds, messages, seed):
+    """[(kind, guild index, message number)] — ids are precomputed ints so the
+    stream itself costs the same in every variant."""
+    rnd = random.Random(seed)
+    weights = [rnd.paretovariate(1.2) for _ in range(guilds)]
+    sent = [[] for _ in range(guilds)]
+    stream = []
+    n = 0
+    while n < messages:
+        g = rnd.choices(range(guilds), weights)[0]
+        roll = rnd.random()
+        history = sent[g]
+        if roll < 0.14 and history:
+            # Most edits / deletes hit something said a moment ago
+            back = int(rnd.expovariate(1 / 20)) if rnd.random() < 0.8 else rnd.randrange(len(history))
+            target = history[max(0, len(history) - 1 - back)]
+            stream.append(("edit" if roll < 0.07 else "delete", g, target))
+        else:
+            history.append(n)
+            stream.append(("message", g, n))
+            n += 1
+    return stream
+
+
+def payload(n, g, channel_id):
+    return {
+        "id": str(BASE_ID + 10 ** 7 + n), "channel_id": str(channel_id), "guild_id": str(BASE_ID + g),
+        "author": {"id": str(BASE_ID + 10 ** 8 + n % 5000), "username": f"user{n % 5000}", "discriminator": "0",
+                   "avatar": None, "global_name": None},
+        "member": {"roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0},
+        "content": CHAT[n % len(CHAT)], "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None,
+        "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+        "embeds": [], "pinned": False, "type": 0, "flags": 0, "components": [],
+    }
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+
+def replay(variant, guilds, messages, logging_share, seed, trace):
+    """variant: ("dpy", max_messages) or ("compact", max_messages)."""
+    kind, max_messages = variant
+    rnd = random.Random(seed + 1)
+    logging = set(rnd.sample(range(guilds), max(1, int(guilds * logging_share))))
+    state, channels = build_state(guilds, max_messages)
+    stream = synthesize(guilds, messages, seed)
+    cache = MessageCache()
+    if kind == "compact":
+        for g in logging:
+            cache.set_enabled(BASE_ID + g, True)
+
+    if trace:
+        tracemalloc.start()
+    rss_before = rss_bytes()
+    found = asked = 0
+    lookup_seconds = 0.0
+    for event, g, n in stream:
+        if event == "message":
+            msg = discord.Message(state=state, channel=channels[g], data=payload(n, g, channels[g].id))
+            state._messages.append(msg)
+            if kind == "compact":
+                cache.add(msg)
+            continue
+        message_id = BASE_ID + 10 ** 7 + n
+        started = time.perf_counter()
+        hit = None
+        if kind == "compact" and g in logging:
+            hit = cache.pop(BASE_ID + g, message_id) if event == "delete" else cache.get(BASE_ID + g, message_id)
+        if hit is None:
+            hit = state._get_message(message_id)
+        lookup_seconds += time.perf_counter() - started
+        if g in logging:
+            asked += 1
+            found += hit is not None
+    retained = tracemalloc.get_traced_memory()[0] if trace else 0
+    if trace:
+        tracemalloc.stop()
+    return {
+        "coverage": found / asked if asked else 0.0,
+        "lookups": asked,
+        "lookup_us": lookup_seconds / max(1, sum(1 for e in stream if e[0] != "message")) * 1e6,
+        "retained": retained,
+        "rss": rss_bytes() - rss_before,
+        "cached": len(cache),
+    }
+
+
+def measure(variant, args):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        traced = pool.apply(replay, (variant, *args, True))
+    with ctx.Pool(1) as pool:
+        plain = pool.apply(replay, (variant, *args, False))
+    traced["rss"] = plain["rss"]
+    traced["lookup_us"] = plain["lookup_us"]
+    return traced
+
+
+def main():
+    import bot
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--guilds", type=int, default=300)
+    ap.add_argument("--messages", type=int, default=100_000)
+    ap.add_argument("--logging-share", type=float, default=0.25, help="share of guilds with message logging on")
+    ap.add_argument("--sizes", default="1000,10000,50000", help="discord.py max_messages values to compare")
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    args = (a.guilds, a.messages, a.logging_share, a.seed)
+    variants = [(f"discord.py max_messages={int(s)}", ("dpy", int(s))) for s in a.sizes.split(",")]
+    variants.append((f"compact ({MESSAGE_CACHE_PER_GUILD}/guild) + max_messages={bot.MAX_MESSAGES}",
+                     ("compact", bot.MAX_MESSAGES)))
+
+    print(f"\n  {a.messages:,} messages over {a.guilds} guilds, "
+          f"{a.logging_share:.0%} of them logging edits / deletes\n")
+    print(f"  {'cache':<44}{'coverage':>9}{'retained':>12}{'RSS':>11}{'lookup µs':>11}")
+    for label, variant in variants:
+        r = measure(variant, args)
+        print(f"  {label:<44}{r['coverage']:>9.1%}{r['retained'] / 2 ** 20:>9.1f} MiB"
+              f"{r['rss'] / 2 ** 20:>7.1f} MiB{r['lookup_us']:>11.1f}")
+    print("\n  coverage = edits / deletes in logging guilds whose original was still cached")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Per-observation cost of utils.metrics, to keep instrumentation off the hot path.
+
+    python -m benchmarks.metrics_overhead
+"""
+
+import asyncio
+import time
+
+from utils import metrics
+
+
+def per_call(fn, n):
+    start = time.perf_counter()
+    fn(n)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def bench_observe(n):
+    hist = metrics.Histogram("bench_seconds", "bench", ["name"])
+    observe = hist.observe
+    for _ in range(n):
+        observe(0.003, "AutoMod.on_message")
+
+
+def bench_counter(n):
+    counter = metrics.Counter("bench_total", "bench", ["name"])
+    inc = counter.inc
+    for _ in range(n):
+        inc("AutoMod.on_message")
+
+
+async def noop():
+    return None
+
+
+def bench_wrapped(wrapped):
+    def run(n):
+        async def loop():
+            for _ in range(n):
+                await wrapped()
+        asyncio.run(loop())
+    return run
+
+
+def main(n=500_000):
+    hist = metrics.Histogram("bench_wrapped_seconds", "bench", ["name"])
+    raw = per_call(bench_wrapped(noop), n)
+    timed = per_call(bench_wrapped(metrics.timed(hist, "noop")(noop)), n)
+    print(f"\n  utils.metrics overhead ({n:,} iterations)")
+    print(f"  {'Histogram.observe':<32}{per_call(bench_observe, n):>7.3f} µs")
+    print(f"  {'Counter.inc':<32}{per_call(bench_counter, n):>7.3f} µs")
+    print(f"  {'await coroutine (bare)':<32}{raw:>7.3f} µs")
+    print(f"  {'await coroutine (@timed)':<32}{timed:>7.3f} µs  (+{timed - raw:.3f} µs)")
+    start = time.perf_counter()
+    metrics.REGISTRY.render()
+    print(f"  {'REGISTRY.render()':<32}{(time.perf_counter() - start) * 1e3:>7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Latency of ShopView.order_button ("Order Now") on a generated fleet database.
+
+    python -m benchmarks.order_button                         # medium tier
+    python -m benchmarks.order_button --tier large --rush 500
+    python -m benchmarks.order_button --db /path/to/copy-of-nexify.db --guild 123
+
+Compares the previous button body (get_guild_plan, get_shop_settings,
+is_customer_blacklisted, get_user_orders x2, get_products — six connections)
+with the current one (SHOP_CACHE + get_order_eligibility). Clicks come from
+the shop's existing customers (hot ones included) plus first-time buyers,
+first one at a time, then as a concurrent rush, with the shop cache cold at
+the start of each rush. Reports p50 / p99 / max ms to the interaction
+response and DB connections / statements per click. The database is copied
+to a temp dir first, so the cached tier files are never modified.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import discord
+
+from benchmarks import fleetgen
+from benchmarks.fakes import FakeGuild, FakeInteraction, FakeMember
+import utils.database as database
+from utils import queryprofile
+from utils.shopcache import SHOP_CACHE
+from cogs.orders import ProductSelectView, ShopView
+from config import get_plan_limits
+
+
+async def legacy_order_button(interaction):
+    """The order_button body before the eligibility query and shop cache."""
+    plan = await database.get_guild_plan(interaction.guild.id)
+    if not get_plan_limits(plan).get("shop_enabled"):
+        return await interaction.response.send_message(embed=discord.Embed(title="🔒 Feature Locked"), ephemeral=True)
+    settings = await database.get_shop_settings(interaction.guild.id)
+    if not settings or not settings.get("enabled"):
+        return await interaction.response.send_message("❌ Shop is not enabled.", ephemeral=True)
+    if await database.is_customer_blacklisted(interaction.guild.id, interaction.user.id):
+        return await interaction.response.send_message("❌ blacklisted", ephemeral=True)
+    pending = await database.get_user_orders(interaction.guild.id, interaction.user.id, "pending")
+    processing = await database.get_user_orders(interaction.guild.id, interaction.user.id, "processing")
+    if len(pending) + len(processing) >= 3:
+        return await interaction.response.send_message("❌ too many active orders", ephemeral=True)
+    products = await database.get_products(interaction.guild.id)
+    in_stock = [p for p in products if p["in_stock"]]
+    if not in_stock:
+        return await interaction.response.send_message("❌ No products are currently in stock.", ephemeral=True)
+    view = ProductSelectView(in_stock, settings)
+    await interaction.response.send_message(embed=discord.Embed(title="🛒 Select a Product"), view=view, ephemeral=True)
+
+
+def prepare(source, guild_id):
+    """Copy the database and make sure the shop guild can take orders."""
+    path = os.path.join(tempfile.mkdtemp(prefix="hubix-bench-"), "nexify.db")
+    shutil.copy(source, path)
+    db = sqlite3.connect(path)
+    if guild_id is None:
+        guild_id = db.execute("SELECT guild_id FROM orders GROUP BY guild_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    customers = [r[0] for r in db.execute(
+        "SELECT user_id FROM orders WHERE guild_id=? GROUP BY user_id ORDER BY COUNT(*) DESC", (guild_id,))]
+    db.execute("INSERT INTO subscriptions (guild_id, plan) VALUES (?, 'business') "
+               "ON CONFLICT(guild_id) DO UPDATE SET plan='business', expires_at=NULL", (guild_id,))
+    db.execute("INSERT INTO shop_settings (guild_id, enabled) VALUES (?, 1) "
+               "ON CONFLICT(guild_id) DO UPDATE SET enabled=1", (guild_id,))
+    db.commit()
+    db.close()
+    return path, guild_id, customers
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+    return pick(0.50), pick(0.99), ordered[-1] * 1000
+
+
+async def run(path, guild_id, customers, clicks, rush, seed):
+    database.DB_PATH = path
+    await database.init_db()   # picks up indexes added since the file was generated
+
+    profiler = queryprofile.QueryProfiler(enabled=True, slow_ms=float("inf"))
+    connections = [0]
+
+    def connect():
+        connections[0] += 1
+        return queryprofile.connect(database.DB_PATH, profiler)
+
+    database._connect = connect
+
+    rnd = random.Random(seed)
+    guild = FakeGuild("shop", guild_id=guild_id)
+    # Mostly returning customers, skewed to the hottest, plus first-time buyers
+    def clicker():
+        if customers and rnd.random() < 0.7:
+            return customers[min(len(customers) - 1, int(rnd.paretovariate(1.2)) - 1)]
+        return fleetgen.USER_BASE + 900_000_000 + rnd.randrange(1_000_000)
+
+    view = ShopView()
+    paths = [("legacy (6 queries)", legacy_order_button),
+             ("cache + eligibility", view.order_button.callback)]
+
+    results = []
+    for label, handler in paths:
+        for phase, n, concurrent in (("sequential", clicks, False), ("rush", rush, True)):
+            SHOP_CACHE.invalidate()
+            profiler.reset()
+            connections[0] = 0
+            interactions = [FakeInteraction(guild, FakeMember(guild, user_id=clicker())) for _ in range(n)]
+            samples = []
+
+            async def click(interaction):
+                started = time.perf_counter()
+                await handler(interaction)
+                samples.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            if concurrent:
+                await asyncio.gather(*(click(i) for i in interactions))
+            else:
+                for i in interactions:
+                    await click(i)
+            elapsed = time.perf_counter() - started
+            statements = sum(s.calls for s in profiler.shapes.values())
+            results.append((label, phase, n, elapsed, percentiles(samples),
+                            connections[0] / n, statements / n))
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tier", default="medium", help=f"one of {', '.join(fleetgen.TIERS)}")
+    ap.add_argument("--db", help="use this existing database instead of a generated tier")
+    ap.add_argument("--guild", type=int, help="shop guild id (default: the one with most orders)")
+    ap.add_argument("--dir", default=os.path.join(tempfile.gettempdir(), "hubix-fleet"), help="where tier databases are cached")
+    ap.add_argument("--clicks", type=int, default=300, help="sequential clicks per path")
+    ap.add_argument("--rush", type=int, default=300, help="concurrent clicks per path")
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    source = a.db
+    if not source:
+        os.makedirs(a.dir, exist_ok=True)
+        source = os.path.join(a.dir, f"fleet-{a.tier}-s{a.seed}.db")
+        if not os.path.exists(source):
+            fleetgen.generate(source, a.tier, seed=a.seed)
+    path, guild_id, customers = prepare(source, a.guild)
+
+    results = asyncio.run(run(path, guild_id, customers, a.clicks, a.rush, a.seed))
+
+    print(f"\n  Order Now on guild {guild_id} ({len(customers)} customers) — ms to interaction response\n")
+    print(f"  {'path':<22}{'phase':<12}{'clicks':>7}{'clicks/s':>10}{'p50':>9}{'p99':>9}{'max':>9}{'conns':>8}{'stmts':>8}")
+    for label, phase, n, elapsed, (p50, p99, worst), conns, stmts in results:
+        print(f"  {label:<22}{phase:<12}{n:>7}{n / elapsed:>10.0f}{p50:>9.2f}{p99:>9.2f}{worst:>9.2f}{conns:>8.2f}{stmts:>8.2f}")
+    print(f"\n  shop cache: {SHOP_CACHE.stats()}")
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Order history paging at 100k orders per guild.
+
+    python -m benchmarks.order_pages
+    python -m benchmarks.order_pages --orders 250000 --clicks 300
+
+Builds a temporary nexify.db with one shop of --orders orders (a few heavy
+customers, realistic status mix, timestamps spread over two years) and
+compares, in ms p50 / p99:
+
+  first page      get_all_orders(limit=50) / get_user_orders (previous)
+                  vs get_orders_page, for the shop, a status filter and
+                  the heaviest customer
+  deep pages      LIMIT/OFFSET at increasing depth vs the keyset page
+                  reached by walking there
+  counts          len() over the materialized list vs count_orders
+  clicks          OrderHistoryView "Older ▶" presses, end to end
+
+then repeats the keyset pages with the pagination indexes dropped.
+"""
+
+import argparse
+import asyncio
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.fakes import FakeGuild, FakeInteraction, FakeMember, use_temp_db
+import utils.database as database
+from cogs.orders import OrderHistoryView
+
+STATUS_MIX = (("delivered", 70), ("pending", 12), ("cancelled", 10), ("processing", 5), ("refunded", 3))
+PAGE_INDEXES = ("idx_orders_page", "idx_orders_status_page", "idx_orders_user_page")
+
+
+def populate(path, guild_id, orders, seed):
+    rnd = random.Random(seed)
+    statuses, weights = zip(*STATUS_MIX)
+    start = datetime(2024, 1, 1)
+    db = sqlite3.connect(path)
+    rows = []
+    for n in range(1, orders + 1):
+        # A handful of whales, a long tail of one-off buyers
+        user = 500 + (int(rnd.paretovariate(1.1)) if rnd.random() < 0.3 else rnd.randrange(orders // 3))
+        created = (start + timedelta(seconds=n * 600 + rnd.randrange(600))).strftime("%Y-%m-%d %H:%M:%S")
+        rows.append((guild_id, n, user, 1 + n % 40, f"Product {n % 40}", float(rnd.choice((2, 5, 10, 20))),
+                     rnd.choices(statuses, weights)[0], created, created))
+    with db:
+        db.executemany(
+            "INSERT INTO orders (guild_id, order_number, user_id, product_id, product_name, price, status, "
+            "created_at, updated_at) VALUES (?,?,?,?,?,?,?,?,?)", rows)
+    whale = db.execute("SELECT user_id FROM orders WHERE guild_id=? GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1",
+                       (guild_id,)).fetchone()[0]
+    db.close()
+    return whale
+
+
+def stats(samples):
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2] * 1000, ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+
+
+async def timed(fn, runs):
+    await fn()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return stats(samples)
+
+
+async def offset_page(guild_id, offset, limit=10):
+    async with database._connect() as db:
+        c = await db.execute(
+            "SELECT * FROM orders WHERE guild_id=? ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (guild_id, limit, offset))
+        return await c.fetchall()
+
+
+async def cursor_at(guild_id, depth, limit=10):
+    """(created_at, id) of the last order on page `depth`, found by walking there."""
+    cursor = None
+    for _ in range(depth):
+        page = await database.get_orders_page(guild_id, before=cursor, limit=limit)
+        cursor = (page[-1]["created_at"], page[-1]["id"])
+    return cursor
+
+
+async def run(orders, runs, clicks, seed):
+    path = use_temp_db()
+    await database.init_db()
+    guild_id = 900_000_000_000_000_001
+    whale = populate(path, guild_id, orders, seed)
+
+    rows = []
+    add = lambda label, legacy, keyset: rows.append((label, legacy, keyset))
+
+    add("first page: shop", await timed(lambda: database.get_all_orders(guild_id), runs),
+        await timed(lambda: database.get_orders_page(guild_id), runs))
+    add("first page: pending", await timed(lambda: database.get_all_orders(guild_id, "pending"), runs),
+        await timed(lambda: database.get_orders_page(guild_id, status="pending"), runs))
+    add("first page: customer", await timed(lambda: database.get_user_orders(guild_id, whale), runs),
+        await timed(lambda: database.get_orders_page(guild_id, user_id=whale), runs))
+
+    depths = [d for d in (10, 100, 1000, orders // 10 - 1) if d * 10 < orders]
+    cursors = {}
+    for depth in depths:
+        cursors[depth] = await cursor_at(guild_id, depth)
+        add(f"page {depth + 1}", await timed(lambda: offset_page(guild_id, depth * 10), runs),
+            await timed(lambda: database.get_orders_page(guild_id, before=cursors[depth]), runs))
+
+    async def count_list(**kw):
+        return len(await database.get_all_orders(guild_id, limit=orders, **kw))
+    add("count: shop", await timed(count_list, max(3, runs // 10)),
+        await timed(lambda: database.count_orders(guild_id), runs))
+    add("count: customer", await timed(lambda: database.get_user_orders(guild_id, whale, "delivered"), runs),
+        await timed(lambda: database.count_orders(guild_id, whale), runs))
+
+    guild = FakeGuild("shop", guild_id=guild_id)
+    view = OrderHistoryView(guild_id)
+    await view.load()
+    samples = []
+    for _ in range(clicks):
+        interaction = FakeInteraction(guild, FakeMember(guild))
+        started = time.perf_counter()
+        await view.next_btn.callback(interaction)
+        samples.append(time.perf_counter() - started)
+    click_stats = stats(samples), view.page + 1
+
+    db = sqlite3.connect(path)
+    for name in PAGE_INDEXES:
+        db.execute(f"DROP INDEX {name}")
+    db.commit()
+    db.close()
+    unindexed = [
+        ("first page: shop", await timed(lambda: database.get_orders_page(guild_id), runs)),
+        ("first page: pending", await timed(lambda: database.get_orders_page(guild_id, status="pending"), runs)),
+        (f"page {depths[-1] + 1}", await timed(lambda: database.get_orders_page(guild_id, before=cursors[depths[-1]]), runs)),
+    ]
+    return rows, click_stats, unindexed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--orders", type=int, default=100_000)
+    ap.add_argument("--runs", type=int, default=50)
+    ap.add_argument("--clicks", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    rows, ((click_p50, click_p99), reached), unindexed = asyncio.run(run(a.orders, a.runs, a.clicks, a.seed))
+
+    print(f"\n  Order history, {a.orders:,} orders in one guild — p50 / p99 ms\n")
+    print(f"  {'':<24}{'previous / OFFSET':>22}{'keyset':>20}")
+    for label, (l50, l99), (k50, k99) in rows:
+        print(f"  {label:<24}{f'{l50:.2f} / {l99:.2f}':>22}{f'{k50:.2f} / {k99:.2f}':>20}")
+    print(f"\n  'Older ▶' clicks: {a.clicks} presses to page {reached}, {click_p50:.2f} / {click_p99:.2f} ms")
+    print("\n  keyset without the pagination indexes:")
+    for label, (p50, p99) in unindexed:
+        print(f"  {label:<24}{f'{p50:.2f} / {p99:.2f}':>42}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Latency of the real utils.database query functions across fleet sizes.
+
+    python -m benchmarks.query_suite                          # small, medium, large
+    python -m benchmarks.query_suite --tiers small,xl --runs 50
+    python -m benchmarks.query_suite --db /path/to/copy-of-nexify.db
+
+Each tier's database is built once by benchmarks.fleetgen and cached under
+--dir. Guild/user arguments are looked up from the data: by default the
+busiest guild and its hottest users (--target median for a typical guild).
+Reports p50 / p99 milliseconds per function per tier; the large tier holds
+~1M invite_tracks, which is where the join-backed invite queries show up.
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+from benchmarks import fleetgen
+import utils.database as database
+
+# (label, function name, argument names resolved from Params)
+QUERIES = [
+    ("get_invite_leaderboard", "get_invite_leaderboard", ("guild",)),
+    ("get_user_invite_stats", "get_user_invite_stats", ("guild", "inviter")),
+    ("get_invite_list", "get_invite_list", ("guild", "inviter")),
+    ("get_invited_by", "get_invited_by", ("guild", "member")),
+    ("get_active_warns", "get_active_warns", ("guild", "warned")),
+    ("get_all_warns", "get_all_warns", ("guild", "warned")),
+    ("get_action_log", "get_action_log", ("guild",)),
+    ("get_action_log (user)", "get_action_log", ("guild", "warned")),
+    ("get_ticket_stats", "get_ticket_stats", ("guild",)),
+    ("get_all_open_tickets", "get_all_open_tickets", ("guild",)),
+    ("get_ticket_messages", "get_ticket_messages", ("ticket",)),
+    ("get_order_stats", "get_order_stats", ("shop",)),
+    ("get_all_orders", "get_all_orders", ("shop",)),
+    ("get_user_orders", "get_user_orders", ("shop", "customer")),
+    ("get_orders_page", "get_orders_page", ("shop",)),
+    ("get_orders_page (user)", "get_orders_page", ("shop", "customer")),
+    ("count_orders", "count_orders", ("shop",)),
+    ("get_reviews", "get_reviews", ("shop",)),
+    ("get_average_rating", "get_average_rating", ("shop",)),
+    ("get_review_count", "get_review_count", ("shop",)),
+    ("get_product_ratings", "get_product_ratings", ("shop",)),
+    ("get_subscription_stats", "get_subscription_stats", ()),
+    ("get_all_subscriptions", "get_all_subscriptions", ()),
+    ("get_active_subscriptions", "get_active_subscriptions", ()),
+    ("get_expiring_soon", "get_expiring_soon", ()),
+    ("get_subscription_logs", "get_subscription_logs", ()),
+    ("get_license_key_stats", "get_license_key_stats", ()),
+    ("get_all_license_keys", "get_all_license_keys", ()),
+    ("get_active_giveaways", "get_active_giveaways", ()),
+]
+
+
+def pick_params(path, target):
+    """Resolve the guild/user arguments from the data itself."""
+    db = sqlite3.connect(path)
+    one = lambda sql, *args: (db.execute(sql, args).fetchone() or (None,))[0]
+
+    def ranked(sql):
+        rows = [r[0] for r in db.execute(sql)]
+        if not rows:
+            return None
+        return rows[0] if target == "hot" else rows[len(rows) // 2]
+
+    p = {}
+    p["guild"] = ranked("SELECT guild_id FROM invite_counters GROUP BY guild_id ORDER BY SUM(total) DESC")
+    p["inviter"] = one("SELECT inviter_id FROM invite_counters WHERE guild_id=? ORDER BY total DESC LIMIT 1", p["guild"])
+    p["member"] = one("SELECT invited_id FROM invite_tracks WHERE guild_id=? ORDER BY id DESC LIMIT 1", p["guild"])
+    p["warned"] = one("SELECT user_id FROM automod_warns WHERE guild_id=? GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1", p["guild"])
+    p["ticket"] = one("SELECT m.ticket_id FROM ticket_messages m JOIN tickets t ON t.id = m.ticket_id "
+                      "WHERE t.guild_id=? GROUP BY m.ticket_id ORDER BY COUNT(*) DESC LIMIT 1", p["guild"])
+    p["shop"] = ranked("SELECT guild_id FROM orders GROUP BY guild_id ORDER BY COUNT(*) DESC")
+    p["customer"] = one("SELECT user_id FROM orders WHERE guild_id=? GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1", p["shop"])
+    db.close()
+    return p
+
+
+async def measure(path, params, runs, budget):
+    database.DB_PATH = path
+    await database.init_db()   # migrate cached tier files to the current schema
+    results = {}
+    for label, fn_name, arg_names in QUERIES:
+        fn = getattr(database, fn_name)
+        args = [params[a] for a in arg_names]
+        await fn(*args)  # warm the page cache
+        samples = []
+        spent = 0.0
+        while len(samples) < runs and (spent < budget or len(samples) < 3):
+            started = time.perf_counter()
+            await fn(*args)
+            samples.append(time.perf_counter() - started)
+            spent += samples[-1]
+        samples.sort()
+        results[label] = (samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))])
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tiers", default="small,medium,large", help=f"comma list of {', '.join(fleetgen.TIERS)}")
+    ap.add_argument("--db", help="benchmark this existing database instead of generated tiers")
+    ap.add_argument("--dir", default=os.path.join(tempfile.gettempdir(), "hubix-fleet"), help="where tier databases are cached")
+    ap.add_argument("--rebuild", action="store_true", help="regenerate cached tier databases")
+    ap.add_argument("--target", choices=("hot", "median"), default="hot")
+    ap.add_argument("--runs", type=int, default=30)
+    ap.add_argument("--budget", type=float, default=3.0, help="max seconds spent timing one query on one tier")
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    if a.db:
+        targets = [(os.path.basename(a.db), a.db)]
+    else:
+        os.makedirs(a.dir, exist_ok=True)
+        targets = []
+        for tier in a.tiers.split(","):
+            path = os.path.join(a.dir, f"fleet-{tier}-s{a.seed}.db")
+            if a.rebuild or not os.path.exists(path):
+                started = time.perf_counter()
+                counts = fleetgen.generate(path, tier, seed=a.seed)
+                print(f"  built {tier:<7} in {time.perf_counter() - started:5.1f}s  "
+                      f"({counts['invite_tracks']:,} invite_tracks, {counts['ticket_messages']:,} ticket_messages, "
+                      f"{counts['automod_actions']:,} automod_actions, {counts['orders']:,} orders)")
+            targets.append((tier, path))
+
+    table = {}
+    for name, path in targets:
+        params = pick_params(path, a.target)
+        table[name] = asyncio.run(measure(path, params, a.runs, a.budget))
+
+    width = 20
+    print(f"\n  utils.database latency, {a.target} guild — p50 / p99 ms\n")
+    print(f"  {'query':<26}" + "".join(f"{name:>{width}}" for name, _ in targets))
+    for label, _, _ in QUERIES:
+        cells = "".join(f"{f'{table[n][label][0] * 1000:.2f} / {table[n][label][1] * 1000:.2f}':>{width}}" for n, _ in targets)
+        print(f"  {label:<26}{cells}")
+
+
+if __name__ == "__main__":
+    main()
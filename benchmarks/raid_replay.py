@@ -0,0 +1,110 @@
+"""
+Replay a join raid through the real Invites and Utility join listeners.
+
+    python -m benchmarks.raid_replay --joins 5000 --duration 5
+    python -m benchmarks.raid_replay --joins 5000 --no-raid-mode   # per-member baseline
+
+Reports REST calls (invite fetches, embeds, add_roles), attribution accuracy
+and wall time against a temporary database.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import aiosqlite
+
+from benchmarks.fakes import FakeBot, FakeGuild, use_temp_db
+import utils.database as database
+from utils.joinburst import JoinBurstDetector
+
+
+async def replay(joins, duration, inviters, rest_latency, raid_mode, seed):
+    use_temp_db()
+    await database.init_db()
+
+    from cogs.invites import Invites
+    from cogs.utility import Utility
+
+    guild = FakeGuild("raid-target", rest_latency=rest_latency)
+    invite_log = guild.add_channel("invite-log")
+    member_log = guild.add_channel("member-log")
+    auto_role = guild.add_role("Member", position=5)
+    owners = [guild.add_member(f"inviter{i}") for i in range(inviters)]
+    for i, owner in enumerate(owners):
+        guild.add_invite(f"code{i}", owner)
+
+    await database.set_invite_log_channel(guild.id, invite_log.id)
+    await database.update_logging_setting(guild.id, "enabled", 1)
+    await database.update_logging_setting(guild.id, "log_channel_id", member_log.id)
+    await database.set_auto_role(guild.id, auto_role.id)
+
+    bot = FakeBot([guild])
+    if not raid_mode:
+        bot.join_bursts = JoinBurstDetector(threshold=joins + 1)
+    invites, utility = Invites(bot), Utility(bot)
+    await invites.cache_guild_invites(guild)
+    guild.stats["invites_calls"] = 0
+
+    rnd = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(inviters)]   # a few hot inviters
+    truth = {}
+    tasks = []
+    gap = duration / joins if joins else 0
+    started = time.perf_counter()
+    for n in range(joins):
+        idx = rnd.choices(range(inviters), weights)[0]
+        guild.invite_list[idx].uses += 1
+        member = guild.add_member(f"raider{n}", age_days=rnd.choice((0, 1, 3, 400)))
+        truth[member.id] = owners[idx].id
+        # discord.py dispatches every listener as its own task
+        tasks.append(asyncio.create_task(invites.on_member_join(member)))
+        tasks.append(asyncio.create_task(utility.on_member_join(member)))
+        if gap:
+            await asyncio.sleep(gap)
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    errors = [r for r in results if isinstance(r, Exception)]
+    await invites.join_batcher.drain()
+    await utility.join_batcher.drain()
+    elapsed = time.perf_counter() - started
+
+    async with aiosqlite.connect(database.DB_PATH) as db:
+        c = await db.execute("SELECT invited_id, inviter_id FROM invite_tracks WHERE guild_id=?", (guild.id,))
+        tracked = dict(await c.fetchall())
+    # Invite diffs can't tell which of two simultaneous joins used which code,
+    # so count per-inviter totals rather than per-member matches.
+    expected, got = {}, {}
+    for uid in truth.values():
+        expected[uid] = expected.get(uid, 0) + 1
+    for uid in tracked.values():
+        got[uid] = got.get(uid, 0) + 1
+    matched = sum(min(expected[u], got.get(u, 0)) for u in expected)
+
+    print(f"\n  Join replay — {'raid mode' if raid_mode else 'per-member'}")
+    print(f"  {'joins':<28}{joins}")
+    print(f"  {'wall time':<28}{elapsed:.2f}s")
+    print(f"  {'guild.invites() calls':<28}{guild.stats['invites_calls']}")
+    print(f"  {'messages sent':<28}{guild.stats['messages_sent']}"
+          f"  (invite log {len(invite_log.sent)}, member log {len(member_log.sent)})")
+    print(f"  {'add_roles calls':<28}{guild.stats['add_roles']}")
+    print(f"  {'joins tracked':<28}{len(tracked)}")
+    print(f"  {'listener errors':<28}{len(errors)}"
+          + (f"  (first: {type(errors[0]).__name__}: {errors[0]})" if errors else ""))
+    print(f"  {'attribution accuracy':<28}{matched / joins:.1%}" if joins else "")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--joins", type=int, default=5000)
+    ap.add_argument("--duration", type=float, default=5.0, help="seconds the burst is spread over")
+    ap.add_argument("--inviters", type=int, default=25)
+    ap.add_argument("--rest-latency", type=float, default=0.0, help="simulated seconds per REST call")
+    ap.add_argument("--no-raid-mode", action="store_true", help="disable the burst detector for comparison")
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+    asyncio.run(replay(a.joins, a.duration, a.inviters, a.rest_latency, not a.no_raid_mode, a.seed))
+
+
+if __name__ == "__main__":
+    main()
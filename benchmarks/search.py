@@ -0,0 +1,210 @@
+"""
+Full-text search over a million ticket messages.
+
+    python -m benchmarks.search                       # 1M messages, 2000 guilds
+    python -m benchmarks.search --messages 200000 --guilds 500
+
+Builds a temporary nexify.db: tickets spread over guilds with a Pareto size
+skew, messages drawn from a Zipf-distributed vocabulary plus common support
+phrases, and orders with delivery notes. Messages are bulk loaded with the
+search triggers off and indexed with one FTS5 'rebuild' (timed), then a
+further --incremental messages go in through save_ticket_message with and
+without the triggers to show the per-write cost.
+
+Reports index size per FTS table (dbstat) against the table it covers, and
+p50 / p99 ms of search_tickets / search_orders for the busiest and a median
+guild on rare, common, multi-word and prefix queries, next to the LIKE
+'%word%' scan staff would otherwise run.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sqlite3
+import time
+
+from benchmarks.fakes import use_temp_db
+import utils.database as database
+
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "po", "qu", "xi", "da", "fe", "gu", "hi")
+PHRASES = ("my order hasn't arrived", "can you check this please", "thanks", "any update", "paypal refund",
+           "nitro boost delivery", "still waiting", "resolved thank you", "wrong account details", "screenshot attached")
+CATEGORIES = ("General", "Billing", "Support", "Report", "Partnership")
+
+
+def vocabulary(n, rnd):
+    words = set()
+    while len(words) < n:
+        words.add("".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4))))
+    return sorted(words)
+
+
+def populate(path, messages, guilds, vocab_size, seed):
+    rnd = random.Random(seed)
+    vocab = vocabulary(vocab_size, rnd)
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    cum = list(itertools.accumulate(weights))
+
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA synchronous=OFF")
+    for name in database.SEARCH_TRIGGERS:
+        db.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    sizes = [rnd.paretovariate(1.2) for _ in range(guilds)]
+    total = sum(sizes)
+    tickets, msgs, orders = [], [], []
+    ticket_id = 0
+    for g, size in enumerate(sizes):
+        guild_id = 900_000_000_000_000_000 + g
+        n_msgs = max(1, int(messages * size / total))
+        n_tickets = max(1, n_msgs // 12)
+        first = ticket_id + 1
+        for t in range(n_tickets):
+            ticket_id += 1
+            closed = rnd.random() < 0.8
+            tickets.append((ticket_id, guild_id, 800_000_000_000_000_000 + ticket_id, 700_000_000_000_000_000 + rnd.randrange(10 ** 6),
+                            rnd.choice(CATEGORIES), t + 1, "closed" if closed else "open",
+                            rnd.choice(("resolved", "duplicate request", "no response", "refund issued")) if closed else None))
+        for _ in range(n_msgs):
+            words = rnd.choices(vocab, cum_weights=cum, k=rnd.randint(3, 14))
+            if rnd.random() < 0.4:
+                words.insert(rnd.randrange(len(words) + 1), rnd.choice(PHRASES))
+            msgs.append((rnd.randint(first, ticket_id), 700_000_000_000_000_000 + rnd.randrange(10 ** 6),
+                         f"user{rnd.randrange(5000)}", " ".join(words)))
+        for n in range(max(1, n_msgs // 40)):
+            notes = " ".join(rnd.choices(vocab, cum_weights=cum, k=rnd.randint(2, 8)))
+            orders.append((guild_id, n + 1, 700_000_000_000_000_000 + rnd.randrange(10 ** 6), 1,
+                           rnd.choice(("Nitro Boost", "Discord Account", "Server Setup", "Custom Bot")),
+                           float(rnd.choice((5, 10, 20))), "delivered", notes))
+    with db:
+        db.executemany("INSERT INTO tickets (id, guild_id, channel_id, user_id, category_name, ticket_number, status, "
+                       "close_reason) VALUES (?,?,?,?,?,?,?,?)", tickets)
+        db.executemany("INSERT INTO ticket_messages (ticket_id, user_id, username, content) VALUES (?,?,?,?)", msgs)
+        db.executemany("INSERT INTO orders (guild_id, order_number, user_id, product_id, product_name, price, status, "
+                       "delivery_info) VALUES (?,?,?,?,?,?,?,?)", orders)
+
+    started = time.perf_counter()
+    for table in database.SEARCH_TABLES:
+        db.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+    for name, body in database.SEARCH_TRIGGERS.items():
+        db.execute(f"CREATE TRIGGER {name} {body}")
+    db.commit()
+    rebuild = time.perf_counter() - started
+
+    busiest = db.execute("SELECT guild_id FROM tickets GROUP BY guild_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+    ranked = [r[0] for r in db.execute("SELECT guild_id FROM tickets GROUP BY guild_id ORDER BY COUNT(*) DESC")]
+    db.close()
+    return vocab, rebuild, {"busiest": busiest, "median": ranked[len(ranked) // 2]}, len(msgs)
+
+
+def sizes(path):
+    db = sqlite3.connect(path)
+    pages = dict(db.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+    db.close()
+    fts = lambda t: sum(v for k, v in pages.items() if k.startswith(t + "_"))
+    return [
+        ("ticket_message_fts", fts("ticket_message_fts"), "ticket_messages", pages.get("ticket_messages", 0)),
+        ("ticket_fts", fts("ticket_fts"), "tickets", pages.get("tickets", 0)),
+        ("order_fts", fts("order_fts"), "orders", pages.get("orders", 0)),
+    ], os.path.getsize(path)
+
+
+async def timed(fn, runs):
+    await fn()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+
+
+async def like_scan(guild_id, word):
+    async with database._connect() as db:
+        c = await db.execute(
+            "SELECT t.id, COUNT(*) FROM ticket_messages m JOIN tickets t ON t.id = m.ticket_id "
+            "WHERE t.guild_id=? AND m.content LIKE ? GROUP BY t.id LIMIT 10",
+            (guild_id, f"%{word}%"))
+        return await c.fetchall()
+
+
+async def incremental(n, ticket_ids, rnd, vocab):
+    """Messages/sec through save_ticket_message, with the search triggers as configured."""
+    started = time.perf_counter()
+    await asyncio.gather(*(database.save_ticket_message(
+        rnd.choice(ticket_ids), 1, "bench", " ".join(rnd.choices(vocab[:2000], k=8))) for _ in range(n)))
+    return n / (time.perf_counter() - started)
+
+
+async def run(path, vocab, guilds, runs, incremental_n, seed):
+    rnd = random.Random(seed)
+    queries = [
+        ("rare word", vocab[3000]),
+        ("common word", vocab[0]),
+        ("two words", f"{vocab[0]} {vocab[5]}"),
+        ("prefix (3 chars)", vocab[1][:3] + "*"),
+        ("phrase words", "paypal refund"),
+    ]
+    rows = []
+    for label, guild_id in guilds.items():
+        for qlabel, q in queries:
+            hits = len(await database.search_tickets(guild_id, q, 10))
+            fts = await timed(lambda: database.search_tickets(guild_id, q, 10), runs)
+            like = await timed(lambda: like_scan(guild_id, q.split()[0].rstrip("*")), max(3, runs // 5))
+            rows.append((f"{label}: {qlabel}", hits, fts, like))
+        orders = await timed(lambda: database.search_orders(guild_id, vocab[3], 10), runs)
+        rows.append((f"{label}: orders", len(await database.search_orders(guild_id, vocab[3], 10)), orders, None))
+
+    db = sqlite3.connect(path)
+    ticket_ids = [r[0] for r in db.execute("SELECT id FROM tickets ORDER BY RANDOM() LIMIT 1000")]
+    db.close()
+    with_triggers = await incremental(incremental_n, ticket_ids, rnd, vocab)
+    db = sqlite3.connect(path)
+    for name in database.SEARCH_TRIGGERS:
+        db.execute(f"DROP TRIGGER {name}")
+    db.commit()
+    db.close()
+    without = await incremental(incremental_n, ticket_ids, rnd, vocab)
+    await database.close_write_queue()
+    return rows, with_triggers, without
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=1_000_000)
+    ap.add_argument("--guilds", type=int, default=2000)
+    ap.add_argument("--vocab", type=int, default=30_000)
+    ap.add_argument("--runs", type=int, default=30)
+    ap.add_argument("--incremental", type=int, default=20_000)
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    path = use_temp_db()
+    asyncio.run(database.init_db())
+    started = time.perf_counter()
+    vocab, rebuild, guilds, loaded = populate(path, a.messages, a.guilds, a.vocab, a.seed)
+    print(f"  loaded {loaded:,} messages in {time.perf_counter() - started - rebuild:.1f}s, "
+          f"FTS rebuild {rebuild:.1f}s")
+
+    index_sizes, file_size = sizes(path)
+    rows, with_triggers, without = asyncio.run(run(path, vocab, guilds, a.runs, a.incremental, a.seed))
+
+    print(f"\n  Index size (database file {file_size / 2 ** 20:.0f} MiB)\n")
+    for fts, fts_bytes, table, table_bytes in index_sizes:
+        print(f"  {fts:<20}{fts_bytes / 2 ** 20:>8.1f} MiB   {table:<16}{table_bytes / 2 ** 20:>8.1f} MiB"
+              f"   ({fts_bytes / max(table_bytes, 1):.2f}x)")
+
+    print("\n  Search latency — p50 / p99 ms (10 results)\n")
+    print(f"  {'query':<28}{'hits':>6}{'FTS5':>20}{'LIKE scan':>22}")
+    for label, hits, (f50, f99), like in rows:
+        like_cell = f"{like[0]:.2f} / {like[1]:.2f}" if like else "-"
+        print(f"  {label:<28}{hits:>6}{f'{f50:.2f} / {f99:.2f}':>20}{like_cell:>22}")
+
+    print(f"\n  save_ticket_message: {with_triggers:,.0f}/s with search triggers, {without:,.0f}/s without")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Time /setupserver's build against a fake guild with Discord-style route limits.
+
+    python -m benchmarks.setup_replay --rest-latency 0.15
+
+Runs four scenarios on fresh fake guilds:
+  sequential   one step at a time, no pacing (how the old setup issued calls)
+  parallel     the dependency-graph executor with per-route budgets
+  rerun        parallel again on the already-built guild (diff only)
+  resume       parallel run killed part-way, then run again
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.fakes import FakeBot, FakeGuild, use_temp_db
+import utils.database as database
+
+# What Discord typically hands back for these buckets
+FAKE_RATE_LIMITS = {
+    "roles": (5, 5.0),
+    "channels": (5, 5.0),
+    "channel": (5, 5.0),
+    "messages": (5, 5.0),
+    "members": (5, 5.0),
+    "guild": (2, 5.0),
+}
+
+
+def make_guild(latency, junk):
+    guild = FakeGuild("Old Server", rest_latency=latency, rate_limits=FAKE_RATE_LIMITS)
+    old = guild.add_channel("Text Channels", kind="category")
+    guild.add_channel("💬│general", category=old)
+    for i in range(junk):
+        guild.add_channel(f"old-{i}", category=old)
+    owner = guild.add_member("owner")
+    return guild, owner
+
+
+async def build(cog, guild, owner, concurrency=None, paced=True, kill_after=None):
+    from cogs import server_setup
+
+    progress = await database.get_setup_progress(guild.id)
+    graph, roles, channels = cog.build_setup_graph(guild, owner, progress)
+    if not paced:
+        graph.route_limits = {k: (1e9, 1e9) for k in server_setup.SETUP_ROUTE_LIMITS}
+        graph.default_rate = 1e9
+    done = {"n": 0}
+
+    async def on_step(key, outcome):
+        done["n"] += 1
+        if outcome[0] == "done" and outcome[1][0] is not None:
+            await database.record_setup_step(guild.id, key, outcome[1][0].id)
+
+    run = graph.run(concurrency or server_setup.SETUP_CONCURRENCY, on_step)
+    started = time.perf_counter()
+    if kill_after is None:
+        results = await run
+    else:
+        task = asyncio.create_task(run)
+        while done["n"] < kill_after:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        results = {}
+    failed = [k for k, r in results.items() if r[0] != "done"]
+    return time.perf_counter() - started, len(graph.steps), failed
+
+
+def snapshot(guild):
+    return dict(guild.stats), len(guild.roles), len(guild.channels)
+
+
+def report(label, elapsed, steps, failed, before, guild):
+    stats, _, _ = before
+    delta = {k: guild.stats[k] - stats[k] for k in guild.stats}
+    print(f"  {label:<12}{elapsed:>7.2f}s  steps {steps:<4}REST {delta['rest_calls']:<4}"
+          f"429s {delta['rate_limited']:<4}roles+{delta['roles_created']:<3}"
+          f"channels+{delta['channels_created']:<3}edits {delta['channel_edits']:<3}"
+          f"deleted {delta['channel_deletes']:<3}msgs {delta['messages_sent']:<3}"
+          + (f"  FAILED {failed[:3]}" if failed else ""))
+
+
+async def main(latency, junk):
+    use_temp_db()
+    await database.init_db()
+    from cogs.server_setup import ServerSetup
+
+    print(f"\n  /setupserver build — {latency * 1000:.0f}ms per REST call, {junk} stale channels\n")
+
+    guild, owner = make_guild(latency, junk)
+    cog = ServerSetup(FakeBot([guild]))
+    before = snapshot(guild)
+    report("sequential", *await build(cog, guild, owner, concurrency=1, paced=False), before, guild)
+
+    guild, owner = make_guild(latency, junk)
+    cog.bot = FakeBot([guild])
+    before = snapshot(guild)
+    report("parallel", *await build(cog, guild, owner), before, guild)
+
+    before = snapshot(guild)
+    report("rerun", *await build(cog, guild, owner), before, guild)
+    roles, channels = len(guild.roles), len(guild.channels)
+
+    guild, owner = make_guild(latency, junk)
+    cog.bot = FakeBot([guild])
+    before = snapshot(guild)
+    elapsed, steps, _ = await build(cog, guild, owner, kill_after=25)
+    report("killed@25", elapsed, steps, [], before, guild)
+    before = snapshot(guild)
+    report("resume", *await build(cog, guild, owner), before, guild)
+    print(f"\n  after resume: {len(guild.roles)} roles, {len(guild.channels)} channels "
+          f"(clean build: {roles} roles, {channels} channels)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rest-latency", type=float, default=0.15, help="simulated seconds per REST call")
+    ap.add_argument("--junk", type=int, default=20, help="stale channels the guild starts with")
+    a = ap.parse_args()
+    asyncio.run(main(a.rest_latency, a.junk))
@@ -0,0 +1,132 @@
+"""
+Shop panel rendering cost and refresh edit counts.
+
+    python -m benchmarks.shop_panel
+    python -m benchmarks.shop_panel --products 60 --writes 2000 --intervals 20
+
+Sets up one shop (products across categories, reviews, payment methods) in a
+temporary nexify.db and posts its panel to a fake channel. Then:
+
+  render   ms per panel build: the previous per-send path (get_products +
+           get_shop_settings + get_average_rating + embed), a cache hit,
+           and a re-render after a catalog write
+  refresh  --writes catalog writes (stock toggles, stock decrements, price
+           changes, reviews) spread over --intervals refresher passes;
+           reports panel edits made versus one edit per write
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.fakes import FakeGuild, use_temp_db
+import utils.database as database
+from utils.shoppanel import SHOP_PANELS, render_shop_panel
+
+
+def summary(samples):
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2] * 1000, ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+
+
+async def legacy_render(guild_id):
+    products = await database.get_products(guild_id)
+    settings = await database.get_shop_settings(guild_id)
+    rating = await database.get_average_rating(guild_id)
+    return render_shop_panel(products, settings, rating)
+
+
+async def timed_runs(fn, runs, before=None):
+    samples = []
+    for _ in range(runs):
+        if before:
+            await before()
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return summary(samples)
+
+
+async def run(products, reviews, writes, intervals, runs, seed):
+    use_temp_db()
+    await database.init_db()
+    rnd = random.Random(seed)
+    guild = FakeGuild("shop")
+    channel = guild.add_channel("shop")
+
+    await database.create_shop_settings(guild.id)
+    await database.update_shop_setting(guild.id, "enabled", 1)
+    await database.update_shop_setting(guild.id, "payment_methods", "💳 Card; (Visa, MC)\n🪙 Crypto; (LTC, BTC)")
+    pids = []
+    for i in range(products):
+        pids.append(await database.add_product(
+            guild.id, f"Product {i}", "", float(rnd.choice((2, 5, 10, 20))),
+            category=rnd.choice(("Accounts", "Boosts", "Services")),
+            stock_count=rnd.randint(writes, writes * 2) if i % 3 == 0 else None))
+    for i in range(reviews):
+        await database.add_review(guild.id, i + 1, rnd.randrange(1_000_000), rnd.choice((5, 5, 4, 3)))
+
+    # What SendShopPanelModal does
+    embed = await SHOP_PANELS.render(guild.id)
+    msg = await channel.send(embed=embed)
+    await database.update_shop_setting(guild.id, "panel_channel_id", channel.id)
+    await database.update_shop_setting(guild.id, "panel_message_id", msg.id)
+    SHOP_PANELS.posted(guild.id, embed)
+
+    bump = lambda: database.toggle_product_stock(pids[0])
+    render = {
+        "per-send (3 queries)": await timed_runs(lambda: legacy_render(guild.id), runs),
+        "cached": await timed_runs(lambda: SHOP_PANELS.render(guild.id), runs),
+        "after a write": await timed_runs(lambda: SHOP_PANELS.render(guild.id), runs, before=bump),
+    }
+
+    actions = (
+        lambda: database.toggle_product_stock(rnd.choice(pids)),
+        lambda: database.decrement_stock(rnd.choice(pids[::3])),
+        lambda: database.update_product(rnd.choice(pids), "price", float(rnd.choice((2, 5, 10, 20)))),
+        lambda: database.add_review(guild.id, reviews + rnd.randrange(10 ** 9), rnd.randrange(1_000_000), rnd.choice((5, 4, 1))),
+    )
+    edits_before = guild.stats["message_edits"]
+    renders_before = SHOP_PANELS.renders
+    per_pass = max(1, writes // intervals)
+    done = 0
+    started = time.perf_counter()
+    while done < writes:
+        for _ in range(min(per_pass, writes - done)):
+            await rnd.choice(actions)()
+            done += 1
+        await SHOP_PANELS.refresh(guild.get_channel)
+    elapsed = time.perf_counter() - started
+    return render, {
+        "writes": writes,
+        "passes": -(-writes // per_pass),
+        "edits": guild.stats["message_edits"] - edits_before,
+        "renders": SHOP_PANELS.renders - renders_before,
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--products", type=int, default=40)
+    ap.add_argument("--reviews", type=int, default=500)
+    ap.add_argument("--writes", type=int, default=1000)
+    ap.add_argument("--intervals", type=int, default=10, help="refresher passes the writes are spread over")
+    ap.add_argument("--runs", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    render, refresh = asyncio.run(run(a.products, a.reviews, a.writes, a.intervals, a.runs, a.seed))
+
+    print(f"\n  Shop panel render, {a.products} products / {a.reviews} reviews — p50 / p99 ms\n")
+    for label, (p50, p99) in render.items():
+        print(f"  {label:<24}{p50:>8.3f} / {p99:.3f}")
+    print(f"\n  Refresh: {refresh['writes']} catalog writes over {refresh['passes']} passes "
+          f"-> {refresh['edits']} panel edits, {refresh['renders']} renders "
+          f"(one edit per write would be {refresh['writes']})")
+    print(f"  {SHOP_PANELS.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,102 @@
 import discord
 from discord.ext import commands
+from discord import app_commands
 import os
+import sys
 import asyncio
-from config import BOT_TOKEN, PREFIX, OWNER_ID
-from utils.database import init_db
+import contextlib
+import cProfile
+import hashlib
+import json
+import pstats
+import time
+from config import BOT_TOKEN, PREFIX, OWNER_ID, DEV_GUILD_IDS
+from utils.database import init_db, get_command_sync, set_command_sync, close_write_queue
 from api import BotAPI
+from utils import metrics
+from utils.queryprofile import PROFILER as QUERY_PROFILER
+from utils.looplag import LoopLagMonitor
+from utils.membercache import MEMBER_CACHE, chunk_at_startup, member_cache_flags
+from utils.memberstats import PRESENCE_INTENT
+
+
+def tree_fingerprint(tree, guild=None):
+    """Hash of the payload tree.sync() would upload for `guild` (None = global)."""
+    payload = [cmd.to_dict(tree) for cmd in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+# Loaded in the background after setup_hook returns instead of holding it up
+DEFERRED_COGS = ("server_setup",)
+
+# discord.py's own Message cache (default 1000). Edit / delete logging reads
+# utils.msgcache instead, so this is only a fallback for recent messages.
+MAX_MESSAGES = int(os.getenv("MAX_MESSAGES", "100"))
+
+
+class HubixTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction):
+        # Stamp dispatch time; observed in on_app_command_completion / on_tree_error
+        interaction.extras["started"] = time.perf_counter()
+        return True
+
+
+def observe_command(interaction, failed=False):
+    started = interaction.extras.get("started")
+    command = interaction.command
+    if started is None or command is None:
+        return
+    name = command.qualified_name
+    metrics.COMMAND_SECONDS.observe(time.perf_counter() - started, name)
+    if failed:
+        metrics.ERRORS.inc(metrics.COMMAND_SECONDS.name, name)
 
 
 class Nexify(commands.Bot):
-    def __init__(self):
+    def __init__(self, profile_startup=False):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
         intents.guilds = True
+        intents.presences = PRESENCE_INTENT
+        self._instrumented = {}
         super().__init__(
-            command_prefix=PREFIX, intents=intents,
+            command_prefix=PREFIX, intents=intents, tree_cls=HubixTree, max_messages=MAX_MESSAGES or None,
+            member_cache_flags=member_cache_flags(), chunk_guilds_at_startup=chunk_at_startup(),
+            enable_raw_presences=PRESENCE_INTENT,   # counted for members the cache doesn't hold too
             activity=discord.Activity(type=discord.ActivityType.watching, name="hubix.dev | /help"),
             status=discord.Status.dnd
         )
         self._api_started = False
+        self.startup_timings = []
+        self._startup_began = time.perf_counter()
+        self._profiler = None
+        self.loop_lag = LoopLagMonitor()
+        if profile_startup:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def add_listener(self, func, name=None):
+        # Every Cog.listener goes through here; time it under hubix_event_seconds
+        name = name or func.__name__
+        wrapped = self._instrumented[(func, name)] = metrics.instrument_listener(func)
+        super().add_listener(wrapped, name)
+
+    def remove_listener(self, func, name=None):
+        name = name or func.__name__
+        super().remove_listener(self._instrumented.pop((func, name), func), name)
+
+    async def on_app_command_completion(self, interaction, command):
+        observe_command(interaction)
+
+    @contextlib.asynccontextmanager
+    async def _phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_timings.append((name, time.perf_counter() - started))
 
     async def setup_hook(self):
         print("=" * 55)
@@ -26,50 +104,125 @@ class Nexify(commands.Bot):
         print("  ║H║║U║║B║║I║║X║")
         print("  ╚═╝╚═╝╚═╝╚═╝╚═╝")
         print("=" * 55)
-        await init_db()
+        self.loop_lag.start()
+        async with self._phase("init_db"):
+            await init_db()
 
         # Start API server early so Render detects the port
         if not self._api_started:
             self._api_started = True
-            self.api = BotAPI(self)
-            await self.api.start()
+            async with self._phase("api start"):
+                self.api = BotAPI(self)
+                await self.api.start()
+
+        cogs_dir = os.path.join(os.path.dirname(__file__), "cogs")
+        names = sorted(f[:-3] for f in os.listdir(cogs_dir) if f.endswith(".py") and not f.startswith("_"))
+        eager = [n for n in names if n not in DEFERRED_COGS]
+        async with self._phase("cogs (concurrent)"):
+            results = await asyncio.gather(*(self._load_cog(n) for n in eager))
+        print(f"\n  📦 {sum(results)} loaded, {len(results) - sum(results)} failed, "
+              f"{len(names) - len(eager)} deferred")
 
-        # Register persistent views
-        from cogs.subscription import ClaimButtonView
-        self.add_view(ClaimButtonView())
+        # Register persistent views (modules are already imported by load_extension)
+        async with self._phase("views"):
+            if "cogs.subscription" in self.extensions:
+                from cogs.subscription import ClaimButtonView
+                self.add_view(ClaimButtonView())
+        print("=" * 55)
 
+        self.loop.create_task(self._finish_startup([n for n in names if n in DEFERRED_COGS]))
+
+    async def _load_cog(self, name):
+        started = time.perf_counter()
         try:
+            await self.load_extension(f"cogs.{name}")
+            print(f"  ✅ {name}")
+            return True
+        except Exception as e:
+            print(f"  ❌ {name}: {e}")
+            return False
+        finally:
+            self.startup_timings.append((f"  cog {name}", time.perf_counter() - started))
+
+    async def _finish_startup(self, deferred):
+        """Load deferred cogs, sync commands, then report where startup time went."""
+        for name in deferred:
+            await self._load_cog(name)
+        if "cogs.server_setup" in self.extensions:
             from cogs.server_setup import VerifyButtonView
             self.add_view(VerifyButtonView())
-        except ImportError:
-            pass
+        async with self._phase("command sync"):
+            await self.sync_commands()
+        self.print_startup_timings()
 
-        cogs_dir = os.path.join(os.path.dirname(__file__), "cogs")
-        loaded = failed = 0
-        for f in os.listdir(cogs_dir):
-            if f.endswith(".py") and not f.startswith("_"):
-                try:
-                    await self.load_extension(f"cogs.{f[:-3]}")
-                    print(f"  ✅ {f[:-3]}")
-                    loaded += 1
-                except Exception as e:
-                    print(f"  ❌ {f[:-3]}: {e}")
-                    failed += 1
-        print(f"\n  📦 {loaded} loaded, {failed} failed")
-        try:
-            synced = await self.tree.sync()
-            print(f"  📡 Synced {len(synced)} command(s)")
-        except Exception as e:
-            print(f"  ❌ Sync: {e}")
+    def print_startup_timings(self):
+        total = time.perf_counter() - self._startup_began
+        print("\n  ⏱️ Startup phases")
+        for name, seconds in self.startup_timings:
+            print(f"  {name:<28}{seconds * 1000:>9.1f} ms")
+        print(f"  {'total (since launch)':<28}{total * 1000:>9.1f} ms")
+        if self._profiler:
+            self._profiler.disable()
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup.prof")
+            self._profiler.dump_stats(path)
+            self._profiler = None
+            print(f"\n  🔬 Profile written to {path} — top 25 by cumulative time:")
+            pstats.Stats(path).sort_stats("cumulative").print_stats(25)
+            print("  For per-module import times run: python -X importtime bot.py")
         print("=" * 55)
 
+    async def sync_commands(self, force=False):
+        """Sync the command tree only where its fingerprint changed (or when forced).
+        With DEV_GUILD_IDS set, commands go to those guilds instead of globally.
+        Returns a list of (scope, status, detail) for reporting."""
+        targets = [None]
+        if DEV_GUILD_IDS:
+            targets = [discord.Object(id=gid) for gid in DEV_GUILD_IDS]
+            for guild in targets:
+                self.tree.copy_global_to(guild=guild)
+
+        report = []
+        for guild in targets:
+            scope = f"{self.application_id}:{guild.id if guild else 'global'}"
+            label = f"guild {guild.id}" if guild else "global"
+            fingerprint = tree_fingerprint(self.tree, guild)
+            last = await get_command_sync(scope)
+            if not force and last and last["fingerprint"] == fingerprint:
+                print(f"  ⏭️ {label}: commands unchanged, sync skipped (saved ~{last['duration']:.2f}s)")
+                report.append((label, "skipped", f"unchanged, saved ~{last['duration']:.2f}s"))
+                continue
+            started = time.perf_counter()
+            try:
+                synced = await self.tree.sync(guild=guild)
+            except Exception as e:
+                print(f"  ❌ Sync ({label}): {e}")
+                report.append((label, "failed", str(e)[:200]))
+                continue
+            duration = time.perf_counter() - started
+            await set_command_sync(scope, fingerprint, duration)
+            print(f"  📡 {label}: synced {len(synced)} command(s) in {duration:.2f}s")
+            report.append((label, "synced", f"{len(synced)} command(s) in {duration:.2f}s"))
+        return report
+
     async def on_ready(self):
         print(f"\n  🟢 {self.user} online!")
         print(f"  📊 {len(self.guilds)} servers | {sum(g.member_count or 0 for g in self.guilds)} users")
+        print(f"  👥 Member cache: {MEMBER_CACHE} ({sum(len(g.members) for g in self.guilds)} cached)")
         print("=" * 55)
 
+    async def close(self):
+        self.loop_lag.stop()
+        await super().close()
+        await close_write_queue()
+        if QUERY_PROFILER.enabled:
+            try:
+                QUERY_PROFILER.dump()
+            except OSError as e:
+                print(f"[QUERYPROFILE] Dump failed: {e}")
+
 
 async def on_tree_error(interaction, error):
+    observe_command(interaction, failed=True)
     if isinstance(error, discord.app_commands.MissingPermissions):
         e = discord.Embed(title="❌ Missing Permissions", color=0xED4245)
         e.description = f"Required: {', '.join([f'`{p}`' for p in error.missing_permissions])}"
@@ -91,7 +244,7 @@ def main():
     if not BOT_TOKEN:
         print("❌ BOT_TOKEN not found!")
         return
-    bot = Nexify()
+    bot = Nexify(profile_startup="--profile-startup" in sys.argv[1:])
     bot.tree.on_error = on_tree_error
     bot.run(BOT_TOKEN)
 
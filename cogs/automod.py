@@ -4,7 +4,7 @@ from discord import app_commands
 from datetime import datetime, timedelta, timezone
 import re
 import unicodedata
-from collections import defaultdict
+from collections import Counter, defaultdict
 from typing import Optional
 
 from utils.database import *
@@ -14,6 +14,11 @@ from utils.badwords import (
 )
 from config import EMBED_COLOR, SUCCESS_COLOR, ERROR_COLOR, WARNING_COLOR, AUTOMOD_COLOR, PANEL_COLOR, get_plan_limits
 from utils.database import get_guild_plan
+from utils.metrics import TASK_SECONDS, timed
+from utils.bulkdelete import DeleteBatcher
+from utils.dmqueue import DMQueue, send_dm
+from utils.membercache import get_member
+from utils.msgcache import MESSAGE_CACHE, MESSAGE_CACHE_CONTENT
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -114,13 +119,16 @@ class AutoMod(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.spam_tracker: dict[int, dict[int, list[float]]] = defaultdict(lambda: defaultdict(list))
+        # guild -> user -> [(timestamp, channel, message_id)] inside the flood window
+        self.spam_tracker: dict[int, dict[int, list[tuple]]] = defaultdict(lambda: defaultdict(list))
         self.duplicate_tracker: dict[int, dict[int, list[str]]] = defaultdict(lambda: defaultdict(list))
         self.settings_cache: dict[int, dict] = {}
         self.bad_words_cache: dict[int, list[str]] = {}
         self.blocked_links_cache: dict[int, list[str]] = {}
         self.builtin_words = get_all_bad_words()
         self.builtin_links = get_all_blocked_links()
+        self.warn_dms = DMQueue(self.render_warning_dm)
+        self.deleter = DeleteBatcher()
 
     async def cog_load(self):
         self.cleanup_trackers.start()
@@ -128,16 +136,19 @@ class AutoMod(commands.Cog):
 
     async def cog_unload(self):
         self.cleanup_trackers.cancel()
+        await self.warn_dms.drain()
+        await self.deleter.drain()
 
     # ─── Periodic cleanup ────────────────────────────────────
 
     @tasks.loop(minutes=5)
+    @timed(TASK_SECONDS, "cleanup_trackers")
     async def cleanup_trackers(self):
         """Clean up old spam/duplicate tracking data."""
         now = datetime.now(timezone.utc).timestamp()
         for gid in list(self.spam_tracker.keys()):
             for uid in list(self.spam_tracker[gid].keys()):
-                self.spam_tracker[gid][uid] = [t for t in self.spam_tracker[gid][uid] if now - t < 60]
+                self.spam_tracker[gid][uid] = [e for e in self.spam_tracker[gid][uid] if now - e[0] < 60]
                 if not self.spam_tracker[gid][uid]:
                     del self.spam_tracker[gid][uid]
             if not self.spam_tracker[gid]:
@@ -149,6 +160,8 @@ class AutoMod(commands.Cog):
                 if len(msgs) > 10:
                     self.duplicate_tracker[gid][uid] = msgs[-5:]
 
+        self.deleter.prune()
+
     @cleanup_trackers.before_loop
     async def before_cleanup(self):
         await self.bot.wait_until_ready()
@@ -238,10 +251,8 @@ class AutoMod(commands.Cog):
         guild = message.guild
 
         if delete_msg:
-            try:
-                await message.delete()
-            except:
-                pass
+            # Coalesced per channel: a raid's violations go out as bulk deletes
+            self.deleter.add(message.channel, message.id)
 
         if severity == "low":
             # Just delete, no warn
@@ -257,28 +268,11 @@ class AutoMod(commands.Cog):
         wc = len(active)
         mw = settings.get("max_warns", 3)
 
-        # DM user
-        try:
-            ne = discord.Embed(
-                title="🛡️ AutoMod Warning",
-                description=f"Your message in **{guild.name}** was removed.",
-                color=WARNING_COLOR
-            )
-            ne.add_field(name="📝 Reason", value=violation, inline=False)
-            ne.add_field(name="⚠️ Warnings", value=f"`{wc}/{mw}`", inline=True)
-
-            if wc >= mw:
-                act = settings.get("warn_action", "mute")
-                ne.add_field(
-                    name="🔨 Punishment Incoming",
-                    value=f"You will be **{act}ed** for reaching {mw} warnings.",
-                    inline=False
-                )
-                ne.color = ERROR_COLOR
-
-            await member.send(embed=ne)
-        except:
-            pass
+        # DM user — coalesced with their other violations in the window
+        self.warn_dms.add(member, {
+            "guild_id": guild.id, "guild": guild.name, "violation": violation, "warns": wc, "max_warns": mw,
+            "action": settings.get("warn_action", "mute") if wc >= mw else None,
+        }, key=guild.id)
 
         # Log
         le = self.make_log_embed(
@@ -309,6 +303,58 @@ class AutoMod(commands.Cog):
         if wc >= mw:
             await self.auto_punish(member, settings, wc)
 
+    def purge_flood(self, entries):
+        """Bulk-delete every message of a flood, one call per channel it hit."""
+        by_channel = {}
+        for _, channel, message_id in entries:
+            by_channel.setdefault(channel.id, (channel, []))[1].append(message_id)
+        for channel, ids in by_channel.values():
+            self.deleter.purge(channel, ids)
+
+    @staticmethod
+    def render_warning_dm(items):
+        """One AutoMod DM for every violation a user racked up in the window."""
+        last = items[-1]
+        if len(items) == 1:
+            ne = discord.Embed(
+                title="🛡️ AutoMod Warning",
+                description=f"Your message in **{last['guild']}** was removed.",
+                color=WARNING_COLOR
+            )
+            ne.add_field(name="📝 Reason", value=last["violation"], inline=False)
+        else:
+            guilds = list({i["guild_id"]: i["guild"] for i in items}.values())
+            ne = discord.Embed(
+                title="🛡️ AutoMod Warning",
+                description=f"**{len(items)}** of your messages in **{'**, **'.join(guilds)}** were removed.",
+                color=WARNING_COLOR
+            )
+            reasons = Counter(i["violation"] for i in items)
+            ne.add_field(
+                name="📝 Reasons",
+                value="\n".join(f"`{n}×` {r}" for r, n in reasons.most_common(10))[:1024],
+                inline=False
+            )
+
+        latest = {i["guild_id"]: i for i in items}   # by id: two servers can share a name
+        ne.add_field(
+            name="⚠️ Warnings",
+            value="\n".join(
+                f"`{i['warns']}/{i['max_warns']}`" + (f" — {i['guild']}" if len(latest) > 1 else "")
+                for i in latest.values()
+            )[:1024],
+            inline=True
+        )
+        for i in latest.values():
+            if i["action"]:
+                ne.add_field(
+                    name="🔨 Punishment Incoming",
+                    value=f"You will be **{i['action']}ed** in **{i['guild']}** for reaching {i['max_warns']} warnings.",
+                    inline=False
+                )
+                ne.color = ERROR_COLOR
+        return {"embed": ne}
+
     async def auto_punish(self, member, settings, wc):
         action = settings.get("warn_action", "mute")
         dur = settings.get("warn_action_duration", 600)
@@ -319,21 +365,17 @@ class AutoMod(commands.Cog):
                 await member.timeout(timedelta(seconds=dur), reason=f"AutoMod: {wc} warns")
                 at = f"Muted {dur // 60}min"
             elif action == "kick":
-                try:
-                    await member.send(embed=discord.Embed(
-                        title="👢 Kicked", description=f"Kicked from **{guild.name}** — max warnings.", color=ERROR_COLOR
-                    ))
-                except:
-                    pass
+                self.warn_dms.discard(member.id, guild.id)
+                await send_dm(member, embed=discord.Embed(
+                    title="👢 Kicked", description=f"Kicked from **{guild.name}** — max warnings.", color=ERROR_COLOR
+                ))
                 await member.kick(reason=f"AutoMod: {wc} warns")
                 at = "Kicked"
             elif action == "ban":
-                try:
-                    await member.send(embed=discord.Embed(
-                        title="🔨 Banned", description=f"Banned from **{guild.name}** — max warnings.", color=ERROR_COLOR
-                    ))
-                except:
-                    pass
+                self.warn_dms.discard(member.id, guild.id)
+                await send_dm(member, embed=discord.Embed(
+                    title="🔨 Banned", description=f"Banned from **{guild.name}** — max warnings.", color=ERROR_COLOR
+                ))
                 await member.ban(reason=f"AutoMod: {wc} warns", delete_message_days=0)
                 at = "Banned"
             else:
@@ -387,12 +429,14 @@ class AutoMod(commands.Cog):
             iv = s.get("spam_interval", 5)
 
             msgs = self.spam_tracker[gid][member.id]
-            msgs.append(now)
-            self.spam_tracker[gid][member.id] = [t for t in msgs if now - t < iv]
+            msgs.append((now, message.channel, message.id))
+            msgs = self.spam_tracker[gid][member.id] = [e for e in msgs if now - e[0] < iv]
 
-            if len(self.spam_tracker[gid][member.id]) >= th:
+            if len(msgs) >= th:
                 self.spam_tracker[gid][member.id] = []
-                await self.take_action(message, "Spam Detected (Message Flood)", s, severity="medium")
+                self.purge_flood(msgs)
+                await self.take_action(message, "Spam Detected (Message Flood)", s, severity="medium",
+                                       delete_msg=False)
                 return
 
         # ─── 2. Duplicate Message Detection ─────────────────
@@ -548,9 +592,25 @@ class AutoMod(commands.Cog):
             return
 
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        if after.author.bot or not after.guild or before.content == after.content:
+    async def on_raw_message_edit(self, payload):
+        # Raw so edits are checked even once discord.py's small message cache
+        # (see bot.py) no longer holds the original
+        after = payload.message
+        if after.author.bot or not after.guild or "content" not in payload.data:
             return
+        # Only re-check when the content changed: an unfurl, pin or attachment
+        # removal would otherwise warn and count toward the flood tracker again
+        edited_at = payload.data.get("edited_timestamp")
+        cached = MESSAGE_CACHE.get(after.guild.id, after.id) if MESSAGE_CACHE.enabled(after.guild.id) else None
+        if cached is not None and len(after.content) <= MESSAGE_CACHE_CONTENT:
+            # Utility's edit listener may already have written this very edit into it
+            if cached.content == after.content and cached.edited_at != edited_at:
+                return
+        elif payload.cached_message is not None:
+            if payload.cached_message.content == after.content:
+                return
+        elif not edited_at:
+            return   # embed unfurl, not an edit
         await self.on_message(after)
 
     # ═══════════════════════════════════════════════════════════
@@ -807,7 +867,7 @@ class AutoMod(commands.Cog):
                 return await interaction.response.send_message("❌ Invalid!", ephemeral=True)
             active = await get_active_warns(interaction.guild.id, uid)
             all_w = await get_all_warns(interaction.guild.id, uid)
-            target = interaction.guild.get_member(uid)
+            target = await get_member(interaction.guild, uid)
             name = target.display_name if target else str(uid)
             e = discord.Embed(title=f"⚠️ Warns — {name}", color=WARNING_COLOR if active else SUCCESS_COLOR)
             if target:
@@ -832,7 +892,7 @@ class AutoMod(commands.Cog):
                 uid = int(self.uid_input.value)
             except:
                 return await interaction.response.send_message("❌ Invalid!", ephemeral=True)
-            target = interaction.guild.get_member(uid)
+            target = await get_member(interaction.guild, uid)
             if not target:
                 return await interaction.response.send_message("❌ Not found!", ephemeral=True)
             if target.bot:
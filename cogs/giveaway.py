@@ -9,6 +9,8 @@ from typing import Optional
 from utils.database import *
 from config import EMBED_COLOR, SUCCESS_COLOR, ERROR_COLOR, WARNING_COLOR, PANEL_COLOR, get_plan_limits
 from utils.database import get_guild_plan
+from utils.metrics import TASK_SECONDS, timed
+from utils.membercache import members_by_id
 
 
 def parse_duration(s):
@@ -19,6 +21,14 @@ def parse_duration(s):
 
 def fmt_ts(dt,s="R"): return f"<t:{int(dt.timestamp())}:{s}>"
 
+async def draw_winners(guild, g, entries):
+    """Sample winners; with a required role, only from entrants who still hold it."""
+    rid=g["required_role_id"]
+    if rid and guild and guild.get_role(rid):
+        members=await members_by_id(guild,entries)
+        entries=[u for u in entries if u in members and members[u].get_role(rid)]
+    return random.sample(entries,min(g["winner_count"],len(entries)))
+
 def fmt_dur(td):
     ts=int(td.total_seconds()); d,r=divmod(ts,86400); h,r=divmod(r,3600); m,s=divmod(r,60)
     p=[]
@@ -102,14 +112,18 @@ class GiveawayEndedView(discord.ui.View):
             return await interaction.response.send_message("❌ Only host/admins can reroll!",ephemeral=True)
         entries=await get_entries(g["id"])
         if not entries: return await interaction.response.send_message("❌ No entries!",ephemeral=True)
-        wc=min(g["winner_count"],len(entries)); nw=random.sample(entries,wc); await save_winners(g["id"],nw)
+        if g["required_role_id"]: await interaction.response.defer()  # role check may need the member list
+        nw=await draw_winners(interaction.guild,g,entries)
+        send=interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+        if not nw: return await send("❌ No entrant still has the required role!",ephemeral=True)
+        await save_winners(g["id"],nw)
         wm=", ".join([f"<@{w}>" for w in nw])
         if interaction.message.embeds:
             emb=interaction.message.embeds[0]
             for i,f in enumerate(emb.fields):
                 if f.name=="🏆 Winner(s)": emb.set_field_at(i,name="🏆 Winner(s)",value=wm,inline=False); break
             await interaction.message.edit(embed=emb)
-        await interaction.response.send_message(f"🔄 **Rerolled!**\n🏆 {wm}\nCongratulations! 🎉")
+        await send(f"🔄 **Rerolled!**\n🏆 {wm}\nCongratulations! 🎉")
 
 
 # ─── Create Giveaway Modal ──────────────────────────────────────
@@ -195,7 +209,11 @@ class RerollModal(discord.ui.Modal, title="🔄 Reroll Giveaway"):
         if not g["ended"]: return await interaction.response.send_message("❌ Not ended yet!",ephemeral=True)
         entries=await get_entries(g["id"])
         if not entries: return await interaction.response.send_message("❌ No entries!",ephemeral=True)
-        wc=min(g["winner_count"],len(entries)); nw=random.sample(entries,wc); await save_winners(g["id"],nw)
+        if g["required_role_id"]: await interaction.response.defer(ephemeral=True)
+        nw=await draw_winners(interaction.guild,g,entries); wc=len(nw)
+        send=interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+        if not nw: return await send("❌ No entrant still has the required role!",ephemeral=True)
+        await save_winners(g["id"],nw)
         wm=", ".join([f"<@{w}>" for w in nw])
         try:
             ch=interaction.guild.get_channel(g["channel_id"])
@@ -206,7 +224,7 @@ class RerollModal(discord.ui.Modal, title="🔄 Reroll Giveaway"):
                 await msg.edit(embed=emb)
                 await ch.send(f"🔄 **Rerolled!** ({g['prize']})\n🏆 {wm}\nCongrats! 🎉")
         except: pass
-        await interaction.response.send_message(f"✅ Rerolled **#{gid}**!\n🏆 {wm}",ephemeral=True)
+        await send(f"✅ Rerolled **#{gid}**!\n🏆 {wm}",ephemeral=True)
 
 
 class CancelModal(discord.ui.Modal, title="🗑️ Cancel Giveaway"):
@@ -301,6 +319,7 @@ class Giveaway(commands.Cog):
     async def cog_unload(self): self.check_giveaways.cancel()
 
     @tasks.loop(seconds=15)
+    @timed(TASK_SECONDS, "check_giveaways")
     async def check_giveaways(self):
         try:
             for g in await get_active_giveaways():
@@ -321,7 +340,7 @@ class Giveaway(commands.Cog):
             try: msg=await ch.fetch_message(g["message_id"])
             except: await end_giveaway(g["id"]); return
             entries=await get_entries(g["id"]); ec=len(entries); et=datetime.fromisoformat(g["end_time"])
-            wc=min(g["winner_count"],len(entries)); winners=random.sample(entries,wc) if entries else []
+            winners=await draw_winners(guild,g,entries) if entries else []
             if winners: await save_winners(g["id"],winners)
             await end_giveaway(g["id"])
             emb=build_ended_embed(g["prize"],g["description"],g["host_id"],et,g["winner_count"],ec,winners,g["id"])
@@ -1,3 +1,6 @@
+import asyncio
+import time
+from collections import deque
 import discord
 from discord.ext import commands
 from discord import app_commands
@@ -7,6 +10,12 @@ from typing import Optional
 from utils.database import *
 from config import EMBED_COLOR, SUCCESS_COLOR, ERROR_COLOR, WARNING_COLOR, INVITE_COLOR, PANEL_COLOR, get_plan_limits
 from utils.database import get_guild_plan
+from utils.ratelimit import TokenBucket
+from utils.joinburst import JoinBatcher, join_detector
+from utils.membercache import get_member
+
+WARMUP_CONCURRENCY = 4    # parallel guild.invites() calls during startup warmup
+INVITE_FETCH_RATE = 5     # invite fetches per second across all guilds
 
 
 class InviteSetupModal(discord.ui.Modal, title="📌 Set Log Channel"):
@@ -33,7 +42,7 @@ class InviteCheckModal(discord.ui.Modal, title="📊 Check User Invites"):
         if self.user_input.value:
             try: uid=int(self.user_input.value)
             except: return await interaction.response.send_message("❌ Invalid ID!",ephemeral=True)
-            target=interaction.guild.get_member(uid)
+            target=await get_member(interaction.guild,uid)
             if not target: return await interaction.response.send_message("❌ User not found!",ephemeral=True)
         else: target=interaction.user
         stats=await get_user_invite_stats(interaction.guild.id,target.id)
@@ -58,7 +67,7 @@ class InviteWhoModal(discord.ui.Modal, title="🔍 Who Invited?"):
     async def on_submit(self, interaction: discord.Interaction):
         try: uid=int(self.user_input.value)
         except: return await interaction.response.send_message("❌ Invalid ID!",ephemeral=True)
-        target=interaction.guild.get_member(uid)
+        target=await get_member(interaction.guild,uid)
         inviter_id=await get_invited_by(interaction.guild.id,uid)
         name=target.display_name if target else str(uid)
         e=discord.Embed(title=f"🔍 Who Invited {name}?",color=INVITE_COLOR)
@@ -175,58 +184,168 @@ class ConfirmResetAllView(discord.ui.View):
 # ─── Invites Cog ─────────────────────────────────────────────────
 
 class Invites(commands.Cog):
-    def __init__(self, bot): self.bot=bot; self.invite_cache={}
+    def __init__(self, bot):
+        self.bot=bot
+        self.invite_cache={}      # guild_id -> {code: uses}; source of truth for attribution
+        self.invite_inviters={}   # guild_id -> {code: inviter_id}
+        self._pending_joins={}    # guild_id -> [(member, future)] waiting for the next invite fetch
+        self._invite_fetchers={}  # guild_id -> task draining _pending_joins
+        self._warmed=set()        # guilds whose snapshot was fetched this session
+        self._warm_queue=deque(); self._warm_urgent=[]; self._warm_active=0
+        self._invite_bucket=TokenBucket(INVITE_FETCH_RATE)
+        self.join_batcher=JoinBatcher(self._flush_join_batch)
 
     async def cog_load(self):
         self.bot.loop.create_task(self.initialize_cache()); print("[COG] Invite tracking loaded.")
 
+    async def cog_unload(self):
+        await self.join_batcher.drain()   # attribute joins still buffered from a burst
+
     async def initialize_cache(self):
+        """Seed snapshots from the persisted invite_cache, then refresh every guild
+        with bounded concurrency: tracking-enabled guilds first, stalest first."""
+        for row in await get_all_cached_invites():
+            gid=row["guild_id"]
+            self.invite_cache.setdefault(gid,{})[row["invite_code"]]=row["uses"]
+            self.invite_inviters.setdefault(gid,{})[row["invite_code"]]=row["inviter_id"]
         await self.bot.wait_until_ready()
-        for g in self.bot.guilds:
-            try: await self.cache_guild_invites(g)
-            except: pass
-        print(f"[INVITES] Cached {len(self.invite_cache)} guild(s).")
+        enabled,warmed=await get_invite_warmup_plan()
+        order=sorted((g.id for g in self.bot.guilds),key=lambda gid:(gid not in enabled,warmed.get(gid,"")))
+        self._warm_queue.extend(g for g in order if g not in self._warmed)
+        started=time.perf_counter()
+        await asyncio.gather(*(self._warm_worker() for _ in range(WARMUP_CONCURRENCY)))
+        print(f"[INVITES] Cached {len(self._warmed)} guild(s) in {time.perf_counter()-started:.1f}s.")
+
+    async def _warm_worker(self):
+        self._warm_active+=1
+        try:
+            while True:
+                gid=self._next_warm_guild()
+                if gid is None: return
+                guild=self.bot.get_guild(gid)
+                if guild:
+                    try: await self.cache_guild_invites(guild)
+                    except Exception: pass
+        finally: self._warm_active-=1
+
+    def _next_warm_guild(self):
+        # Guilds with joins waiting on a snapshot jump the queue.
+        while self._warm_urgent:
+            gid=self._warm_urgent.pop(0)
+            if gid not in self._warmed: return gid
+        while self._warm_queue:
+            gid=self._warm_queue.popleft()
+            if gid not in self._warmed: return gid
+        return None
+
+    async def fetch_invites(self, guild):
+        async with self._invite_bucket: return await guild.invites()
+
+    async def apply_invite_snapshot(self, guild_id, invites):
+        """Replace the guild's snapshot with `invites` and persist only what changed."""
+        old=self.invite_cache.get(guild_id,{}); owners=self.invite_inviters.get(guild_id,{})
+        snap={}; inviters={}; changed=[]
+        for i in invites:
+            if not i.inviter: continue
+            uses=i.uses or 0; snap[i.code]=uses; inviters[i.code]=i.inviter.id
+            if old.get(i.code)!=uses or owners.get(i.code)!=i.inviter.id:
+                changed.append({"code":i.code,"inviter_id":i.inviter.id,"uses":uses})
+        removed=[c for c in old if c not in snap]
+        self.invite_cache[guild_id]=snap; self.invite_inviters[guild_id]=inviters
+        await cache_invites(guild_id,changed,removed)
 
     async def cache_guild_invites(self, guild):
+        """Fetch a fresh snapshot. Joins queued before the guild was warm are
+        attributed against the previous (persisted) snapshot first."""
+        try: current=await self.fetch_invites(guild)
+        except Exception:
+            if guild.id not in self._warmed: await self._settle(guild,None,self._pending_joins.pop(guild.id,[]))
+            return
+        first=guild.id not in self._warmed; self._warmed.add(guild.id)
+        if first and guild.id not in self._invite_fetchers:
+            await self._settle(guild,current,self._pending_joins.pop(guild.id,[]))
+        else:
+            try: await self.apply_invite_snapshot(guild.id,current)
+            except Exception: pass
+        if first:
+            try: await mark_invites_warmed(guild.id)
+            except Exception: pass
+            if self._pending_joins.get(guild.id) and guild.id not in self._invite_fetchers:
+                self._invite_fetchers[guild.id]=asyncio.create_task(self._drain_pending_joins(guild))
+
+    async def find_used_invite(self, guild, member):
+        """Queue `member` for attribution. Joins that arrive while a fetch is
+        pending share a single guild.invites() call and a single diff; joins in
+        guilds that haven't been warmed yet wait for the warmup fetch."""
+        fut=asyncio.get_running_loop().create_future()
+        self._pending_joins.setdefault(guild.id,[]).append((member,fut))
+        if guild.id not in self._warmed:
+            if guild.id not in self._warm_urgent: self._warm_urgent.append(guild.id)
+            if not self._warm_active: asyncio.create_task(self._warm_worker())
+        elif guild.id not in self._invite_fetchers:
+            self._invite_fetchers[guild.id]=asyncio.create_task(self._drain_pending_joins(guild))
+        return await fut
+
+    async def _drain_pending_joins(self, guild):
         try:
-            invites=await guild.invites(); self.invite_cache[guild.id]={}; db_inv=[]
-            for i in invites:
-                if i.inviter: self.invite_cache[guild.id][i.code]=i.uses or 0; db_inv.append({"code":i.code,"inviter_id":i.inviter.id,"uses":i.uses or 0})
-            await cache_invites(guild.id,db_inv)
-        except: pass
-
-    async def find_used_invite(self, guild):
-        try: current=await guild.invites()
-        except: return None,None
-        old=self.invite_cache.get(guild.id,{})
+            while self._pending_joins.get(guild.id):
+                batch=self._pending_joins.pop(guild.id)
+                try: current=await self.fetch_invites(guild)
+                except Exception: current=None
+                await self._settle(guild,current,batch)
+        finally:
+            self._invite_fetchers.pop(guild.id,None)
+            for _member,fut in self._pending_joins.pop(guild.id,[]):
+                if not fut.done(): fut.set_result((None,None))
+
+    async def _settle(self, guild, current, batch):
+        results=self._attribute_joins(guild.id,current,len(batch)) if current is not None else []
+        if current is not None:
+            try: await self.apply_invite_snapshot(guild.id,current)
+            except Exception: pass
+        for idx,(_member,fut) in enumerate(batch):
+            if not fut.done(): fut.set_result(results[idx] if idx<len(results) else (None,None))
+
+    def _attribute_joins(self, guild_id, current, count):
+        """Hand out each invite's use delta to the batch, walking invites in guild.invites() order
+        (a delta says how many joined through an invite, not which of the batched members did)."""
+        if guild_id not in self.invite_cache: return []  # no baseline to diff against
+        old=self.invite_cache[guild_id]; results=[]
         for i in current:
-            if i.uses and i.uses>old.get(i.code,0):
-                self.invite_cache[guild.id][i.code]=i.uses
-                db_inv=[{"code":x.code,"inviter_id":x.inviter.id,"uses":x.uses or 0} for x in current if x.inviter]
-                await cache_invites(guild.id,db_inv)
-                return i,i.inviter
-        self.invite_cache[guild.id]={i.code:i.uses or 0 for i in current if i.inviter}
-        return None,None
+            if not i.inviter: continue
+            delta=(i.uses or 0)-old.get(i.code,0)
+            while delta>0 and len(results)<count:
+                results.append((i,i.inviter)); delta-=1
+        return results
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild): await self.cache_guild_invites(guild)
     @commands.Cog.listener()
-    async def on_guild_remove(self, guild): self.invite_cache.pop(guild.id,None)
+    async def on_guild_remove(self, guild):
+        self.invite_cache.pop(guild.id,None); self.invite_inviters.pop(guild.id,None); self._warmed.discard(guild.id)
     @commands.Cog.listener()
     async def on_invite_create(self, invite):
-        if invite.guild:
-            self.invite_cache.setdefault(invite.guild.id,{})[invite.code]=invite.uses or 0
+        if not invite.guild or not invite.inviter: return
+        gid=invite.guild.id; uses=invite.uses or 0
+        self.invite_cache.setdefault(gid,{})[invite.code]=uses
+        self.invite_inviters.setdefault(gid,{})[invite.code]=invite.inviter.id
+        await cache_invites(gid,[{"code":invite.code,"inviter_id":invite.inviter.id,"uses":uses}])
     @commands.Cog.listener()
     async def on_invite_delete(self, invite):
-        if invite.guild and invite.guild.id in self.invite_cache:
-            self.invite_cache[invite.guild.id].pop(invite.code,None)
+        if not invite.guild: return
+        gid=invite.guild.id
+        self.invite_inviters.get(gid,{}).pop(invite.code,None)
+        if self.invite_cache.get(gid,{}).pop(invite.code,None) is not None:
+            await cache_invites(gid,[],[invite.code])
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
         if member.bot: return
+        if join_detector(self.bot).observe(member.guild.id,member.id):
+            self.join_batcher.add(member); return
         guild=member.guild; s=await get_invite_settings(guild.id)
-        if not s or not s.get("enabled"): await self.cache_guild_invites(guild); return
-        inv,inviter=await self.find_used_invite(guild)
+        if not s or not s.get("enabled"): return
+        inv,inviter=await self.find_used_invite(guild,member)
         ch_id=s.get("log_channel_id")
         if not ch_id: return
         ch=guild.get_channel(ch_id)
@@ -249,10 +368,40 @@ class Invites(commands.Cog):
         try: await ch.send(embed=e)
         except: pass
 
+    async def _flush_join_batch(self, members):
+        """Raid mode: attribute a whole batch off one invite fetch and post one summary."""
+        guild=members[0].guild; s=await get_invite_settings(guild.id)
+        if not s or not s.get("enabled"): return
+        results=await asyncio.gather(*(self.find_used_invite(guild,m) for m in members))
+        rows=[]; per_inviter={}; unknown=0
+        for m,(inv,inviter) in zip(members,results):
+            if inv and inviter and inviter.id!=m.id:
+                rows.append((inviter.id,m.id,inv.code)); per_inviter[inviter.id]=per_inviter.get(inviter.id,0)+1
+            else: unknown+=1
+        await track_invites(guild.id,rows)
+        ch=guild.get_channel(s.get("log_channel_id") or 0)
+        if not ch: return
+        e=discord.Embed(title="🚨 Join Burst",description=f"**{len(members)}** members joined in a burst.",color=WARNING_COLOR,timestamp=datetime.now(timezone.utc))
+        top=sorted(per_inviter.items(),key=lambda kv:kv[1],reverse=True)[:10]
+        if top: e.add_field(name="📨 Invited By",value="\n".join(f"<@{uid}> — **{n}**" for uid,n in top),inline=False)
+        if unknown: e.add_field(name="🔗 Vanity URL / Unknown",value=f"**{unknown}**",inline=False)
+        shown=", ".join(m.mention for m in members[:20])
+        if len(members)>20: shown+=f" … and {len(members)-20} more"
+        e.add_field(name="👥 Members",value=shown[:1024],inline=False)
+        e.set_footer(text=f"Total Server Members: {guild.member_count}")
+        try: await ch.send(embed=e)
+        except: pass
+
     @commands.Cog.listener()
-    async def on_member_remove(self, member):
+    async def on_raw_member_remove(self, payload):
+        # Raw: on_member_remove only fires for cached members, and under MEMBER_CACHE
+        # "joined" / "voice" / "none" most leavers aren't cached. payload.user is the
+        # Member when it was, a plain User (no joined_at) otherwise.
+        member=payload.user
         if member.bot: return
-        guild=member.guild; s=await get_invite_settings(guild.id)
+        guild=self.bot.get_guild(payload.guild_id)
+        if not guild: return
+        s=await get_invite_settings(guild.id)
         if not s or not s.get("enabled"): return
         inviter_id=await track_leave(guild.id,member.id)
         ch_id=s.get("log_channel_id")
@@ -262,7 +411,7 @@ class Invites(commands.Cog):
         e=discord.Embed(title="👋 Member Left",description=f"**{member}** left the server.",color=ERROR_COLOR,timestamp=datetime.now(timezone.utc))
         e.set_thumbnail(url=member.display_avatar.url)
         info=f"**User:** `{member}` (`{member.id}`)"
-        if member.joined_at: info+=f"\n**Joined:** <t:{int(member.joined_at.timestamp())}:R>"
+        if getattr(member,"joined_at",None): info+=f"\n**Joined:** <t:{int(member.joined_at.timestamp())}:R>"
         e.add_field(name="📊 Member Info",value=info,inline=False)
         if inviter_id:
             st=await get_user_invite_stats(guild.id,inviter_id)
@@ -271,7 +420,6 @@ class Invites(commands.Cog):
         e.set_footer(text=f"Total Server Members: {guild.member_count}")
         try: await ch.send(embed=e)
         except: pass
-        await self.cache_guild_invites(guild)
 
     @app_commands.command(name="invites",description="📨 Open the Invite Tracking Panel")
     @app_commands.default_permissions(manage_guild=True)
@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from datetime import datetime, timezone
 from typing import Optional
@@ -10,12 +10,13 @@ from utils.database import (
     increment_order_counter, add_product, get_products, get_product_by_id,
     update_product, delete_product, toggle_product_stock, get_product_categories,
     decrement_stock, create_order, get_order_by_id, get_order_by_channel,
-    get_order_by_number, get_user_orders, get_all_orders, update_order_status,
+    get_order_by_number, get_all_orders, update_order_status,
     update_order_field, get_order_stats, add_review, get_reviews,
     get_average_rating, get_customer_profile, update_customer_profile,
-    blacklist_customer, unblacklist_customer, is_customer_blacklisted,
+    blacklist_customer, unblacklist_customer,
     update_review_message_id, delete_review, get_review_by_id, get_review_count,
-    get_last_staff_request, save_staff_request
+    get_last_staff_request, save_staff_request, get_order_eligibility,
+    get_orders_page, count_orders, search_orders
 )
 from config import (
     EMBED_COLOR, SUCCESS_COLOR, ERROR_COLOR, WARNING_COLOR,
@@ -23,6 +24,11 @@ from config import (
     get_plan_limits
 )
 from utils.database import get_guild_plan
+from utils.shopcache import SHOP_CACHE
+from utils.shoppanel import SHOP_PANELS, SHOP_PANEL_REFRESH_SECONDS
+from utils.metrics import TASK_SECONDS, timed
+from utils.membercache import get_member
+from utils.pager import ResultPager
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -42,9 +48,9 @@ class ShopView(discord.ui.View):
         emoji="🛒"
     )
     async def order_button(self, interaction: discord.Interaction, button):
-        # Plan check
-        plan = await get_guild_plan(interaction.guild.id)
-        limits = get_plan_limits(plan)
+        # Plan, settings and catalog come from the per-guild cache
+        shop = await SHOP_CACHE.get(interaction.guild.id)
+        limits = get_plan_limits(shop["plan"])
         if not limits.get("shop_enabled"):
             return await interaction.response.send_message(
                 embed=discord.Embed(
@@ -55,28 +61,25 @@ class ShopView(discord.ui.View):
                 ephemeral=True
             )
 
-        settings = await get_shop_settings(interaction.guild.id)
+        settings = shop["settings"]
         if not settings or not settings.get("enabled"):
             return await interaction.response.send_message("❌ Shop is not enabled.", ephemeral=True)
 
-        # Check blacklist
-        if await is_customer_blacklisted(interaction.guild.id, interaction.user.id):
+        # Blacklist + active orders in one query
+        eligibility = await get_order_eligibility(interaction.guild.id, interaction.user.id)
+        if eligibility["blacklisted"]:
             return await interaction.response.send_message(
                 "❌ You are **blacklisted** from ordering. Contact staff if you think this is a mistake.",
                 ephemeral=True
             )
 
-        # Check pending orders
-        pending = await get_user_orders(interaction.guild.id, interaction.user.id, "pending")
-        processing = await get_user_orders(interaction.guild.id, interaction.user.id, "processing")
-        if len(pending) + len(processing) >= 3:
+        if eligibility["active_orders"] >= 3:
             return await interaction.response.send_message(
                 "❌ You have too many active orders. Please wait for your current orders to be completed.",
                 ephemeral=True
             )
 
-        products = await get_products(interaction.guild.id)
-        in_stock = [p for p in products if p["in_stock"]]
+        in_stock = [p for p in shop["products"] if p["in_stock"]]
 
         if not in_stock:
             return await interaction.response.send_message(
@@ -101,9 +104,10 @@ class ShopView(discord.ui.View):
         emoji="📦"
     )
     async def my_orders_button(self, interaction: discord.Interaction, button):
-        orders = await get_user_orders(interaction.guild.id, interaction.user.id)
+        view = OrderHistoryView(interaction.guild.id, user_id=interaction.user.id)
+        await view.load()
 
-        if not orders:
+        if not view.total:
             return await interaction.response.send_message(
                 embed=discord.Embed(
                     title="📦 Your Orders",
@@ -113,31 +117,14 @@ class ShopView(discord.ui.View):
                 ephemeral=True
             )
 
-        status_emoji = {
-            "pending": "🟡", "processing": "🔵",
-            "delivered": "🟢", "cancelled": "🔴", "refunded": "🟠"
-        }
-
-        desc = ""
-        for o in orders[:15]:
-            se = status_emoji.get(o["status"], "⚪")
-            desc += (
-                f"{se} `#{o['order_number']:04d}` — **{o['product_name']}** "
-                f"| `${o['price']:.2f}` | {o['status'].title()}\n"
-            )
-
-        embed = discord.Embed(
-            title=f"📦 Your Orders ({len(orders)})",
-            description=desc,
-            color=ORDER_COLOR
-        )
-
         profile = await get_customer_profile(interaction.guild.id, interaction.user.id)
         if profile:
-            embed.add_field(name="💰 Total Spent", value=f"`${profile['total_spent']:.2f}`", inline=True)
-            embed.add_field(name="✅ Completed", value=f"`{profile['completed_orders']}`", inline=True)
+            view.fields = [
+                ("💰 Total Spent", f"`${profile['total_spent']:.2f}`"),
+                ("✅ Completed", f"`{profile['completed_orders']}`"),
+            ]
 
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(embed=view.build_page(), view=view, ephemeral=True)
 
     @discord.ui.button(
         label="Reviews",
@@ -182,6 +169,108 @@ class ShopView(discord.ui.View):
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
+# ═══════════════════════════════════════════════════════════════
+#  ORDER HISTORY (keyset pages)
+# ═══════════════════════════════════════════════════════════════
+
+STATUS_EMOJI = {
+    "pending": "🟡", "processing": "🔵",
+    "delivered": "🟢", "cancelled": "🔴", "refunded": "🟠"
+}
+
+
+class OrderHistoryView(discord.ui.View):
+    """Order browser for one customer (My Orders) or a whole shop (staff).
+
+    Pages are fetched by keyset on (created_at, id) from the current page's
+    first/last order, so paging deep into a large shop costs the same as
+    the first page; the total comes from count_orders, not the rows.
+    """
+
+    def __init__(self, guild_id, user_id=None, per_page=10):
+        super().__init__(timeout=300)
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.per_page = per_page
+        self.status = None
+        self.page = 0
+        self.total = 0
+        self.orders = []
+        self.header = None   # embed shown above the page (staff statistics)
+        self.fields = []     # extra (name, value) fields under the list
+
+        self.status_select.options = [discord.SelectOption(label="All statuses", value="all", emoji="📋")] + [
+            discord.SelectOption(label=st.title(), value=st, emoji=STATUS_EMOJI[st]) for st in STATUS_EMOJI
+        ]
+
+    @property
+    def max_page(self):
+        return max(0, (self.total - 1) // self.per_page)
+
+    async def load(self, before=None, after=None):
+        if before is None and after is None:
+            self.page = 0
+            self.total = await count_orders(self.guild_id, self.user_id, self.status)
+        self.orders = await get_orders_page(
+            self.guild_id, self.user_id, self.status, before=before, after=after, limit=self.per_page
+        )
+        self.prev_btn.disabled = self.page <= 0
+        self.next_btn.disabled = self.page >= self.max_page or not self.orders
+
+    def build_page(self):
+        desc = ""
+        for o in self.orders:
+            se = STATUS_EMOJI.get(o["status"], "⚪")
+            who = f" | <@{o['user_id']}>" if self.user_id is None else ""
+            desc += (
+                f"{se} `#{o['order_number']:04d}` — **{o['product_name']}** "
+                f"| `${o['price']:.2f}` | {o['status'].title()}{who}\n"
+            )
+
+        title = "📦 Your Orders" if self.user_id is not None else "📋 Orders"
+        if self.status:
+            title += f" — {self.status.title()}"
+        embed = discord.Embed(
+            title=f"{title} ({self.total})",
+            description=desc or "*No orders.*",
+            color=ORDER_COLOR
+        )
+        for name, value in self.fields:
+            embed.add_field(name=name, value=value, inline=True)
+        embed.set_footer(text=f"Page {self.page + 1}/{self.max_page + 1}")
+        return embed
+
+    async def show(self, interaction):
+        page = self.build_page()
+        embeds = [self.header, page] if self.header else [page]
+        await interaction.response.edit_message(embeds=embeds, view=self)
+
+    @discord.ui.select(placeholder="Filter by status...", row=0)
+    async def status_select(self, interaction, select):
+        value = select.values[0]
+        self.status = None if value == "all" else value
+        await self.load()
+        await self.show(interaction)
+
+    @discord.ui.button(label="◀ Newer", style=discord.ButtonStyle.secondary, row=1)
+    async def prev_btn(self, interaction, btn):
+        if self.orders:
+            self.page -= 1
+            first = self.orders[0]
+            await self.load(after=(first["created_at"], first["id"]))
+        if not self.orders or self.page <= 0:
+            await self.load()
+        await self.show(interaction)
+
+    @discord.ui.button(label="Older ▶", style=discord.ButtonStyle.secondary, row=1)
+    async def next_btn(self, interaction, btn):
+        if self.orders:
+            last = self.orders[-1]
+            self.page += 1
+            await self.load(before=(last["created_at"], last["id"]))
+        await self.show(interaction)
+
+
 # ═══════════════════════════════════════════════════════════════
 #  PRODUCT SELECT
 # ═══════════════════════════════════════════════════════════════
@@ -711,7 +800,7 @@ class DeliveryModal(discord.ui.Modal, title="✅ Deliver Order"):
 
         # Auto customer role
         if self.settings.get("auto_customer_role") and self.settings.get("customer_role_id"):
-            member = interaction.guild.get_member(order["user_id"])
+            member = await get_member(interaction.guild, order["user_id"])
             role = interaction.guild.get_role(self.settings["customer_role_id"])
             if member and role:
                 try:
@@ -1187,67 +1276,13 @@ class SendShopPanelModal(discord.ui.Modal, title="📩 Send Shop Panel"):
 
         await interaction.response.defer(ephemeral=True)
 
-        products = await get_products(interaction.guild.id)
-        settings = await get_shop_settings(interaction.guild.id)
-        currency = settings.get("currency", "$") if settings else "$"
-        rating_data = await get_average_rating(interaction.guild.id)
-        hide_list = settings.get("hide_product_list", 0) if settings else 0
-
-        if hide_list:
-            # Show only info message
-            info_msg = settings.get("shop_info_message", "Click **🛒 Order Now** to browse and purchase our products!") if settings else "Click **🛒 Order Now** to browse and purchase our products!"
-            desc = ""
-            if rating_data["count"] > 0:
-                stars = "⭐" * round(rating_data["average"])
-                desc += f"**Rating:** {stars} ({rating_data['average']}/5 from {rating_data['count']} reviews)\n\n"
-            desc += info_msg
-        else:
-            # Build product list by category
-            categories = {}
-            for p in products:
-                cat = p.get("category", "General")
-                if cat not in categories:
-                    categories[cat] = []
-                categories[cat].append(p)
-
-            desc = ""
-            if rating_data["count"] > 0:
-                stars = "⭐" * round(rating_data["average"])
-                desc += f"**Rating:** {stars} ({rating_data['average']}/5 from {rating_data['count']} reviews)\n\n"
-
-            for cat_name, cat_products in categories.items():
-                desc += f"**━━━ {cat_name} ━━━**\n"
-                for p in cat_products:
-                    stock = "✅" if p["in_stock"] else "❌ OUT OF STOCK"
-                    reseller = f" *(Reseller: {currency}{p['reseller_price']:.2f})*" if p.get("reseller_price") else ""
-                    desc += (
-                        f"{p['emoji']} **{p['name']}** — `{currency}{p['price']:.2f}`{reseller}\n"
-                        f"  ⏱️ {p.get('delivery_time', '5M-2H')} | {stock}\n"
-                    )
-                desc += "\n"
-
-        embed = discord.Embed(
-            title="🏪 Product Shop",
-            description=desc or "*No products added yet.*",
-            color=PRODUCT_COLOR
-        )
-
-        if not hide_list and settings and settings.get("payment_methods"):
-            pay_lines = settings["payment_methods"].strip().split("\n")
-            pay_display = "\n".join([l.strip() for l in pay_lines if l.strip()])
-            embed.add_field(
-                name="💳 Accepted Payments",
-                value=pay_display or "N/A",
-                inline=False
-            )
-
-        embed.set_footer(text="Click 'Order Now' to place an order • Hubix Shop")
-
+        embed = await SHOP_PANELS.render(interaction.guild.id)
         view = ShopView()
         msg = await ch.send(embed=embed, view=view)
 
         await update_shop_setting(interaction.guild.id, "panel_channel_id", ch.id)
         await update_shop_setting(interaction.guild.id, "panel_message_id", msg.id)
+        SHOP_PANELS.posted(interaction.guild.id, embed)
 
         await interaction.followup.send(
             embed=discord.Embed(title="✅ Shop Panel Sent!", description=f"Sent to {ch.mention}", color=SUCCESS_COLOR),
@@ -1486,7 +1521,10 @@ class OrderManagementView(discord.ui.View):
         stars = "⭐" * round(rating["average"]) if rating["average"] else "N/A"
         e.add_field(name="⭐ Rating", value=f"{stars} ({rating['count']})", inline=True)
 
-        await interaction.response.send_message(embed=e, ephemeral=True)
+        view = OrderHistoryView(interaction.guild.id)
+        view.header = e
+        await view.load()
+        await interaction.response.send_message(embeds=[e, view.build_page()], view=view, ephemeral=True)
 
     @discord.ui.button(label="Blacklist", style=discord.ButtonStyle.danger, emoji="🚫", row=2)
     async def bl_btn(self, interaction, btn):
@@ -1580,12 +1618,59 @@ class Orders(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.refresh_panels.start()
+
+    def cog_unload(self):
+        self.refresh_panels.cancel()
 
     async def cog_load(self):
         self.bot.add_view(ShopView())
         self.bot.add_view(OrderControlView())
         print("[COG] Order system loaded.")
 
+    # ─── Shop Panel Refresh ──────────────────────────────────
+    @tasks.loop(seconds=SHOP_PANEL_REFRESH_SECONDS)
+    @timed(TASK_SECONDS, "shop_panel_refresh")
+    async def refresh_panels(self):
+        """Edit posted shop panels whose products, stock or ratings changed."""
+        try:
+            await SHOP_PANELS.refresh(self.bot.get_channel)
+        except Exception as e:
+            print(f"[SHOP] Panel refresh error: {e}")
+
+    @refresh_panels.before_loop
+    async def before_refresh_panels(self):
+        await self.bot.wait_until_ready()
+
+    @app_commands.command(name="shopsearch", description="🔎 Search orders by product, delivery info or notes")
+    @app_commands.describe(query="Words to look for; an order number like 0042 works too, end a word with * to match its start")
+    @app_commands.default_permissions(manage_guild=True)
+    async def shop_search(self, interaction: discord.Interaction, query: str):
+        plan = await get_guild_plan(interaction.guild.id)
+        if not get_plan_limits(plan).get("shop_enabled"):
+            return await interaction.response.send_message(
+                "🔒 **Shop System** requires **💎 Basic** plan or higher.", ephemeral=True
+            )
+        guild_id = interaction.guild.id
+
+        def render(rows, page):
+            embed = discord.Embed(title=f"🔎 Orders matching “{query[:80]}”", color=ORDER_COLOR)
+            for o in rows:
+                se = STATUS_EMOJI.get(o["status"], "⚪")
+                embed.add_field(
+                    name=f"{se} #{o['order_number']:04d} — {o['product_name']} | ${o['price']:.2f}"[:256],
+                    value=f"<@{o['user_id']}> | {o['status'].title()} | {str(o['created_at'])[:10]}\n> {o['snippet']}"[:1024],
+                    inline=False
+                )
+            if not rows:
+                embed.description = "*No matching orders.*"
+            embed.set_footer(text=f"Page {page + 1} • Best matches first")
+            return embed
+
+        view = ResultPager(lambda offset, limit: search_orders(guild_id, query, limit, offset), render)
+        await view.load()
+        await interaction.response.send_message(embed=view.build_page(), view=view, ephemeral=True)
+
     @app_commands.command(name="shop", description="🛒 Open the Shop Management Panel")
     @app_commands.default_permissions(manage_guild=True)
     async def shop_panel(self, interaction: discord.Interaction):
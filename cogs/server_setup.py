@@ -2,8 +2,12 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from datetime import datetime, timezone
+from functools import partial
+import time
 
 from config import OWNER_IDS, ERROR_COLOR, SUCCESS_COLOR
+from utils.database import clear_setup_progress, get_setup_progress, record_setup_step
+from utils.taskgraph import TaskGraph
 
 # ═══════════════════════════════════════════════════════════════
 #  COLOR THEME
@@ -15,6 +19,125 @@ HUBIX_DARK_PURPLE = 0x7B2FBE
 HUBIX_ACCENT = 0xB266FF
 
 
+# ═══════════════════════════════════════════════════════════════
+#  SERVER TEMPLATE
+# ═══════════════════════════════════════════════════════════════
+
+# (name, color, hoist, mentionable) — bottom to top
+SETUP_ROLES = [
+    ("👤 Member", 0x95A5A6, False, False),
+    ("✅ Verified", 0x2ECC71, False, False),
+    ("💎 Basic", 0x3498DB, True, False),
+    ("⭐ Premium", 0xF1C40F, True, False),
+    ("🚀 Business", 0xE91E63, True, False),
+    ("💼 Staff", 0xE67E22, True, True),
+    ("👮 Moderator", 0x3498DB, True, True),
+    ("🛡️ Admin", 0xE74C3C, True, True),
+    ("👑 Owner", 0x9B59B6, True, False),
+]
+
+_HIDDEN = dict(view_channel=False)
+_CHAT = dict(view_channel=True, send_messages=True, read_message_history=True)
+_READ = dict(view_channel=True, send_messages=False, read_message_history=True)
+_MOD = dict(_CHAT, manage_messages=True)
+_ADMIN = dict(_MOD, manage_channels=True)
+_BOT = dict(
+    view_channel=True, send_messages=True, manage_messages=True,
+    embed_links=True, attach_files=True, manage_channels=True
+)
+
+# Overwrite presets: "@everyone" or a role name -> PermissionOverwrite kwargs.
+# The bot always gets _BOT; roles that don't exist are left out.
+OVERWRITE_PRESETS = {
+    "verify": {"@everyone": _READ, "✅ Verified": _HIDDEN},
+    "verified": {"@everyone": _HIDDEN, "✅ Verified": _CHAT},
+    "readonly": {"@everyone": _HIDDEN, "✅ Verified": _READ},
+    "staff": {"@everyone": _HIDDEN, "💼 Staff": _CHAT, "👮 Moderator": _MOD, "🛡️ Admin": _ADMIN, "👑 Owner": _ADMIN},
+    "admin": {"@everyone": _HIDDEN, "🛡️ Admin": _ADMIN, "👑 Owner": _ADMIN},
+    "premium": {
+        "@everyone": _HIDDEN, "⭐ Premium": _CHAT, "💎 Basic": _CHAT, "🚀 Business": _CHAT,
+        "💼 Staff": _CHAT, "🛡️ Admin": _CHAT, "👑 Owner": _CHAT,
+    },
+    "logs": {"@everyone": _HIDDEN, "🛡️ Admin": _READ, "👑 Owner": _CHAT},
+    "tickets": {"@everyone": _HIDDEN, "💼 Staff": _CHAT, "👮 Moderator": _MOD, "🛡️ Admin": _ADMIN},
+}
+
+# (key, category name, preset, [(key, channel name, kind, preset), ...]) — top to bottom
+SERVER_LAYOUT = [
+    ("cat-verify", "═══ VERIFY ═══", "verify", [
+        ("verify", "verify", "text", "verify"),
+    ]),
+    ("cat-info", "═══ INFORMATION ═══", "readonly", [
+        ("announcements", "📢│announcements", "text", "readonly"),
+        ("rules", "📋│rules", "text", "readonly"),
+        ("changelog", "📝│changelog", "text", "readonly"),
+        ("links", "🔗│links", "text", "readonly"),
+    ]),
+    ("cat-community", "═══ COMMUNITY ═══", "verified", [
+        ("general", "💬│general", "text", "verified"),
+        ("media", "🖼️│media", "text", "verified"),
+        ("bot-commands", "🤖│bot-commands", "text", "verified"),
+        ("giveaways", "🎉│giveaways", "text", "verified"),
+    ]),
+    ("cat-support", "═══ SUPPORT ═══", "verified", [
+        ("faq", "❓│faq", "text", "readonly"),
+        ("documentation", "📖│documentation", "text", "readonly"),
+        ("create-ticket", "🎫│create-ticket", "text", "readonly"),
+    ]),
+    ("cat-premium", "═══ PREMIUM ═══", "verified", [
+        ("claim-premium", "🔑│claim-premium", "text", "readonly"),
+        ("premium-chat", "⭐│premium-chat", "text", "premium"),
+        ("premium-support", "📦│premium-support", "text", "premium"),
+    ]),
+    ("cat-showcase", "═══ SHOWCASE ═══", "readonly", [
+        ("bot-showcase", "🖥️│bot-showcase", "text", "readonly"),
+        ("reviews", "⭐│reviews", "text", "readonly"),
+    ]),
+    ("cat-staff", "═══ STAFF ═══", "staff", [
+        ("staff-chat", "📋│staff-chat", "text", "staff"),
+        ("staff-logs", "📊│staff-logs", "text", "staff"),
+        ("admin-chat", "🔒│admin-chat", "text", "admin"),
+    ]),
+    ("cat-logs", "═══ LOGS ═══", "logs", [
+        ("mod-logs", "📝│mod-logs", "text", "logs"),
+        ("join-leave", "📨│join-leave", "text", "logs"),
+        ("bot-logs", "📊│bot-logs", "text", "logs"),
+    ]),
+    ("ticket_category", "═══ TICKETS ═══", "tickets", []),
+    ("cat-voice", "═══ VOICE ═══", "verified", [
+        ("general-voice", "🔊 General Voice", "voice", "verified"),
+        ("support-voice", "🔊 Support Voice", "voice", "verified"),
+        ("staff-voice", "🔊 Staff Voice", "voice", "staff"),
+    ]),
+]
+
+# channel key -> ServerSetup method that posts its content
+SETUP_CONTENT = {
+    "verify": "send_verify_embed",
+    "rules": "send_rules_embed",
+    "links": "send_links_embed",
+    "faq": "send_faq_embed",
+    "bot-showcase": "send_showcase_embed",
+    "claim-premium": "send_claim_embed",
+}
+
+# Per-route (rate/s, burst) kept under Discord's usual 5-per-5s buckets.
+# "messages" and "channel" budgets are per channel, the rest per guild.
+SETUP_ROUTE_LIMITS = {
+    "roles": (1.0, 1),
+    "channels": (1.0, 1),
+    "channel": (1.0, 1),
+    "messages": (1.0, 1),
+    "members": (1.0, 1),
+    "guild": (0.4, 1),
+}
+SETUP_CONCURRENCY = 8
+
+
+def _preset_roles(preset):
+    return [name for name in OVERWRITE_PRESETS[preset] if name != "@everyone"]
+
+
 # ═══════════════════════════════════════════════════════════════
 #  VERIFY PERSISTENT VIEW
 # ═══════════════════════════════════════════════════════════════
@@ -91,399 +214,200 @@ class ServerSetup(commands.Cog):
     async def cog_load(self):
         print("[COG] Server Setup module loaded.")
 
-    # ─── ROLE CREATION ────────────────────────────────────────
-
-    async def create_roles(self, guild: discord.Guild):
-        """Create all roles in order (bottom to top)."""
-        roles = {}
-
-        role_list = [
-            # (name, color, hoist, mentionable)
-            ("👤 Member", 0x95A5A6, False, False),
-            ("✅ Verified", 0x2ECC71, False, False),
-            ("💎 Basic", 0x3498DB, True, False),
-            ("⭐ Premium", 0xF1C40F, True, False),
-            ("🚀 Business", 0xE91E63, True, False),
-            ("💼 Staff", 0xE67E22, True, True),
-            ("👮 Moderator", 0x3498DB, True, True),
-            ("🛡️ Admin", 0xE74C3C, True, True),
-            ("👑 Owner", 0x9B59B6, True, False),
-        ]
-
-        for name, color, hoist, mentionable in role_list:
-            existing = discord.utils.get(guild.roles, name=name)
-            if existing:
-                roles[name] = existing
-            else:
-                try:
-                    role = await guild.create_role(
-                        name=name,
-                        color=discord.Color(color),
-                        hoist=hoist,
-                        mentionable=mentionable,
-                        reason="Hubix Server Setup"
-                    )
-                    roles[name] = role
-                except Exception as e:
-                    print(f"[SETUP] Failed to create role {name}: {e}")
-
-        return roles
-
-    # ─── CATEGORY & CHANNEL CREATION ─────────────────────────
-
-    async def create_channels(self, guild: discord.Guild, roles: dict):
-        """Create all categories and channels with proper permissions."""
-        channels = {}
-        bot_member = guild.me
-
-        everyone = guild.default_role
-        verified = roles.get("✅ Verified")
-        member = roles.get("👤 Member")
-        staff = roles.get("💼 Staff")
-        mod = roles.get("👮 Moderator")
-        admin = roles.get("🛡️ Admin")
-        owner_role = roles.get("👑 Owner")
-        premium = roles.get("⭐ Premium")
-        basic = roles.get("💎 Basic")
-        business = roles.get("🚀 Business")
-
-        # ── Helper: base deny everyone, allow verified ──
-        def verified_perms():
-            overwrites = {
-                everyone: discord.PermissionOverwrite(view_channel=False),
-                bot_member: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, manage_messages=True,
-                    embed_links=True, attach_files=True, manage_channels=True
-                ),
-            }
-            if verified:
-                overwrites[verified] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True
-                )
-            return overwrites
-
-        def readonly_perms():
-            overwrites = {
-                everyone: discord.PermissionOverwrite(view_channel=False),
-                bot_member: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, manage_messages=True,
-                    embed_links=True, attach_files=True, manage_channels=True
-                ),
-            }
-            if verified:
-                overwrites[verified] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=False, read_message_history=True
+    # ─── BUILD PLAN ───────────────────────────────────────────
+
+    def resolve_overwrites(self, guild: discord.Guild, roles: dict, preset: str):
+        """Turn an OVERWRITE_PRESETS entry into a discord.py overwrites dict."""
+        overwrites = {guild.me: discord.PermissionOverwrite(**_BOT)}
+        for target, perms in OVERWRITE_PRESETS[preset].items():
+            obj = guild.default_role if target == "@everyone" else roles.get(target)
+            if obj:
+                overwrites[obj] = discord.PermissionOverwrite(**perms)
+        return overwrites
+
+    def build_setup_graph(self, guild: discord.Guild, user, progress: dict):
+        """Plan the template as a TaskGraph diffed against what the guild already has.
+
+        `progress` is {step: object_id} from earlier runs, so an interrupted
+        build picks up the objects it already made. Returns (graph, roles, channels);
+        the dicts fill in as steps complete.
+        """
+        graph = TaskGraph(SETUP_ROUTE_LIMITS)
+        roles, channels = {}, {}
+        keep = set()
+
+        def recorded(step, pool):
+            oid = progress.get(step)
+            return discord.utils.get(pool, id=oid) if oid else None
+
+        for name, color, hoist, mentionable in SETUP_ROLES:
+            existing = recorded(f"role:{name}", guild.roles) or discord.utils.get(guild.roles, name=name)
+            graph.add(f"role:{name}", partial(
+                self._ensure_role, graph, guild, roles, existing, name, color, hoist, mentionable
+            ))
+        role_steps = [f"role:{name}" for name, *_ in SETUP_ROLES]
+        graph.add("role-order", partial(self._order_roles, graph, guild, roles), role_steps)
+        graph.add("owner-role", partial(self._assign_owner, graph, roles, user), ["role:👑 Owner"])
+
+        content_steps = []
+        for cat_pos, (cat_key, cat_name, cat_preset, items) in enumerate(SERVER_LAYOUT):
+            cat = recorded(f"channel:{cat_key}", guild.categories) or discord.utils.get(guild.categories, name=cat_name)
+            if cat:
+                keep.add(cat.id)
+            graph.add(f"channel:{cat_key}", partial(
+                self._ensure_category, graph, guild, roles, channels, cat, cat_key, cat_name, cat_preset, cat_pos
+            ), [f"role:{r}" for r in _preset_roles(cat_preset)])
+
+            for pos, (key, name, kind, preset) in enumerate(items):
+                pool = guild.text_channels if kind == "text" else guild.voice_channels
+                existing = (
+                    recorded(f"channel:{key}", pool)
+                    or (cat and discord.utils.get(pool, name=name, category_id=cat.id))
+                    or discord.utils.get(pool, name=name)
                 )
-            return overwrites
-
-        def staff_perms():
-            overwrites = {
-                everyone: discord.PermissionOverwrite(view_channel=False),
-                bot_member: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, manage_messages=True,
-                    embed_links=True, attach_files=True, manage_channels=True
-                ),
-            }
-            if staff:
-                overwrites[staff] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True
-                )
-            if mod:
-                overwrites[mod] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True,
-                    manage_messages=True
-                )
-            if admin:
-                overwrites[admin] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True,
-                    manage_messages=True, manage_channels=True
-                )
-            if owner_role:
-                overwrites[owner_role] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True,
-                    manage_messages=True, manage_channels=True
-                )
-            return overwrites
-
-        def admin_perms():
-            overwrites = {
-                everyone: discord.PermissionOverwrite(view_channel=False),
-                bot_member: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, manage_messages=True,
-                    embed_links=True, attach_files=True, manage_channels=True
-                ),
-            }
-            if admin:
-                overwrites[admin] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True,
-                    manage_messages=True, manage_channels=True
-                )
-            if owner_role:
-                overwrites[owner_role] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True,
-                    manage_messages=True, manage_channels=True
-                )
-            return overwrites
-
-        def premium_perms():
-            overwrites = {
-                everyone: discord.PermissionOverwrite(view_channel=False),
-                bot_member: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, manage_messages=True,
-                    embed_links=True, attach_files=True, manage_channels=True
-                ),
-            }
-            if premium:
-                overwrites[premium] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True
-                )
-            if basic:
-                overwrites[basic] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True
-                )
-            if business:
-                overwrites[business] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True
-                )
-            if staff:
-                overwrites[staff] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True
-                )
-            if admin:
-                overwrites[admin] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True
-                )
-            if owner_role:
-                overwrites[owner_role] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True
-                )
-            return overwrites
+                if existing:
+                    keep.add(existing.id)
+                graph.add(f"channel:{key}", partial(
+                    self._ensure_channel, graph, guild, roles, channels, existing, cat_key, key, name, kind, preset, pos
+                ), [f"channel:{cat_key}"] + [f"role:{r}" for r in _preset_roles(preset)])
+
+                if key in SETUP_CONTENT:
+                    graph.add(f"content:{key}", partial(
+                        self._post_content, graph, guild, channels, progress, key, SETUP_CONTENT[key]
+                    ), [f"channel:{key}"])
+                    content_steps.append(f"content:{key}")
 
-        def verify_channel_perms():
-            overwrites = {
-                everyone: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=False, read_message_history=True
-                ),
-                bot_member: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, manage_messages=True,
-                    embed_links=True, attach_files=True, manage_channels=True
-                ),
-            }
-            if verified:
-                overwrites[verified] = discord.PermissionOverwrite(view_channel=False)
-            return overwrites
-
-        def logs_perms():
-            overwrites = {
-                everyone: discord.PermissionOverwrite(view_channel=False),
-                bot_member: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, manage_messages=True,
-                    embed_links=True, attach_files=True, manage_channels=True
-                ),
-            }
-            if admin:
-                overwrites[admin] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=False, read_message_history=True
-                )
-            if owner_role:
-                overwrites[owner_role] = discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True
+        for channel in guild.channels:
+            if channel.id not in keep:
+                graph.add(f"prune:{channel.id}", partial(self._delete_channel, graph, channel))
+
+        graph.add("guild-name", partial(self._rename_guild, graph, guild))
+        graph.add("content:complete", partial(
+            self._post_complete, graph, guild, roles, channels, progress
+        ), content_steps + ["channel:general"])
+        return graph, roles, channels
+
+    # ─── BUILD STEPS ──────────────────────────────────────────
+    # Each returns (object or None, "created" | "updated" | "unchanged" | "deleted").
+
+    async def _ensure_role(self, graph, guild, roles, existing, name, color, hoist, mentionable):
+        if existing:
+            roles[name] = existing
+            if (existing.name, existing.color.value, existing.hoist, existing.mentionable) == (name, color, hoist, mentionable):
+                return existing, "unchanged"
+            async with graph.limit("roles"):
+                await existing.edit(
+                    name=name, color=discord.Color(color), hoist=hoist,
+                    mentionable=mentionable, reason="Hubix Server Setup"
                 )
-            return overwrites
-
-        # ════════════════════════════════════════════════════════
-        #  CREATE CATEGORIES & CHANNELS
-        # ════════════════════════════════════════════════════════
-
-        # ── VERIFY (top, everyone can see) ──
-        cat_verify = await guild.create_category(
-            "═══ VERIFY ═══",
-            overwrites=verify_channel_perms(),
-            reason="Hubix Setup"
-        )
-        channels["verify"] = await cat_verify.create_text_channel(
-            "verify", overwrites=verify_channel_perms(), reason="Hubix Setup"
-        )
-
-        # ── INFORMATION ──
-        cat_info = await guild.create_category(
-            "═══ INFORMATION ═══",
-            overwrites=readonly_perms(),
-            reason="Hubix Setup"
-        )
-        channels["announcements"] = await cat_info.create_text_channel(
-            "📢│announcements", overwrites=readonly_perms(), reason="Hubix Setup"
-        )
-        channels["rules"] = await cat_info.create_text_channel(
-            "📋│rules", overwrites=readonly_perms(), reason="Hubix Setup"
-        )
-        channels["changelog"] = await cat_info.create_text_channel(
-            "📝│changelog", overwrites=readonly_perms(), reason="Hubix Setup"
-        )
-        channels["links"] = await cat_info.create_text_channel(
-            "🔗│links", overwrites=readonly_perms(), reason="Hubix Setup"
-        )
-
-        # ── COMMUNITY ──
-        cat_community = await guild.create_category(
-            "═══ COMMUNITY ═══",
-            overwrites=verified_perms(),
-            reason="Hubix Setup"
-        )
-        channels["general"] = await cat_community.create_text_channel(
-            "💬│general", overwrites=verified_perms(), reason="Hubix Setup"
-        )
-        channels["media"] = await cat_community.create_text_channel(
-            "🖼️│media", overwrites=verified_perms(), reason="Hubix Setup"
-        )
-        channels["bot-commands"] = await cat_community.create_text_channel(
-            "🤖│bot-commands", overwrites=verified_perms(), reason="Hubix Setup"
-        )
-        channels["giveaways"] = await cat_community.create_text_channel(
-            "🎉│giveaways", overwrites=verified_perms(), reason="Hubix Setup"
-        )
-
-        # ── SUPPORT ──
-        cat_support = await guild.create_category(
-            "═══ SUPPORT ═══",
-            overwrites=verified_perms(),
-            reason="Hubix Setup"
-        )
-        channels["faq"] = await cat_support.create_text_channel(
-            "❓│faq", overwrites=readonly_perms(), reason="Hubix Setup"
-        )
-        channels["documentation"] = await cat_support.create_text_channel(
-            "📖│documentation", overwrites=readonly_perms(), reason="Hubix Setup"
-        )
-        channels["create-ticket"] = await cat_support.create_text_channel(
-            "🎫│create-ticket",
-            overwrites={
-                everyone: discord.PermissionOverwrite(view_channel=False),
-                bot_member: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, manage_messages=True,
-                    embed_links=True, attach_files=True, manage_channels=True
-                ),
-                **({verified: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=False, read_message_history=True
-                )} if verified else {})
-            },
-            reason="Hubix Setup"
-        )
-
-        # ── PREMIUM ──
-        cat_premium = await guild.create_category(
-            "═══ PREMIUM ═══",
-            overwrites=verified_perms(),
-            reason="Hubix Setup"
-        )
-        channels["claim-premium"] = await cat_premium.create_text_channel(
-            "🔑│claim-premium",
-            overwrites={
-                everyone: discord.PermissionOverwrite(view_channel=False),
-                bot_member: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, manage_messages=True,
-                    embed_links=True, attach_files=True, manage_channels=True
-                ),
-                **({verified: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=False, read_message_history=True
-                )} if verified else {})
-            },
-            reason="Hubix Setup"
-        )
-        channels["premium-chat"] = await cat_premium.create_text_channel(
-            "⭐│premium-chat", overwrites=premium_perms(), reason="Hubix Setup"
-        )
-        channels["premium-support"] = await cat_premium.create_text_channel(
-            "📦│premium-support", overwrites=premium_perms(), reason="Hubix Setup"
-        )
-
-        # ── SHOWCASE ──
-        cat_showcase = await guild.create_category(
-            "═══ SHOWCASE ═══",
-            overwrites=readonly_perms(),
-            reason="Hubix Setup"
-        )
-        channels["bot-showcase"] = await cat_showcase.create_text_channel(
-            "🖥️│bot-showcase", overwrites=readonly_perms(), reason="Hubix Setup"
-        )
-        channels["reviews"] = await cat_showcase.create_text_channel(
-            "⭐│reviews", overwrites=readonly_perms(), reason="Hubix Setup"
-        )
-
-        # ── STAFF ──
-        cat_staff = await guild.create_category(
-            "═══ STAFF ═══",
-            overwrites=staff_perms(),
-            reason="Hubix Setup"
-        )
-        channels["staff-chat"] = await cat_staff.create_text_channel(
-            "📋│staff-chat", overwrites=staff_perms(), reason="Hubix Setup"
-        )
-        channels["staff-logs"] = await cat_staff.create_text_channel(
-            "📊│staff-logs", overwrites=staff_perms(), reason="Hubix Setup"
-        )
-        channels["admin-chat"] = await cat_staff.create_text_channel(
-            "🔒│admin-chat", overwrites=admin_perms(), reason="Hubix Setup"
-        )
-
-        # ── LOGS ──
-        cat_logs = await guild.create_category(
-            "═══ LOGS ═══",
-            overwrites=logs_perms(),
-            reason="Hubix Setup"
-        )
-        channels["mod-logs"] = await cat_logs.create_text_channel(
-            "📝│mod-logs", overwrites=logs_perms(), reason="Hubix Setup"
-        )
-        channels["join-leave"] = await cat_logs.create_text_channel(
-            "📨│join-leave", overwrites=logs_perms(), reason="Hubix Setup"
-        )
-        channels["bot-logs"] = await cat_logs.create_text_channel(
-            "📊│bot-logs", overwrites=logs_perms(), reason="Hubix Setup"
-        )
-
-        # ── TICKETS (empty category) ──
-        cat_tickets = await guild.create_category(
-            "═══ TICKETS ═══",
-            overwrites={
-                everyone: discord.PermissionOverwrite(view_channel=False),
-                bot_member: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, manage_messages=True,
-                    manage_channels=True, embed_links=True, attach_files=True
-                ),
-                **({staff: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True
-                )} if staff else {}),
-                **({mod: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True,
-                    manage_messages=True
-                )} if mod else {}),
-                **({admin: discord.PermissionOverwrite(
-                    view_channel=True, send_messages=True, read_message_history=True,
-                    manage_messages=True, manage_channels=True
-                )} if admin else {}),
-            },
-            reason="Hubix Setup"
-        )
-        channels["ticket_category"] = cat_tickets
-
-        # ── VOICE ──
-        cat_voice = await guild.create_category(
-            "═══ VOICE ═══",
-            overwrites=verified_perms(),
-            reason="Hubix Setup"
-        )
-        channels["general-voice"] = await cat_voice.create_voice_channel(
-            "🔊 General Voice", overwrites=verified_perms(), reason="Hubix Setup"
-        )
-        channels["support-voice"] = await cat_voice.create_voice_channel(
-            "🔊 Support Voice", overwrites=verified_perms(), reason="Hubix Setup"
-        )
-        channels["staff-voice"] = await cat_voice.create_voice_channel(
-            "🔊 Staff Voice", overwrites=staff_perms(), reason="Hubix Setup"
+            return existing, "updated"
+        async with graph.limit("roles"):
+            role = await guild.create_role(
+                name=name,
+                color=discord.Color(color),
+                hoist=hoist,
+                mentionable=mentionable,
+                reason="Hubix Server Setup"
+            )
+        roles[name] = role
+        return role, "created"
+
+    async def _order_roles(self, graph, guild, roles):
+        ordered = [roles[name] for name, *_ in SETUP_ROLES if name in roles]
+        slots = sorted(r.position for r in ordered)
+        if [r.position for r in ordered] == slots:
+            return None, "unchanged"
+        async with graph.limit("roles"):
+            await guild.edit_role_positions(positions=dict(zip(ordered, slots)), reason="Hubix Server Setup")
+        return None, "updated"
+
+    async def _assign_owner(self, graph, roles, user):
+        role = roles.get("👑 Owner")
+        if not role or role in user.roles:
+            return None, "unchanged"
+        async with graph.limit("members"):
+            await user.add_roles(role, reason="Server Setup")
+        return None, "updated"
+
+    async def _ensure_category(self, graph, guild, roles, channels, existing, key, name, preset, position):
+        overwrites = self.resolve_overwrites(guild, roles, preset)
+        if existing:
+            channels[key] = existing
+            if existing.name == name and existing.overwrites == overwrites:
+                return existing, "unchanged"
+            async with graph.limit(f"channel:{existing.id}"):
+                await existing.edit(name=name, overwrites=overwrites, reason="Hubix Setup")
+            return existing, "updated"
+        async with graph.limit("channels"):
+            category = await guild.create_category(
+                name, overwrites=overwrites, position=position, reason="Hubix Setup"
+            )
+        channels[key] = category
+        return category, "created"
+
+    async def _ensure_channel(self, graph, guild, roles, channels, existing, cat_key, key, name, kind, preset, position):
+        category = channels[cat_key]
+        overwrites = self.resolve_overwrites(guild, roles, preset)
+        if existing:
+            channels[key] = existing
+            if (existing.name == name and existing.category_id == category.id
+                    and existing.overwrites == overwrites):
+                return existing, "unchanged"
+            async with graph.limit(f"channel:{existing.id}"):
+                await existing.edit(name=name, category=category, overwrites=overwrites, reason="Hubix Setup")
+            return existing, "updated"
+        create = category.create_text_channel if kind == "text" else category.create_voice_channel
+        async with graph.limit("channels"):
+            channel = await create(name, overwrites=overwrites, position=position, reason="Hubix Setup")
+        channels[key] = channel
+        return channel, "created"
+
+    async def _post_content(self, graph, guild, channels, progress, key, method):
+        channel = channels[key]
+        if progress.get(f"content:{key}") == channel.id:
+            return channel, "unchanged"
+        async with graph.limit(f"messages:{channel.id}"):
+            await getattr(self, method)(channel, guild)
+        return channel, "created"
+
+    async def _delete_channel(self, graph, channel):
+        async with graph.limit(f"channel:{channel.id}"):
+            await channel.delete(reason="Hubix Setup — Cleanup")
+        return None, "deleted"
+
+    async def _rename_guild(self, graph, guild):
+        if guild.name == "Hubix":
+            return None, "unchanged"
+        async with graph.limit("guild"):
+            await guild.edit(name="Hubix", reason="Server Setup")
+        return None, "updated"
+
+    async def _post_complete(self, graph, guild, roles, channels, progress):
+        general = channels["general"]
+        if progress.get("content:complete") == general.id:
+            return general, "unchanged"
+        complete_embed = discord.Embed(
+            title="🎉 Server Setup Complete!",
+            description=(
+                "The **Hubix** official server has been set up successfully!\n\n"
+                "**Created:**\n"
+                f"• 🏷️ {len(roles)} roles\n"
+                f"• 📁 {len(channels)} channels\n"
+                "• ✅ Verify system\n"
+                "• 📋 Rules\n"
+                "• ❓ FAQ\n"
+                "• 🖥️ Bot showcase\n"
+                "• 🔑 Claim premium panel\n\n"
+                "Welcome to Hubix! 🚀"
+            ),
+            color=SUCCESS_COLOR,
+            timestamp=datetime.now(timezone.utc)
         )
-
-        return channels
+        if guild.icon:
+            complete_embed.set_thumbnail(url=guild.icon.url)
+        async with graph.limit(f"messages:{general.id}"):
+            await general.send(embed=complete_embed)
+        return general, "created"
 
     # ─── SEND EMBEDS ──────────────────────────────────────────
 
@@ -935,20 +859,10 @@ class ServerSetup(commands.Cog):
         embed.set_footer(text="Hubix • Links")
         await channel.send(embed=embed)
 
-    # ─── DELETE EXISTING CHANNELS ─────────────────────────────
-
-    async def cleanup_server(self, guild: discord.Guild):
-        """Delete all existing channels and categories."""
-        for channel in guild.channels:
-            try:
-                await channel.delete(reason="Hubix Setup — Cleanup")
-            except:
-                pass
-
     # ─── MAIN SETUP COMMAND ───────────────────────────────────
 
     @app_commands.command(name="setupserver", description="🏗️ Setup the official Hubix server (Owner Only)")
-    @app_commands.describe(confirm="Type 'CONFIRM' to proceed — this will DELETE all existing channels!")
+    @app_commands.describe(confirm="Type 'CONFIRM' to proceed — this will DELETE channels outside the Hubix layout!")
     async def setup_server(self, interaction: discord.Interaction, confirm: str):
         if interaction.user.id not in OWNER_IDS:
             return await interaction.response.send_message(
@@ -965,7 +879,8 @@ class ServerSetup(commands.Cog):
                 embed=discord.Embed(
                     title="⚠️ Confirmation Required",
                     description=(
-                        "This will **DELETE ALL existing channels** and rebuild the server from scratch!\n\n"
+                        "This will **DELETE every channel that isn't part of the Hubix layout** "
+                        "and create or fix the rest. Matching roles and channels are kept.\n\n"
                         "Use `/setupserver confirm:CONFIRM` to proceed."
                     ),
                     color=0xFEE75C
@@ -991,8 +906,8 @@ class ServerSetup(commands.Cog):
             dm = await user.create_dm()
             progress_msg = await dm.send(
                 embed=discord.Embed(
-                    title="🏗️ Step 1/6 — Cleaning Up...",
-                    description=f"Deleting existing channels in **{guild.name}**...",
+                    title="🏗️ Planning Setup...",
+                    description=f"Comparing **{guild.name}** with the Hubix layout...",
                     color=HUBIX_PURPLE
                 )
             )
@@ -1000,117 +915,59 @@ class ServerSetup(commands.Cog):
             return  # Can't DM user
 
         try:
-            # Step 1: Cleanup
-            await self.cleanup_server(guild)
-
-            # Step 2: Create Roles
-            await progress_msg.edit(
-                embed=discord.Embed(
-                    title="🏗️ Step 2/6 — Creating Roles...",
-                    description="Setting up roles...",
-                    color=HUBIX_PURPLE
-                )
+            progress = await get_setup_progress(guild.id)
+            graph, roles, channels = self.build_setup_graph(guild, user, progress)
+            tally = {"created": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+            state = {"done": 0, "edited": time.monotonic()}
+
+            async def on_step(key, outcome):
+                state["done"] += 1
+                if outcome[0] == "done":
+                    obj, action = outcome[1]
+                    tally[action] += 1
+                    if obj is not None:
+                        await record_setup_step(guild.id, key, obj.id)
+                if time.monotonic() - state["edited"] >= 2:
+                    state["edited"] = time.monotonic()
+                    try:
+                        await progress_msg.edit(
+                            embed=discord.Embed(
+                                title="🏗️ Building Server...",
+                                description=(
+                                    f"**{state['done']}/{len(graph.steps)}** steps\n"
+                                    f"➕ {tally['created']} created | ✏️ {tally['updated']} updated | "
+                                    f"🗑️ {tally['deleted']} removed | ✔️ {tally['unchanged']} already fine"
+                                ),
+                                color=HUBIX_PURPLE
+                            )
+                        )
+                    except discord.HTTPException:
+                        pass
+
+            results = await graph.run(SETUP_CONCURRENCY, on_step)
+            failed = [(k, r[1]) for k, r in results.items() if r[0] == "failed"]
+            skipped = [k for k, r in results.items() if r[0] == "skipped"]
+            summary = (
+                f"• ➕ {tally['created']} created\n"
+                f"• ✏️ {tally['updated']} updated\n"
+                f"• 🗑️ {tally['deleted']} removed\n"
+                f"• ✔️ {tally['unchanged']} already up to date\n"
             )
-            roles = await self.create_roles(guild)
-
-            # Assign Owner role to the person running the command
-            owner_role = roles.get("👑 Owner")
-            if owner_role:
-                try:
-                    await user.add_roles(owner_role, reason="Server Setup")
-                except:
-                    pass
 
-            # Step 3: Create Channels
-            await progress_msg.edit(
-                embed=discord.Embed(
-                    title="🏗️ Step 3/6 — Creating Channels...",
-                    description="Setting up categories and channels...",
-                    color=HUBIX_PURPLE
-                )
-            )
-            channels = await self.create_channels(guild, roles)
-
-            # Step 4: Send Embeds
-            await progress_msg.edit(
-                embed=discord.Embed(
-                    title="🏗️ Step 4/6 — Sending Content...",
-                    description="Setting up verify, rules, FAQ...",
-                    color=HUBIX_PURPLE
-                )
-            )
-
-            # Verify
-            if channels.get("verify"):
-                await self.send_verify_embed(channels["verify"], guild)
-
-            # Rules
-            if channels.get("rules"):
-                await self.send_rules_embed(channels["rules"], guild)
-
-            # Links
-            if channels.get("links"):
-                await self.send_links_embed(channels["links"], guild)
-
-            # FAQ
-            if channels.get("faq"):
-                await self.send_faq_embed(channels["faq"], guild)
-
-            # Step 5: Showcase & Claim
-            await progress_msg.edit(
-                embed=discord.Embed(
-                    title="🏗️ Step 5/6 — Setting Up Panels...",
-                    description="Showcase, Claim Premium...",
-                    color=HUBIX_PURPLE
-                )
-            )
-
-            # Bot Showcase
-            if channels.get("bot-showcase"):
-                await self.send_showcase_embed(channels["bot-showcase"], guild)
-
-            # Claim Premium
-            if channels.get("claim-premium"):
-                await self.send_claim_embed(channels["claim-premium"], guild)
-
-            # Step 6: Final
-            await progress_msg.edit(
-                embed=discord.Embed(
-                    title="🏗️ Step 6/6 — Finishing Up...",
-                    description="Almost done...",
-                    color=HUBIX_PURPLE
-                )
-            )
-
-            # Set server name if needed
-            try:
-                if guild.name != "Hubix":
-                    await guild.edit(name="Hubix", reason="Server Setup")
-            except:
-                pass
-
-            # Send completion message in general
-            if channels.get("general"):
-                complete_embed = discord.Embed(
-                    title="🎉 Server Setup Complete!",
-                    description=(
-                        "The **Hubix** official server has been set up successfully!\n\n"
-                        "**Created:**\n"
-                        f"• 🏷️ {len(roles)} roles\n"
-                        f"• 📁 {len([c for c in channels.values() if isinstance(c, (discord.TextChannel, discord.VoiceChannel, discord.CategoryChannel))])} channels\n"
-                        "• ✅ Verify system\n"
-                        "• 📋 Rules\n"
-                        "• ❓ FAQ\n"
-                        "• 🖥️ Bot showcase\n"
-                        "• 🔑 Claim premium panel\n\n"
-                        "Welcome to Hubix! 🚀"
-                    ),
-                    color=SUCCESS_COLOR,
-                    timestamp=datetime.now(timezone.utc)
+            if failed:
+                lines = "\n".join(f"`{k}` — {str(e)[:80]}" for k, e in failed[:10])
+                await progress_msg.edit(
+                    embed=discord.Embed(
+                        title="⚠️ Setup Incomplete",
+                        description=(
+                            f"{summary}\n**{len(failed)} failed, {len(skipped)} waiting on them:**\n{lines}\n\n"
+                            f"Run `/setupserver confirm:CONFIRM` again to resume — finished steps are kept."
+                        )[:4000],
+                        color=ERROR_COLOR,
+                        timestamp=datetime.now(timezone.utc)
+                    )
                 )
-                if guild.icon:
-                    complete_embed.set_thumbnail(url=guild.icon.url)
-                await channels["general"].send(embed=complete_embed)
+                return
 
             # Final DM
             await progress_msg.edit(
@@ -1118,7 +975,8 @@ class ServerSetup(commands.Cog):
                     title="✅ Setup Complete!",
                     description=(
                         f"The **Hubix** server has been set up successfully!\n\n"
-                        f"**Created:**\n"
+                        f"**Changes:**\n{summary}\n"
+                        f"**Layout:**\n"
                         f"• 🏷️ {len(roles)} roles\n"
                         f"• 📁 {len(channels)} channels/categories\n"
                         f"• ✅ Verify system\n"
@@ -1161,7 +1019,9 @@ class ServerSetup(commands.Cog):
 
         try:
             await self.bot.unload_extension("cogs.server_setup")
-            await self.bot.tree.sync()
+            await self.bot.sync_commands()
+            if interaction.guild:
+                await clear_setup_progress(interaction.guild.id)   # resume state is meaningless without the module
             await interaction.response.send_message(
                 embed=discord.Embed(
                     title="✅ Setup Module Unloaded",
@@ -9,13 +9,19 @@ from utils.database import (
     get_all_subscriptions, get_active_subscriptions,
     get_subscription_logs, get_subscription_stats, get_expiring_soon,
     create_license_key, get_license_key, redeem_license_key,
-    get_all_license_keys, delete_license_key, get_license_key_stats
+    get_all_license_keys, delete_license_key, get_license_key_stats,
+    create_changelog, get_changelog, get_undelivered_changelog_guilds,
+    record_changelog_deliveries, get_changelog_delivery_stats
 )
+from utils.broadcast import broadcast
+from utils.metrics import TASK_SECONDS, timed
 from config import (
     OWNER_ID, OWNER_IDS, OWNER_COLOR, SUCCESS_COLOR, ERROR_COLOR, WARNING_COLOR,
-    PLANS, get_plan_limits, get_plan_info
+    PLANS, get_plan_limits, get_plan_info, CHANGELOG_CHANNEL
 )
 
+CHANGELOG_NAMES = (CHANGELOG_CHANNEL, "changelog")
+
 
 # ═══════════════════════════════════════════════════════════════
 #  PERMISSION CHECK HELPER
@@ -472,7 +478,8 @@ class KeyManagementView(discord.ui.View):
                 "📜 **Logs** — Recent activity\n"
                 "🌐 **Bot Servers** — All servers bot is in\n"
                 "🔑 **Keys** — License key management\n"
-                "📝 **Changelog** — Post changelog to servers"
+                "📝 **Changelog** — Post changelog to servers\n"
+                "🔄 **Sync Commands** — Force a slash command sync"
             ),
             inline=False
         )
@@ -774,45 +781,129 @@ class ChangelogModal(discord.ui.Modal, title="📝 Post Changelog"):
     )
 
     async def on_submit(self, interaction):
-        from config import CHANGELOG_CHANNEL
-
-        # Find changelog channel in all guilds
-        sent_to = []
-        for guild in interaction.client.guilds:
-            for channel in guild.text_channels:
-                if channel.name == CHANGELOG_CHANNEL or channel.name == "changelog":
-                    try:
-                        embed = discord.Embed(
-                            title=f"📝 {self.version_input.value} — {self.changelog_title_input.value}",
-                            description=self.changes_input.value,
-                            color=0x9B59B6,
-                            timestamp=datetime.now(timezone.utc)
-                        )
-                        if self.notes_input.value:
-                            embed.add_field(name="📌 Notes", value=self.notes_input.value, inline=False)
-                        embed.set_footer(text=f"Hubix Changelog • {self.version_input.value}")
-                        if guild.icon:
-                            embed.set_thumbnail(url=guild.icon.url)
-                        await channel.send(embed=embed)
-                        sent_to.append(guild.name)
-                    except:
-                        pass
-                    break
-
-        if sent_to:
-            desc = "\n".join([f"✅ **{name}**" for name in sent_to])
-            embed = discord.Embed(
-                title=f"📝 Changelog Posted!",
-                description=f"Sent to {len(sent_to)} server(s):\n{desc}",
-                color=SUCCESS_COLOR
-            )
-        else:
+        cog = interaction.client.get_cog("Subscription")
+        targets = cog.changelog_targets() if cog else {}
+        if not targets:
             embed = discord.Embed(
                 title="❌ No Changelog Channels Found",
                 description=f"No channels named `{CHANGELOG_CHANNEL}` or `changelog` found.",
                 color=ERROR_COLOR
             )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        changelog_id = await create_changelog(
+            self.version_input.value, self.changelog_title_input.value,
+            self.changes_input.value, self.notes_input.value or "",
+            interaction.user.id, targets.items()
+        )
+        await run_changelog_broadcast(interaction, changelog_id, list(targets))
+
+
+def build_changelog_embed(changelog):
+    embed = discord.Embed(
+        title=f"📝 {changelog['version']} — {changelog['title']}",
+        description=changelog["changes"],
+        color=0x9B59B6,
+        timestamp=datetime.now(timezone.utc)
+    )
+    if changelog.get("notes"):
+        embed.add_field(name="📌 Notes", value=changelog["notes"], inline=False)
+    embed.set_footer(text=f"Hubix Changelog • {changelog['version']}")
+    return embed
+
+
+def changelog_progress_embed(changelog, done, total, sent, failed):
+    embed = discord.Embed(
+        title=f"📤 Posting Changelog {changelog['version']}…",
+        description=f"**{done}/{total}** servers processed\n✅ {sent} sent | ❌ {failed} failed",
+        color=OWNER_COLOR
+    )
+    return embed
+
+
+async def run_changelog_broadcast(interaction, changelog_id, guild_ids):
+    """Deliver a stored changelog to `guild_ids` and report progress in a follow-up.
+    Expects the interaction to be deferred already."""
+    client = interaction.client
+    cog = client.get_cog("Subscription")
+    changelog = await get_changelog(changelog_id)
+    index = cog.changelog_targets() if cog else {}
+    base = build_changelog_embed(changelog)
+
+    targets = []
+    for gid in guild_ids:
+        guild = client.get_guild(gid)
+        targets.append((gid, guild.get_channel(index[gid]) if guild and gid in index else None))
+
+    async def send(guild_id, channel):
+        embed = base.copy()
+        if channel.guild.icon:
+            embed.set_thumbnail(url=channel.guild.icon.url)
+        await channel.send(embed=embed)
+
+    counts = {"sent": 0, "failed": 0}
+    msg = await interaction.followup.send(
+        embed=changelog_progress_embed(changelog, 0, len(targets), 0, 0), ephemeral=True, wait=True
+    )
+
+    async def on_progress(done, total, batch):
+        for r in batch:
+            counts[r[2]] += 1
+        await record_changelog_deliveries(changelog_id, batch)
+        try:
+            await msg.edit(embed=changelog_progress_embed(changelog, done, total, counts["sent"], counts["failed"]))
+        except discord.HTTPException:
+            pass
+
+    results = await broadcast(targets, send, on_progress=on_progress)
+
+    failed = [r for r in results if r[2] == "failed"]
+    stats = await get_changelog_delivery_stats(changelog_id)
+    embed = discord.Embed(
+        title="📝 Changelog Posted!" if not failed else "⚠️ Changelog Partially Posted",
+        description=(
+            f"**{changelog['version']}** — sent to {counts['sent']} server(s) this run.\n"
+            f"Total delivered: **{stats.get('sent', 0)}** | Outstanding: **{len(failed)}**"
+        ),
+        color=SUCCESS_COLOR if not failed else WARNING_COLOR
+    )
+    if failed:
+        lines = []
+        for gid, _, _, error in failed[:10]:
+            guild = client.get_guild(gid)
+            lines.append(f"❌ **{guild.name if guild else gid}** — {error}")
+        if len(failed) > 10:
+            lines.append(f"… and {len(failed) - 10} more")
+        embed.add_field(name="Failed", value="\n".join(lines)[:1024], inline=False)
+    view = ChangelogRetryView(changelog_id) if failed else None
+    try:
+        await msg.edit(embed=embed, view=view)
+    except discord.HTTPException:
+        pass
+
+
+async def retry_changelog(interaction, changelog_id=None):
+    changelog = await get_changelog(changelog_id)
+    if not changelog:
+        return await interaction.response.send_message("❌ No changelog has been posted yet.", ephemeral=True)
+    guild_ids = await get_undelivered_changelog_guilds(changelog["id"])
+    if not guild_ids:
+        return await interaction.response.send_message(
+            f"✅ Changelog **{changelog['version']}** has been delivered everywhere.", ephemeral=True
+        )
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    await run_changelog_broadcast(interaction, changelog["id"], guild_ids)
+
+
+class ChangelogRetryView(discord.ui.View):
+    def __init__(self, changelog_id):
+        super().__init__(timeout=600)
+        self.changelog_id = changelog_id
+
+    @discord.ui.button(label="Retry Failed", style=discord.ButtonStyle.primary, emoji="🔁")
+    async def retry_btn(self, interaction, btn):
+        await retry_changelog(interaction, self.changelog_id)
 
 
 class OwnerPanelView(discord.ui.View):
@@ -990,6 +1081,10 @@ class OwnerPanelView(discord.ui.View):
     async def changelog_btn(self, interaction, btn):
         await interaction.response.send_modal(ChangelogModal())
 
+    @discord.ui.button(label="Retry Changelog", style=discord.ButtonStyle.secondary, emoji="🔁", row=2)
+    async def changelog_retry_btn(self, interaction, btn):
+        await retry_changelog(interaction)
+
     @discord.ui.button(label="Bot Servers", style=discord.ButtonStyle.secondary, emoji="🌐", row=2)
     async def bot_servers_btn(self, interaction, btn):
         guilds = sorted(interaction.client.guilds, key=lambda g: g.member_count or 0, reverse=True)
@@ -1009,6 +1104,16 @@ class OwnerPanelView(discord.ui.View):
         embed.set_footer(text=f"Total: {len(guilds)} servers | {total_members} members")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @discord.ui.button(label="Sync Commands", style=discord.ButtonStyle.secondary, emoji="🔄", row=2)
+    async def sync_btn(self, interaction, btn):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        report = await interaction.client.sync_commands(force=True)
+        desc = "\n".join(
+            f"{'✅' if status == 'synced' else '❌'} **{label}** — {detail}" for label, status, detail in report
+        )
+        embed = discord.Embed(title="🔄 Command Sync", description=desc, color=OWNER_COLOR)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
 
 # ═══════════════════════════════════════════════════════════════
 #  SUBSCRIPTION COG
@@ -1029,6 +1134,7 @@ class Subscription(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.changelog_channels = {}  # guild_id -> changelog channel id
         self.expiry_check.start()
 
     def cog_unload(self):
@@ -1039,6 +1145,7 @@ class Subscription(commands.Cog):
 
     # ─── Auto Expiry Check ───────────────────────────────────
     @tasks.loop(hours=6)
+    @timed(TASK_SECONDS, "expiry_check")
     async def expiry_check(self):
         """Check for expired subscriptions and notify owner."""
         try:
@@ -1075,10 +1182,50 @@ class Subscription(commands.Cog):
     async def before_expiry(self):
         await self.bot.wait_until_ready()
 
+    # ─── Changelog Channel Index ─────────────────────────────
+    def index_changelog_channel(self, guild):
+        channel = next((c for c in guild.text_channels if c.name in CHANGELOG_NAMES), None)
+        if channel:
+            self.changelog_channels[guild.id] = channel.id
+        else:
+            self.changelog_channels.pop(guild.id, None)
+
+    def changelog_targets(self):
+        """guild_id -> channel_id for every guild with a changelog channel."""
+        if not self.changelog_channels and self.bot.is_ready():
+            for guild in self.bot.guilds:
+                self.index_changelog_channel(guild)
+        return dict(self.changelog_channels)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.changelog_channels.clear()
+        for guild in self.bot.guilds:
+            self.index_changelog_channel(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        if isinstance(channel, discord.TextChannel) and channel.name in CHANGELOG_NAMES:
+            self.index_changelog_channel(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        if self.changelog_channels.get(channel.guild.id) == channel.id:
+            self.index_changelog_channel(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        if not isinstance(after, discord.TextChannel):
+            return
+        if before.name != after.name or before.position != after.position:
+            if before.name in CHANGELOG_NAMES or after.name in CHANGELOG_NAMES:
+                self.index_changelog_channel(after.guild)
+
     # ─── Auto create free sub when bot joins ─────────────────
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
         """Auto-create free subscription when bot joins a server."""
+        self.index_changelog_channel(guild)
         sub = await get_subscription(guild.id)
         if not sub:
             await create_subscription(guild.id, "free", self.bot.user.id, notes="Auto-created on join")
@@ -1105,6 +1252,7 @@ class Subscription(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_remove(self, guild):
         """Notify owner when bot is removed."""
+        self.changelog_channels.pop(guild.id, None)
         try:
             owner = self.bot.get_user(OWNER_ID)
             if owner:
@@ -1178,7 +1326,8 @@ class Subscription(commands.Cog):
                 "📜 **Logs** — Recent activity\n"
                 "🌐 **Bot Servers** — All servers bot is in\n"
                 "🔑 **Keys** — License key management\n"
-                "📝 **Changelog** — Post changelog to servers"
+                "📝 **Changelog** — Post changelog to servers\n"
+                "🔄 **Sync Commands** — Force a slash command sync"
             ),
             inline=False
         )
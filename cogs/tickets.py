@@ -11,13 +11,15 @@ from utils.database import (
     remove_ticket_category, get_ticket_category_by_name,
     create_ticket, get_ticket_by_channel, get_open_tickets_by_user,
     get_all_open_tickets, close_ticket, claim_ticket, set_ticket_priority,
-    get_ticket_stats, save_ticket_message, get_ticket_messages
+    get_ticket_stats, save_ticket_message, get_ticket_messages, search_tickets
 )
 from config import (
     EMBED_COLOR, SUCCESS_COLOR, ERROR_COLOR, WARNING_COLOR,
     TICKET_COLOR, PANEL_COLOR, get_plan_limits
 )
 from utils.database import get_guild_plan
+from utils.membercache import get_member
+from utils.pager import ResultPager
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -26,7 +28,7 @@ from utils.database import get_guild_plan
 
 async def generate_transcript(ticket: dict, messages: list[dict], guild: discord.Guild) -> str:
     """Generate an HTML transcript for a ticket."""
-    user = guild.get_member(ticket["user_id"])
+    user = await get_member(guild, ticket["user_id"])
     user_name = str(user) if user else f"Unknown ({ticket['user_id']})"
 
     html = f"""<!DOCTYPE html>
@@ -365,7 +367,7 @@ class ClosedTicketView(discord.ui.View):
             await db.commit()
 
         # Restore permissions
-        user = interaction.guild.get_member(ticket["user_id"])
+        user = await get_member(interaction.guild, ticket["user_id"])
         if user:
             await interaction.channel.set_permissions(user, read_messages=True, send_messages=True)
 
@@ -541,7 +543,7 @@ async def handle_ticket_close(interaction: discord.Interaction, ticket: dict, se
     # Update channel
     try:
         await channel.edit(name=f"closed-{ticket['ticket_number']:04d}")
-        user = guild.get_member(ticket["user_id"])
+        user = await get_member(guild, ticket["user_id"])
         if user:
             await channel.set_permissions(user, read_messages=True, send_messages=False)
     except:
@@ -563,7 +565,7 @@ async def handle_ticket_close(interaction: discord.Interaction, ticket: dict, se
     await channel.send(**kwargs)
 
     # DM the user
-    user = guild.get_member(ticket["user_id"])
+    user = await get_member(guild, ticket["user_id"])
     if user:
         try:
             dm_embed = discord.Embed(
@@ -968,6 +970,36 @@ class Tickets(commands.Cog):
         view = TicketManagementView(self)
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
+    @app_commands.command(name="ticketsearch", description="🔎 Search past tickets and their messages")
+    @app_commands.describe(query="Words to look for in messages, categories or close reasons; end a word with * to match its start")
+    @app_commands.default_permissions(manage_guild=True)
+    async def ticket_search(self, interaction: discord.Interaction, query: str):
+        guild_id = interaction.guild.id
+
+        def render(rows, page):
+            embed = discord.Embed(title=f"🔎 Tickets matching “{query[:80]}”", color=TICKET_COLOR)
+            for t in rows:
+                state = "🟢 Open" if t["status"] == "open" else "🔴 Closed"
+                where = f"<#{t['channel_id']}>" if t["status"] == "open" else f"closed {str(t.get('closed_at') or '')[:10]}"
+                value = f"<@{t['user_id']}> | {where}"
+                if t["hits"]:
+                    value += f" | {t['hits']} matching message(s)\n> {t['snippet'] or ''}"
+                elif t.get("close_reason"):
+                    value += f"\nReason: {t['close_reason']}"
+                embed.add_field(
+                    name=f"🎫 #{t['ticket_number']:04d} — {t['category_name']} | {state}",
+                    value=value[:1024],
+                    inline=False
+                )
+            if not rows:
+                embed.description = "*No matching tickets.*"
+            embed.set_footer(text=f"Page {page + 1} • Best matches first")
+            return embed
+
+        view = ResultPager(lambda offset, limit: search_tickets(guild_id, query, limit, offset), render)
+        await view.load()
+        await interaction.response.send_message(embed=view.build_page(), view=view, ephemeral=True)
+
 
 async def setup(bot):
     await bot.add_cog(Tickets(bot))
\ No newline at end of file
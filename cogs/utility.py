@@ -1,8 +1,9 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from datetime import datetime, timezone
 from typing import Literal, Optional
+import asyncio
 import aiohttp
 
 from config import (
@@ -15,6 +16,13 @@ from utils.database import (
     get_auto_role, set_auto_role, remove_auto_role,
     get_bot_customization, set_bot_customization, reset_bot_customization
 )
+from utils.joinburst import JoinBatcher, join_detector
+from utils.membercache import approximate_online, member_stats
+from utils.memberstats import MEMBER_STATS
+from utils.metrics import EVENT_SECONDS, TASK_SECONDS, timed
+from utils.msgcache import MESSAGE_CACHE, MESSAGE_CACHE_CONTENT, MESSAGE_CACHE_REFRESH_SECONDS, CachedMessage
+
+AUTOROLE_CONCURRENCY = 5  # parallel add_roles calls when a join burst is flushed
 
 
 async def send_upgrade_message(interaction: discord.Interaction, feature_name: str, current_plan: str):
@@ -37,6 +45,26 @@ class Utility(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        self.join_batcher = JoinBatcher(self._flush_join_batch)
+        self.refresh_message_cache.start()
+
+    async def cog_unload(self):
+        self.refresh_message_cache.cancel()
+        await self.join_batcher.drain()
+
+    # ─── Message Cache Policy ────────────────────────────────
+    @tasks.loop(seconds=MESSAGE_CACHE_REFRESH_SECONDS)
+    @timed(TASK_SECONDS, "message_cache_refresh")
+    async def refresh_message_cache(self):
+        """Cache message content only for guilds that log edits / deletes (plans change too)."""
+        try:
+            await MESSAGE_CACHE.refresh()
+        except Exception as e:
+            print(f"[LOGGING] Message cache refresh error: {e}")
+
+    @refresh_message_cache.before_loop
+    async def before_refresh_message_cache(self):
+        await self.bot.wait_until_ready()
 
     # ═══════════════════════════════════════════════════════════
     #  /ping — Bot Latency
@@ -66,9 +94,15 @@ class Utility(commands.Cog):
         categories = len(guild.categories)
         roles = len(guild.roles) - 1
 
-        online = sum(1 for m in guild.members if m.status != discord.Status.offline)
-        bots = sum(1 for m in guild.members if m.bot)
-        humans = guild.member_count - bots
+        deferred = MEMBER_STATS.get(guild.id) is None
+        if deferred:
+            await interaction.response.defer()   # the first count may chunk the guild
+        stats = await member_stats(guild)
+        bots, humans = stats.bots, stats.humans
+        if stats.online is not None:
+            online = len(stats.online)
+        else:
+            online = await approximate_online(self.bot, guild)
 
         embed = discord.Embed(
             title=f"📊 {guild.name}",
@@ -79,7 +113,7 @@ class Utility(commands.Cog):
         if guild.icon:
             embed.set_thumbnail(url=guild.icon.url)
 
-        embed.add_field(name="👑 Owner", value=f"{guild.owner.mention}" if guild.owner else "Unknown", inline=True)
+        embed.add_field(name="👑 Owner", value=f"<@{guild.owner_id}>" if guild.owner_id else "Unknown", inline=True)
         embed.add_field(name="🆔 Server ID", value=f"`{guild.id}`", inline=True)
         embed.add_field(name="📅 Created", value=f"<t:{int(guild.created_at.timestamp())}:R>", inline=True)
 
@@ -106,7 +140,10 @@ class Utility(commands.Cog):
             embed.set_image(url=guild.banner.url)
 
         embed.set_footer(text=f"Requested by {interaction.user}", icon_url=interaction.user.display_avatar.url)
-        await interaction.response.send_message(embed=embed)
+        if deferred:
+            await interaction.followup.send(embed=embed)
+        else:
+            await interaction.response.send_message(embed=embed)
 
     # ═══════════════════════════════════════════════════════════
     #  /userinfo — User Information
@@ -449,9 +486,15 @@ class Utility(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
+        MEMBER_STATS.member_join(member.guild.id, member)
         if member.bot:
             return
 
+        # --- Join burst: hand off to the batched pipeline ---
+        if join_detector(self.bot).observe(member.guild.id, member.id):
+            self.join_batcher.add(member)
+            return
+
         # --- Auto Role ---
         ar = await get_auto_role(member.guild.id)
         if ar and ar.get("enabled"):
@@ -472,68 +515,180 @@ class Utility(commands.Cog):
          .add_field(name="📅 Account Created", value=f"<t:{int(member.created_at.timestamp())}:R>", inline=True)
          .set_thumbnail(url=member.display_avatar.url))
 
+    async def _flush_join_batch(self, members):
+        """Raid mode: one auto-role lookup, bounded add_roles fan-out, one summary log."""
+        guild = members[0].guild
+
+        ar = await get_auto_role(guild.id)
+        if ar and ar.get("enabled"):
+            role = guild.get_role(ar["role_id"])
+            if role and role < guild.me.top_role:
+                sem = asyncio.Semaphore(AUTOROLE_CONCURRENCY)
+
+                async def give(m):
+                    async with sem:
+                        try:
+                            await m.add_roles(role, reason="Hubix Auto Role")
+                        except Exception:
+                            pass
+
+                await asyncio.gather(*(give(m) for m in members))
+
+        now = datetime.now(timezone.utc)
+        fresh = sum(1 for m in members if (now - m.created_at).days < 7)
+        shown = ", ".join(m.mention for m in members[:20])
+        if len(members) > 20:
+            shown += f" … and {len(members) - 20} more"
+
+        await self._log_event(guild, "log_members", discord.Embed(
+            title="👥 Join Burst",
+            description=f"**{len(members)}** members joined in a burst.",
+            color=ERROR_COLOR,
+            timestamp=now
+        ).add_field(name="🆕 Accounts < 7 days", value=f"**{fresh}**", inline=True)
+         .add_field(name="👤 Members", value=shown[:1024], inline=False))
+
     # ═══════════════════════════════════════════════════════════
     #  EVENT: Member Leave
     # ═══════════════════════════════════════════════════════════
 
     @commands.Cog.listener()
-    async def on_member_remove(self, member: discord.Member):
-        if member.bot:
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent):
+        # Raw: on_member_remove only fires for members still in the cache, and
+        # under MEMBER_CACHE "joined" / "voice" / "none" most leavers aren't.
+        # payload.user is the Member if it was cached, else a plain User.
+        MEMBER_STATS.member_remove(payload.guild_id, payload.user)
+
+        user = payload.user
+        guild = self.bot.get_guild(payload.guild_id)
+        if user.bot or guild is None:
             return
 
-        roles = [r.mention for r in member.roles if r != member.guild.default_role]
-        roles_text = ", ".join(roles[:10]) if roles else "None"
-
-        await self._log_event(member.guild, "log_members", discord.Embed(
+        embed = discord.Embed(
             title="👤 Member Left",
-            description=f"{member.mention} ({member})",
+            description=f"{user.mention} ({user})",
             color=ERROR_COLOR,
             timestamp=datetime.now(timezone.utc)
-        ).add_field(name="🆔 ID", value=f"`{member.id}`", inline=True)
-         .add_field(name="🏷️ Roles", value=roles_text, inline=False)
-         .set_thumbnail(url=member.display_avatar.url))
+        ).add_field(name="🆔 ID", value=f"`{user.id}`", inline=True)
+        if getattr(user, "roles", None) is not None:
+            roles = [r.mention for r in user.roles if r != guild.default_role]
+            embed.add_field(name="🏷️ Roles", value=", ".join(roles[:10]) if roles else "None", inline=False)
+        embed.set_thumbnail(url=user.display_avatar.url)
+        await self._log_event(guild, "log_members", embed)
+
+    # ═══════════════════════════════════════════════════════════
+    #  EVENT: Member counters (utils.memberstats)
+    # ═══════════════════════════════════════════════════════════
+
+    @commands.Cog.listener()
+    async def on_raw_presence_update(self, payload: discord.RawPresenceUpdateEvent):
+        MEMBER_STATS.presence(payload.guild_id, payload.user_id, payload.status)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        MEMBER_STATS.forget(guild.id)
+
+    # ═══════════════════════════════════════════════════════════
+    #  EVENT: Message (content cache for edit / delete logs)
+    # ═══════════════════════════════════════════════════════════
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.guild and not message.author.bot and MESSAGE_CACHE.enabled(message.guild.id):
+            MESSAGE_CACHE.add(message)
 
     # ═══════════════════════════════════════════════════════════
     #  EVENT: Message Delete
     # ═══════════════════════════════════════════════════════════
 
     @commands.Cog.listener()
-    async def on_message_delete(self, message: discord.Message):
-        if not message.guild or message.author.bot:
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if not payload.guild_id or not MESSAGE_CACHE.enabled(payload.guild_id):
+            return
+        cached = MESSAGE_CACHE.pop(payload.guild_id, payload.message_id)
+        if cached is None:
+            if payload.cached_message is None or payload.cached_message.author.bot:
+                return
+            cached = CachedMessage.of(payload.cached_message)
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild is None:
             return
 
-        content = message.content[:1024] if message.content else "*No text content*"
-
-        await self._log_event(message.guild, "log_messages", discord.Embed(
+        embed = discord.Embed(
             title="🗑️ Message Deleted",
-            description=f"**Author:** {message.author.mention}\n**Channel:** {message.channel.mention}",
+            description=f"**Author:** <@{cached.author_id}>\n**Channel:** <#{cached.channel_id}>",
+            color=ERROR_COLOR,
+            timestamp=datetime.now(timezone.utc)
+        ).add_field(name="📝 Content", value=cached.content or "*No text content*", inline=False)
+        if cached.attachments:
+            embed.add_field(name="📎 Attachments", value="\n".join(cached.attachments)[:1024], inline=False)
+        author = guild.get_member(cached.author_id)
+        if author:
+            embed.set_thumbnail(url=author.display_avatar.url)
+        await self._log_event(guild, "log_messages", embed)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        # AutoMod's flood purges and batched deletes (utils.bulkdelete) land here
+        if not payload.guild_id or not MESSAGE_CACHE.enabled(payload.guild_id):
+            return
+        deleted = MESSAGE_CACHE.pop_many(payload.guild_id, payload.message_ids)
+        seen = {m.id for m in deleted}
+        deleted += [CachedMessage.of(m) for m in payload.cached_messages
+                    if m.id not in seen and not m.author.bot]
+        guild = self.bot.get_guild(payload.guild_id)
+        if not deleted or guild is None:
+            return
+
+        deleted.sort(key=lambda m: m.id)
+        lines = []
+        for m in deleted:
+            text = m.content or "*No text content*"
+            lines.append(f"<@{m.author_id}>: {text[:100]}{'…' if len(text) > 100 else ''}")
+        shown = "\n".join(lines)
+        if len(shown) > 3500:
+            shown = shown[:3500].rsplit("\n", 1)[0] + "\n…"
+
+        await self._log_event(guild, "log_messages", discord.Embed(
+            title="🗑️ Messages Bulk Deleted",
+            description=f"**Channel:** <#{payload.channel_id}>\n**Messages:** {len(payload.message_ids)} "
+                        f"({len(deleted)} with known content)\n\n{shown}",
             color=ERROR_COLOR,
             timestamp=datetime.now(timezone.utc)
-        ).add_field(name="📝 Content", value=content, inline=False)
-         .set_thumbnail(url=message.author.display_avatar.url))
+        ))
 
     # ═══════════════════════════════════════════════════════════
     #  EVENT: Message Edit
     # ═══════════════════════════════════════════════════════════
 
     @commands.Cog.listener()
-    async def on_message_edit(self, before: discord.Message, after: discord.Message):
-        if not before.guild or before.author.bot:
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if not payload.guild_id or not MESSAGE_CACHE.enabled(payload.guild_id):
             return
-        if before.content == after.content:
+        after = payload.message
+        if after.author.bot or "content" not in payload.data:
             return
-
-        before_content = before.content[:512] if before.content else "*Empty*"
-        after_content = after.content[:512] if after.content else "*Empty*"
-
-        await self._log_event(before.guild, "log_messages", discord.Embed(
+        cached = MESSAGE_CACHE.get(payload.guild_id, payload.message_id)
+        if cached is None:
+            if payload.cached_message is None:
+                return
+            cached = CachedMessage.of(payload.cached_message)
+        new_content = after.content[:MESSAGE_CACHE_CONTENT]
+        if cached.content == new_content:
+            return   # embed unfurl or pin, not an edit
+        before_content = cached.content
+        cached.content = new_content
+        cached.attachments = tuple(a.url for a in after.attachments)
+        cached.edited_at = payload.data.get("edited_timestamp")
+
+        await self._log_event(after.guild, "log_messages", discord.Embed(
             title="✏️ Message Edited",
-            description=f"**Author:** {before.author.mention}\n**Channel:** {before.channel.mention}\n[Jump to message]({after.jump_url})",
+            description=f"**Author:** {after.author.mention}\n**Channel:** <#{payload.channel_id}>\n[Jump to message]({after.jump_url})",
             color=0xFFA500,
             timestamp=datetime.now(timezone.utc)
-        ).add_field(name="📝 Before", value=before_content, inline=False)
-         .add_field(name="📝 After", value=after_content, inline=False)
-         .set_thumbnail(url=before.author.display_avatar.url))
+        ).add_field(name="📝 Before", value=before_content[:512] or "*Empty*", inline=False)
+         .add_field(name="📝 After", value=new_content[:512] or "*Empty*", inline=False)
+         .set_thumbnail(url=after.author.display_avatar.url))
 
     # ═══════════════════════════════════════════════════════════
     #  EVENT: Member Ban
@@ -666,6 +821,8 @@ class Utility(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
+        # Only dispatched for cached members: under MEMBER_CACHE other than "full"
+        # that's members who joined since startup (or whose guild was chunked).
         if before.bot:
             return
 
@@ -705,6 +862,7 @@ class Utility(commands.Cog):
     #  HELPER: Log Event to Channel
     # ═══════════════════════════════════════════════════════════
 
+    @timed(EVENT_SECONDS, "Utility._log_event")
     async def _log_event(self, guild: discord.Guild, log_type: str, embed: discord.Embed):
         """Send a log embed to the configured log channel if enabled."""
         try:
@@ -913,6 +1071,7 @@ class LoggingChannelModal(discord.ui.Modal, title="📍 Set Log Channel"):
             return await interaction.response.send_message("❌ Channel not found!", ephemeral=True)
 
         await update_logging_setting(self.guild_id, "log_channel_id", channel_id)
+        await MESSAGE_CACHE.refresh_guild(self.guild_id)
         await interaction.response.send_message(
             embed=discord.Embed(
                 title="✅ Log Channel Set",
@@ -935,6 +1094,7 @@ class LoggingSetupView(discord.ui.View):
         current = settings["enabled"] if settings else 0
         new_val = 0 if current else 1
         await update_logging_setting(self.guild_id, "enabled", new_val)
+        await MESSAGE_CACHE.refresh_guild(self.guild_id)
         status = "🟢 Enabled" if new_val else "🔴 Disabled"
         await interaction.response.send_message(
             embed=discord.Embed(title=f"📋 Logging {status}", color=SUCCESS_COLOR if new_val else ERROR_COLOR),
@@ -953,6 +1113,7 @@ class LoggingSetupView(discord.ui.View):
         settings = await get_logging_settings(self.guild_id)
         current = settings.get("log_messages", 1) if settings else 1
         await update_logging_setting(self.guild_id, "log_messages", 0 if current else 1)
+        await MESSAGE_CACHE.refresh_guild(self.guild_id)
         await interaction.response.send_message(f"{'✅ Enabled' if not current else '❌ Disabled'} message logging", ephemeral=True)
 
     @discord.ui.button(label="Toggle Members", style=discord.ButtonStyle.secondary, emoji="👥", row=1)
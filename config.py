@@ -8,6 +8,8 @@ _owner_ids_raw = os.getenv("OWNER_IDS", "1222608506516144158")
 OWNER_IDS = [int(x.strip()) for x in _owner_ids_raw.split(",") if x.strip()]
 OWNER_ID = OWNER_IDS[0]  # Primary owner (backward compatibility)
 PREFIX = "!"
+# Development: sync commands to these guilds only (instant) instead of globally
+DEV_GUILD_IDS = [int(x.strip()) for x in os.getenv("DEV_GUILD_IDS", "").split(",") if x.strip()]
 
 EMBED_COLOR = 0x5865F2
 SUCCESS_COLOR = 0x57F287
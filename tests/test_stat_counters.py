@@ -0,0 +1,224 @@
+"""
+The aggregate stats functions against the queries they replaced.
+
+The same workload (inserts, status flips, price and plan changes, deletes)
+runs with STAT_COUNTERS off and on; after it, every stats function must
+return what the original per-status queries (reference_* below, as they were
+before the rewrite) return. Revenue is REAL, and the counters reach it
+through many +/- deltas, so it is compared to the cent.
+"""
+
+import asyncio
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+import utils.database as database
+
+GUILDS = (111, 222)
+ORDER_STATUSES = ["pending", "processing", "delivered", "cancelled", "refunded"]
+PLANS = ["free", "basic", "premium", "business"]
+
+
+# ─── The original implementations ──────────────────────────────
+
+def reference_ticket_stats(db, guild_id):
+    one = lambda sql, *a: db.execute(sql, a).fetchone()[0]
+    return {
+        "open": one("SELECT COUNT(*) FROM tickets WHERE guild_id=? AND status='open'", guild_id),
+        "closed": one("SELECT COUNT(*) FROM tickets WHERE guild_id=? AND status='closed'", guild_id),
+        "total": one("SELECT COUNT(*) FROM tickets WHERE guild_id=?", guild_id),
+    }
+
+
+def reference_order_stats(db, guild_id):
+    one = lambda sql, *a: db.execute(sql, a).fetchone()[0]
+    stats = {st: one("SELECT COUNT(*) FROM orders WHERE guild_id=? AND status=?", guild_id, st)
+             for st in ORDER_STATUSES}
+    stats["total"] = one("SELECT COUNT(*) FROM orders WHERE guild_id=?", guild_id)
+    stats["total_revenue"] = one(
+        "SELECT COALESCE(SUM(price), 0) FROM orders WHERE guild_id=? AND status='delivered'", guild_id)
+    return stats
+
+
+def reference_subscription_stats(db):
+    one = lambda sql, *a: db.execute(sql, a).fetchone()[0]
+    stats = {plan: one("SELECT COUNT(*) FROM subscriptions WHERE plan=?", plan) for plan in PLANS}
+    stats["total"] = one("SELECT COUNT(*) FROM subscriptions")
+    stats["total_revenue"] = one("SELECT COALESCE(SUM(total_paid), 0) FROM subscriptions")
+    stats["expired"] = one(
+        "SELECT COUNT(*) FROM subscriptions WHERE plan != 'free' AND expires_at IS NOT NULL "
+        "AND expires_at < ?", datetime.now(timezone.utc).isoformat())
+    return stats
+
+
+def reference_license_key_stats(db):
+    one = lambda sql: db.execute(sql).fetchone()[0]
+    return {
+        "available": one("SELECT COUNT(*) FROM license_keys WHERE redeemed=0"),
+        "used": one("SELECT COUNT(*) FROM license_keys WHERE redeemed=1"),
+        "total": one("SELECT COUNT(*) FROM license_keys"),
+    }
+
+
+def reference_rating(db, guild_id):
+    avg, count = db.execute("SELECT AVG(rating), COUNT(*) FROM order_reviews WHERE guild_id=?",
+                            (guild_id,)).fetchone()
+    return {"average": round(avg, 1) if avg else 0, "count": count}
+
+
+# ─── Workload ──────────────────────────────────────────────────
+
+async def workload():
+    # Tickets: open, close some, reopen one, delete a few
+    for g in GUILDS:
+        for n in range(12):
+            await database.create_ticket(g, g * 1000 + n, 500 + n, "Support", n + 1)
+        for n in range(0, 12, 2):
+            await database.close_ticket(g * 1000 + n, 1)
+    async with database._connect() as db:
+        await db.execute("UPDATE tickets SET status='open' WHERE channel_id=?", (GUILDS[0] * 1000,))
+        await db.execute("DELETE FROM tickets WHERE channel_id IN (?, ?, ?)",
+                         (GUILDS[0] * 1000 + 1, GUILDS[0] * 1000 + 2, GUILDS[1] * 1000 + 3))
+        await db.commit()
+
+    # Orders: cent prices that don't add up exactly in binary, status flips back
+    # and forth through "delivered", a price change and deletes
+    order_ids = {g: [] for g in GUILDS}
+    prices = [0.1, 0.2, 0.3, 19.99, 4.95, 0.07, 12.5, 0.01]
+    for g in GUILDS:
+        for n, price in enumerate(prices * 3):
+            oid = await database.create_order(g, n + 1, 700 + n, n % 4 + 1, f"product{n % 4}", price)
+            order_ids[g].append(oid)
+    for round_ in range(6):
+        for g in GUILDS:
+            for i, oid in enumerate(order_ids[g]):
+                if (i + round_) % 3 == 0:
+                    await database.update_order_status(oid, "delivered", 1)
+                elif (i + round_) % 3 == 1:
+                    await database.update_order_status(oid, ORDER_STATUSES[(i + round_) % 5], 1)
+    async with database._connect() as db:
+        await db.execute("UPDATE orders SET price=price+0.1 WHERE id=?", (order_ids[GUILDS[0]][0],))
+        await db.execute("DELETE FROM orders WHERE id IN (?, ?)", (order_ids[GUILDS[0]][1], order_ids[GUILDS[1]][2]))
+        await db.commit()
+
+    # Reviews: add, then remove one
+    review_ids = []
+    for g in GUILDS:
+        for n, oid in enumerate(order_ids[g][3:9]):
+            await database.add_review(g, oid, 900 + n, n % 5 + 1, "ok")
+    async with database._connect() as db:
+        c = await db.execute("SELECT id FROM order_reviews ORDER BY id")
+        review_ids = [r[0] for r in await c.fetchall()]
+    await database.delete_review(review_ids[0])
+
+    # Subscriptions: create, pay, upgrade, extend, revoke, delete, one already expired
+    for n, g in enumerate(GUILDS + (333, 444, 555)):
+        await database.create_subscription(g, PLANS[n % 4], 1, days=30, amount=0.1 * n)
+    await database.update_subscription_plan(GUILDS[0], "premium", 1, days=30, amount=9.99)
+    await database.update_subscription_plan(GUILDS[1], "business", 1, amount=0.3)
+    await database.extend_subscription(GUILDS[1], 30, 1, amount=0.7)
+    await database.revoke_subscription(333, 1)
+    async with database._connect() as db:
+        await db.execute("UPDATE subscriptions SET expires_at='2000-01-01T00:00:00+00:00' WHERE guild_id=444")
+        await db.execute("DELETE FROM subscriptions WHERE guild_id=555")
+        await db.commit()
+
+    # License keys: create, redeem, delete
+    for n in range(8):
+        await database.create_license_key(f"KEY-{n}", PLANS[1 + n % 3], 30, 1)
+    for n in range(3):
+        await database.redeem_license_key(f"KEY-{n}", 42, GUILDS[0])
+    await database.delete_license_key("KEY-1")
+    await database.delete_license_key("KEY-5")
+
+
+async def collect():
+    stats = {"subscriptions": await database.get_subscription_stats(),
+             "keys": await database.get_license_key_stats()}
+    for g in GUILDS:
+        stats[f"tickets:{g}"] = await database.get_ticket_stats(g)
+        stats[f"orders:{g}"] = await database.get_order_stats(g)
+        stats[f"rating:{g}"] = await database.get_average_rating(g)
+        stats[f"reviews:{g}"] = await database.get_review_count(g)
+    return stats
+
+
+def reference(path):
+    with sqlite3.connect(path) as db:
+        stats = {"subscriptions": reference_subscription_stats(db), "keys": reference_license_key_stats(db)}
+        for g in GUILDS:
+            stats[f"tickets:{g}"] = reference_ticket_stats(db, g)
+            stats[f"orders:{g}"] = reference_order_stats(db, g)
+            stats[f"rating:{g}"] = reference_rating(db, g)
+            stats[f"reviews:{g}"] = stats[f"rating:{g}"]["count"]
+    return stats
+
+
+def assert_same(got, expected):
+    assert got.keys() == expected.keys()
+    for key, want in expected.items():
+        have = got[key]
+        if isinstance(want, dict):
+            assert have.keys() == want.keys(), key
+            for field, value in want.items():
+                if field == "total_revenue":
+                    assert have[field] == pytest.approx(value, abs=0.005), (key, field)
+                else:
+                    assert have[field] == value, (key, field)
+        else:
+            assert have == want, key
+
+
+@pytest.fixture(params=[False, True], ids=["aggregate", "counters"])
+def stat_counters(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "nexify.db"))
+    monkeypatch.setattr(database, "STAT_COUNTERS", request.param)
+    return request.param
+
+
+def test_stats_match_original_queries(stat_counters):
+    async def run():
+        await database.init_db()
+        await workload()
+        got = await collect()
+        await database.close_write_queue()
+        return got
+
+    assert_same(asyncio.run(run()), reference(database.DB_PATH))
+
+
+def test_counters_match_aggregates_after_workload(tmp_path, monkeypatch):
+    """Counters kept by triggers through the workload, read back both ways."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "nexify.db"))
+    monkeypatch.setattr(database, "STAT_COUNTERS", True)
+
+    async def run():
+        await database.init_db()
+        await workload()
+        counted = await collect()
+        database.STAT_COUNTERS = False   # same tables, aggregate path
+        aggregated = await collect()
+        await database.close_write_queue()
+        return counted, aggregated
+
+    counted, aggregated = asyncio.run(run())
+    assert_same(counted, aggregated)
+
+
+def test_counters_rebuilt_on_startup(tmp_path, monkeypatch):
+    """Writes made while STAT_COUNTERS was off are picked up when it is turned on."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "nexify.db"))
+    monkeypatch.setattr(database, "STAT_COUNTERS", False)
+
+    async def run():
+        await database.init_db()
+        await workload()
+        database.STAT_COUNTERS = True
+        await database.init_db()
+        got = await collect()
+        await database.close_write_queue()
+        return got
+
+    assert_same(asyncio.run(run()), reference(database.DB_PATH))
@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+import discord
+
+from utils.ratelimit import TokenBucket
+
+BROADCAST_CONCURRENCY = 8    # sends in flight at once
+BROADCAST_RATE = 20          # sends per second across the whole broadcast
+PROGRESS_INTERVAL = 2.0      # seconds between progress callbacks
+
+
+async def broadcast(targets, send, concurrency=BROADCAST_CONCURRENCY, rate=BROADCAST_RATE,
+                    on_progress=None, progress_interval=PROGRESS_INTERVAL):
+    """Fan `send(guild_id, channel)` out over `targets` ((guild_id, channel) pairs).
+
+    Sends run `concurrency` at a time and never faster than `rate` per second.
+    `on_progress(done, total, results)` is awaited at most every
+    `progress_interval` seconds and once at the end; `results` holds only the
+    (guild_id, channel_id, status, error) tuples finished since the previous
+    call so the caller can persist them incrementally. Returns every result.
+    """
+    queue = asyncio.Queue()
+    for target in targets:
+        queue.put_nowait(target)
+    total = len(targets)
+    bucket = TokenBucket(rate)
+    results, unreported = [], []
+    last_report = time.monotonic()
+    report_lock = asyncio.Lock()
+
+    async def report(force=False):
+        nonlocal last_report, unreported
+        if on_progress is None or (report_lock.locked() and not force):
+            return
+        async with report_lock:
+            if not force and time.monotonic() - last_report < progress_interval:
+                return
+            batch, unreported = unreported, []
+            last_report = time.monotonic()
+            try:
+                await on_progress(len(results), total, batch)
+            except Exception as e:
+                print(f"[BROADCAST] Progress callback failed: {e}")
+
+    async def worker():
+        while True:
+            try:
+                guild_id, channel = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if channel is None:
+                result = (guild_id, None, "failed", "channel not found")
+            else:
+                try:
+                    async with bucket:
+                        await send(guild_id, channel)
+                    result = (guild_id, channel.id, "sent", None)
+                except discord.HTTPException as e:
+                    result = (guild_id, channel.id, "failed", f"{e.status} {e.text}"[:200])
+                except Exception as e:
+                    result = (guild_id, channel.id, "failed", f"{type(e).__name__}: {e}"[:200])
+            results.append(result)
+            unreported.append(result)
+            await report()
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    await report(force=True)
+    return results
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+BULK_DELETE_MAX = 100                                           # messages per bulk-delete call
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)  # Discord refuses anything older
+DELETE_BATCH_DELAY = 1.0                                        # seconds between deletes in one channel
+
+
+def bulk_deletable(message_id, now=None):
+    now = now or datetime.now(timezone.utc)
+    return now - discord.utils.snowflake_time(message_id) < BULK_DELETE_MAX_AGE
+
+
+class DeleteBatcher:
+    """Coalesces message deletions per channel into bulk deletes.
+
+    The first deletion in a quiet channel goes out at once. Anything queued
+    for that channel while a call is in flight, or within DELETE_BATCH_DELAY
+    of the last one, waits for the next, so a flood or raid costs one call per
+    channel per DELETE_BATCH_DELAY (delete_messages, chunked at
+    BULK_DELETE_MAX) instead of one call per message. Messages past the
+    14-day bulk limit are deleted one by one.
+    """
+
+    def __init__(self, delay=DELETE_BATCH_DELAY):
+        self.delay = delay
+        self._pending: dict[int, tuple] = {}   # channel_id -> (channel, {message_id})
+        self._last: dict[int, float] = {}      # channel_id -> monotonic time of its last flush
+        self._timers: dict[int, asyncio.Task] = {}
+        self._flushing: set[int] = set()      # channels with a flush in flight
+        self._tasks: set[asyncio.Task] = set()
+
+    def add(self, channel, message_id):
+        self.purge(channel, (message_id,))
+
+    def purge(self, channel, message_ids):
+        """Queue `message_ids` for deletion; flushed now if the channel is quiet."""
+        pending = self._pending.setdefault(channel.id, (channel, set()))
+        pending[1].update(message_ids)
+        if channel.id in self._timers or channel.id in self._flushing:
+            return   # picked up by the scheduled flush / rescheduled when this one ends
+        self._schedule(channel.id)
+
+    def _schedule(self, channel_id):
+        since = time.monotonic() - self._last.get(channel_id, float("-inf"))
+        if since < self.delay:
+            self._timers[channel_id] = self._spawn(self._later(channel_id, self.delay - since))
+        else:
+            self._spawn(self._flush(channel_id))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _later(self, channel_id, delay):
+        await asyncio.sleep(delay)
+        self._timers.pop(channel_id, None)
+        await self._flush(channel_id)
+
+    async def _flush(self, channel_id):
+        pending = self._pending.pop(channel_id, None)
+        if not pending:
+            return
+        self._last[channel_id] = time.monotonic()
+        self._flushing.add(channel_id)
+        try:
+            await self._delete(channel_id, *pending)
+        finally:
+            self._flushing.discard(channel_id)
+            if channel_id in self._pending and channel_id not in self._timers:
+                self._schedule(channel_id)
+
+    async def _delete(self, channel_id, channel, ids):
+        now = datetime.now(timezone.utc)
+        fresh = sorted(i for i in ids if bulk_deletable(i, now))
+        stale = [i for i in ids if not bulk_deletable(i, now)]
+        for i in range(0, len(fresh), BULK_DELETE_MAX):
+            chunk = fresh[i:i + BULK_DELETE_MAX]
+            try:
+                # delete_messages falls back to the single-message route for one id
+                await channel.delete_messages([discord.Object(id=m) for m in chunk])
+            except discord.NotFound:
+                stale.extend(chunk)   # one of them is already gone; the rest go individually
+            except discord.HTTPException as e:
+                print(f"[AUTOMOD] Bulk delete in {channel_id} failed: {e}")
+        for message_id in stale:
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.HTTPException:
+                pass
+
+    def prune(self):
+        """Forget channels that have been quiet for longer than the delay."""
+        cutoff = time.monotonic() - self.delay
+        for channel_id in [c for c, t in self._last.items() if t < cutoff]:
+            del self._last[channel_id]
+
+    async def drain(self):
+        """Delete everything still queued (used on unload)."""
+        while self._pending or self._tasks:
+            for channel_id in list(self._pending):
+                if channel_id in self._flushing:
+                    continue   # its flush reschedules the rest
+                timer = self._timers.pop(channel_id, None)
+                if timer:
+                    timer.cancel()
+                await self._flush(channel_id)
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
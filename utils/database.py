@@ -1,9 +1,68 @@
 import aiosqlite
 import os
+import re
 from datetime import datetime, timedelta, timezone
 
+from utils import metrics as _metrics
+from utils import queryprofile as _queryprofile
+from utils.writequeue import WriteQueue
+
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "nexify.db")
 
+# Serve panel stats from trigger-maintained counters instead of aggregating
+STAT_COUNTERS = os.getenv("STAT_COUNTERS", "0") == "1"
+
+# FTS5 index over tickets, ticket messages and orders for /ticketsearch and /shopsearch
+SEARCH_INDEX = os.getenv("SEARCH_INDEX", "1") == "1"
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "5000"))
+
+
+def _connect():
+    """Open DB_PATH; wrapped by the statement profiler when QUERY_PROFILE=1."""
+    if _queryprofile.PROFILER.enabled:
+        return _queryprofile.connect(DB_PATH)
+    return aiosqlite.connect(DB_PATH)
+
+
+# Batch hot-path inserts into shared transactions (see utils/writequeue.py)
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "1") == "1"
+GROUP_COMMIT_MS = float(os.getenv("GROUP_COMMIT_MS", "2"))
+_writes = WriteQueue(lambda: _connect(), lambda: DB_PATH, max_delay=GROUP_COMMIT_MS / 1000)
+
+
+async def _write(op):
+    """Run `async op(db)` in a committed transaction and return its result."""
+    if GROUP_COMMIT:
+        return await _writes.submit(op)
+    async with _connect() as db:
+        result = await op(db)
+        await db.commit()
+        return result
+
+
+async def close_write_queue():
+    """Flush pending group-commit writes; call before shutdown."""
+    await _writes.close()
+
+
+# In-process version of each guild's shop (settings, plan, products, stock,
+# reviews); every write below that changes what the shop shows bumps it, and
+# caches built from those reads (utils/shopcache.py, utils/shoppanel.py)
+# compare against it.
+_catalog_versions = {}
+
+
+def get_catalog_version(guild_id):
+    return _catalog_versions.get(guild_id, 0)
+
+
+def get_catalog_versions():
+    return dict(_catalog_versions)
+
+
+def _bump_catalog(guild_id):
+    _catalog_versions[guild_id] = _catalog_versions.get(guild_id, 0) + 1
+
 
 # ═══════════════════════════════════════════════════════════════
 #  DATABASE INITIALIZATION
@@ -11,7 +70,7 @@ DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "nexify.db")
 
 async def init_db():
     """Initialize the database and create all tables."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
 
         # ─── Giveaway Tables ────────────────────────────────
         await db.execute("""
@@ -93,6 +152,34 @@ async def init_db():
             )
         """)
 
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS invite_counters (
+                guild_id INTEGER NOT NULL,
+                inviter_id INTEGER NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                leaves INTEGER NOT NULL DEFAULT 0,
+                active INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, inviter_id)
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_invite_counters_active ON invite_counters (guild_id, active DESC, total DESC)"
+        )
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_invite_tracks_invited ON invite_tracks (guild_id, invited_id, joined_at)"
+        )
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_invite_tracks_inviter ON invite_tracks (guild_id, inviter_id, joined_at)"
+        )
+        await backfill_invite_counters(db)
+
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS invite_warmup (
+                guild_id INTEGER PRIMARY KEY,
+                warmed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
         # ─── AutoMod Tables ─────────────────────────────────
         await db.execute("""
             CREATE TABLE IF NOT EXISTS automod_settings (
@@ -316,6 +403,19 @@ async def init_db():
                 FOREIGN KEY (product_id) REFERENCES products(id)
             )
         """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_orders_user ON orders (guild_id, user_id, status)"
+        )
+        # Keyset pagination (get_orders_page): newest first within guild / status / customer
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_orders_page ON orders (guild_id, created_at, id)"
+        )
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_orders_status_page ON orders (guild_id, status, created_at, id)"
+        )
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_orders_user_page ON orders (guild_id, user_id, created_at, id)"
+        )
 
         await db.execute("""
             CREATE TABLE IF NOT EXISTS order_reviews (
@@ -331,6 +431,36 @@ async def init_db():
                 UNIQUE(order_id)
             )
         """)
+        # Running rating sum/count per guild (product_id 0) and per product,
+        # plus the newest REVIEW_RING_SIZE reviews per guild with their order
+        # fields copied in; kept in step by add_review / delete_review.
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS review_aggregates (
+                guild_id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL DEFAULT 0,
+                rating_sum INTEGER NOT NULL DEFAULT 0,
+                rating_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, product_id)
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS recent_reviews (
+                id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                order_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                rating INTEGER NOT NULL,
+                comment TEXT DEFAULT '',
+                review_message_id INTEGER DEFAULT NULL,
+                created_at TEXT NOT NULL,
+                product_name TEXT,
+                order_number INTEGER
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_recent_reviews_guild ON recent_reviews (guild_id, created_at DESC, id DESC)"
+        )
+        await backfill_review_aggregates(db)
 
         await db.execute("""
             CREATE TABLE IF NOT EXISTS staff_requests (
@@ -441,17 +571,352 @@ async def init_db():
             )
         """)
 
+        # ─── Changelog Tables ────────────────────────────────
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS changelogs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                version TEXT NOT NULL,
+                title TEXT NOT NULL,
+                changes TEXT NOT NULL,
+                notes TEXT DEFAULT '',
+                posted_by INTEGER NOT NULL,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS changelog_deliveries (
+                changelog_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER DEFAULT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                error TEXT DEFAULT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (changelog_id, guild_id)
+            )
+        """)
+
+        # ─── Server Setup Progress ───────────────────────────
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS setup_progress (
+                guild_id INTEGER NOT NULL,
+                step TEXT NOT NULL,
+                object_id INTEGER DEFAULT NULL,
+                completed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (guild_id, step)
+            )
+        """)
+
+        # ─── Command Sync State ──────────────────────────────
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS command_sync (
+                scope TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                duration REAL NOT NULL DEFAULT 0,
+                synced_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        await setup_stat_counters(db)
+        await setup_search(db)
+
         await db.commit()
     print("[DATABASE] Initialized successfully.")
 
 
+# ═══════════════════════════════════════════════════════════════
+#  STAT COUNTERS (optional, see STAT_COUNTERS)
+# ═══════════════════════════════════════════════════════════════
+
+def _bump(scope, guild, name, delta):
+    return (
+        f"INSERT INTO stat_counters (scope, guild_id, name, value) "
+        f"VALUES ('{scope}', {guild}, {name}, {delta}) "
+        f"ON CONFLICT(scope, guild_id, name) DO UPDATE SET value=value+excluded.value;"
+    )
+
+
+_DELIVERED_NEW = "CASE WHEN NEW.status='delivered' THEN NEW.price ELSE 0 END"
+_DELIVERED_OLD = "CASE WHEN OLD.status='delivered' THEN OLD.price ELSE 0 END"
+
+STAT_TRIGGERS = {
+    "trg_stats_tickets_ins": "AFTER INSERT ON tickets BEGIN "
+        + _bump("tickets", "NEW.guild_id", "'total'", 1)
+        + _bump("tickets", "NEW.guild_id", "'status:' || NEW.status", 1) + " END",
+    "trg_stats_tickets_del": "AFTER DELETE ON tickets BEGIN "
+        + _bump("tickets", "OLD.guild_id", "'total'", -1)
+        + _bump("tickets", "OLD.guild_id", "'status:' || OLD.status", -1) + " END",
+    "trg_stats_tickets_upd": "AFTER UPDATE OF status ON tickets WHEN OLD.status IS NOT NEW.status BEGIN "
+        + _bump("tickets", "OLD.guild_id", "'status:' || OLD.status", -1)
+        + _bump("tickets", "NEW.guild_id", "'status:' || NEW.status", 1) + " END",
+
+    "trg_stats_orders_ins": "AFTER INSERT ON orders BEGIN "
+        + _bump("orders", "NEW.guild_id", "'total'", 1)
+        + _bump("orders", "NEW.guild_id", "'status:' || NEW.status", 1)
+        + _bump("orders", "NEW.guild_id", "'revenue'", _DELIVERED_NEW) + " END",
+    "trg_stats_orders_del": "AFTER DELETE ON orders BEGIN "
+        + _bump("orders", "OLD.guild_id", "'total'", -1)
+        + _bump("orders", "OLD.guild_id", "'status:' || OLD.status", -1)
+        + _bump("orders", "OLD.guild_id", "'revenue'", f"-({_DELIVERED_OLD})") + " END",
+    "trg_stats_orders_upd": "AFTER UPDATE OF status, price ON orders BEGIN "
+        + _bump("orders", "OLD.guild_id", "'status:' || OLD.status", -1)
+        + _bump("orders", "NEW.guild_id", "'status:' || NEW.status", 1)
+        + _bump("orders", "NEW.guild_id", "'revenue'", f"({_DELIVERED_NEW}) - ({_DELIVERED_OLD})") + " END",
+
+    "trg_stats_keys_ins": "AFTER INSERT ON license_keys BEGIN "
+        + _bump("license_keys", 0, "'total'", 1)
+        + _bump("license_keys", 0, "'redeemed:' || NEW.redeemed", 1) + " END",
+    "trg_stats_keys_del": "AFTER DELETE ON license_keys BEGIN "
+        + _bump("license_keys", 0, "'total'", -1)
+        + _bump("license_keys", 0, "'redeemed:' || OLD.redeemed", -1) + " END",
+    "trg_stats_keys_upd": "AFTER UPDATE OF redeemed ON license_keys WHEN OLD.redeemed IS NOT NEW.redeemed BEGIN "
+        + _bump("license_keys", 0, "'redeemed:' || OLD.redeemed", -1)
+        + _bump("license_keys", 0, "'redeemed:' || NEW.redeemed", 1) + " END",
+
+    "trg_stats_subs_ins": "AFTER INSERT ON subscriptions BEGIN "
+        + _bump("subscriptions", 0, "'total'", 1)
+        + _bump("subscriptions", 0, "'plan:' || NEW.plan", 1)
+        + _bump("subscriptions", 0, "'revenue'", "NEW.total_paid") + " END",
+    "trg_stats_subs_del": "AFTER DELETE ON subscriptions BEGIN "
+        + _bump("subscriptions", 0, "'total'", -1)
+        + _bump("subscriptions", 0, "'plan:' || OLD.plan", -1)
+        + _bump("subscriptions", 0, "'revenue'", "-OLD.total_paid") + " END",
+    "trg_stats_subs_upd": "AFTER UPDATE OF plan, total_paid ON subscriptions BEGIN "
+        + _bump("subscriptions", 0, "'plan:' || OLD.plan", -1)
+        + _bump("subscriptions", 0, "'plan:' || NEW.plan", 1)
+        + _bump("subscriptions", 0, "'revenue'", "NEW.total_paid - OLD.total_paid") + " END",
+}
+
+
+async def setup_stat_counters(db):
+    """Create (or drop) the counter triggers and rebuild counters from the base tables.
+    Rebuilding on every start keeps counters exact even if the flag was off for a while."""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS stat_counters (
+            scope TEXT NOT NULL,
+            guild_id INTEGER NOT NULL DEFAULT 0,
+            name TEXT NOT NULL,
+            value REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, guild_id, name)
+        )
+    """)
+    for name, body in STAT_TRIGGERS.items():
+        await db.execute(f"DROP TRIGGER IF EXISTS {name}")
+        if STAT_COUNTERS:
+            await db.execute(f"CREATE TRIGGER {name} {body}")
+
+    await db.execute("DELETE FROM stat_counters")
+    if not STAT_COUNTERS:
+        return
+    for sql in (
+        "SELECT 'tickets', guild_id, 'total', COUNT(*) FROM tickets GROUP BY guild_id",
+        "SELECT 'tickets', guild_id, 'status:' || status, COUNT(*) FROM tickets GROUP BY guild_id, status",
+        "SELECT 'orders', guild_id, 'total', COUNT(*) FROM orders GROUP BY guild_id",
+        "SELECT 'orders', guild_id, 'status:' || status, COUNT(*) FROM orders GROUP BY guild_id, status",
+        "SELECT 'orders', guild_id, 'revenue', SUM(CASE WHEN status='delivered' THEN price ELSE 0 END) "
+        "FROM orders GROUP BY guild_id",
+        "SELECT 'license_keys', 0, 'total', COUNT(*) FROM license_keys",
+        "SELECT 'license_keys', 0, 'redeemed:' || redeemed, COUNT(*) FROM license_keys GROUP BY redeemed",
+        "SELECT 'subscriptions', 0, 'total', COUNT(*) FROM subscriptions",
+        "SELECT 'subscriptions', 0, 'plan:' || plan, COUNT(*) FROM subscriptions GROUP BY plan",
+        "SELECT 'subscriptions', 0, 'revenue', COALESCE(SUM(total_paid), 0) FROM subscriptions",
+    ):
+        await db.execute(f"INSERT INTO stat_counters (scope, guild_id, name, value) {sql}")
+
+
+async def _read_counters(db, scope, guild_id=0):
+    c = await db.execute(
+        "SELECT name, value FROM stat_counters WHERE scope=? AND guild_id=?",
+        (scope, guild_id)
+    )
+    return {r[0]: r[1] for r in await c.fetchall()}
+
+
+# ═══════════════════════════════════════════════════════════════
+#  FULL-TEXT SEARCH (optional, see SEARCH_INDEX)
+# ═══════════════════════════════════════════════════════════════
+
+# External-content FTS5 tables read their text from these views. Each row
+# carries a "g<guild_id>" token in the `guild` column so a search is an
+# index intersection with the guild, not a scan of every guild's matches.
+SEARCH_SOURCES = {
+    "ticket_message_search_src":
+        "SELECT m.id, m.content AS body, m.username AS author, 'g' || t.guild_id AS guild "
+        "FROM ticket_messages m JOIN tickets t ON t.id = m.ticket_id",
+    "ticket_search_src":
+        "SELECT id, COALESCE(category_name, '') || ' ' || COALESCE(close_reason, '') || ' ' || ticket_number AS meta, "
+        "'g' || guild_id AS guild FROM tickets",
+    "order_search_src":
+        "SELECT id, product_name AS product, COALESCE(delivery_info, '') || ' ' || COALESCE(notes, '') "
+        "|| ' ' || order_number AS notes, 'g' || guild_id AS guild FROM orders",
+}
+
+SEARCH_TABLES = {
+    "ticket_message_fts": ("ticket_message_search_src", "body, author, guild"),
+    "ticket_fts": ("ticket_search_src", "meta, guild"),
+    "order_fts": ("order_search_src", "product, notes, guild"),
+}
+
+_MSG_GUILD = "(SELECT 'g' || guild_id FROM tickets WHERE id={}.ticket_id)"
+_META = "COALESCE({0}.category_name, '') || ' ' || COALESCE({0}.close_reason, '') || ' ' || {0}.ticket_number"
+_NOTES = "COALESCE({0}.delivery_info, '') || ' ' || COALESCE({0}.notes, '') || ' ' || {0}.order_number"
+
+
+def _fts_row(table, row, values):
+    return f"INSERT INTO {table} (rowid, {SEARCH_TABLES[table][1]}) SELECT {row}.id, {values};"
+
+
+def _fts_delete(table, row, values):
+    return (f"INSERT INTO {table} ({table}, rowid, {SEARCH_TABLES[table][1]}) "
+            f"SELECT 'delete', {row}.id, {values};")
+
+
+_MSG_NEW = f"NEW.content, NEW.username, {_MSG_GUILD.format('NEW')} WHERE {_MSG_GUILD.format('NEW')} IS NOT NULL"
+_MSG_OLD = f"OLD.content, OLD.username, {_MSG_GUILD.format('OLD')} WHERE {_MSG_GUILD.format('OLD')} IS NOT NULL"
+_TICKET_NEW = f"{_META.format('NEW')}, 'g' || NEW.guild_id"
+_TICKET_OLD = f"{_META.format('OLD')}, 'g' || OLD.guild_id"
+_ORDER_NEW = f"NEW.product_name, {_NOTES.format('NEW')}, 'g' || NEW.guild_id"
+_ORDER_OLD = f"OLD.product_name, {_NOTES.format('OLD')}, 'g' || OLD.guild_id"
+
+SEARCH_TRIGGERS = {
+    "trg_search_msg_ins": "AFTER INSERT ON ticket_messages BEGIN "
+        + _fts_row("ticket_message_fts", "NEW", _MSG_NEW) + " END",
+    "trg_search_msg_del": "AFTER DELETE ON ticket_messages BEGIN "
+        + _fts_delete("ticket_message_fts", "OLD", _MSG_OLD) + " END",
+    "trg_search_msg_upd": "AFTER UPDATE OF content, username ON ticket_messages BEGIN "
+        + _fts_delete("ticket_message_fts", "OLD", _MSG_OLD)
+        + _fts_row("ticket_message_fts", "NEW", _MSG_NEW) + " END",
+
+    "trg_search_ticket_ins": "AFTER INSERT ON tickets BEGIN "
+        + _fts_row("ticket_fts", "NEW", _TICKET_NEW) + " END",
+    "trg_search_ticket_del": "AFTER DELETE ON tickets BEGIN "
+        + _fts_delete("ticket_fts", "OLD", _TICKET_OLD) + " END",
+    "trg_search_ticket_upd": "AFTER UPDATE OF category_name, close_reason, ticket_number ON tickets BEGIN "
+        + _fts_delete("ticket_fts", "OLD", _TICKET_OLD)
+        + _fts_row("ticket_fts", "NEW", _TICKET_NEW) + " END",
+
+    "trg_search_order_ins": "AFTER INSERT ON orders BEGIN "
+        + _fts_row("order_fts", "NEW", _ORDER_NEW) + " END",
+    "trg_search_order_del": "AFTER DELETE ON orders BEGIN "
+        + _fts_delete("order_fts", "OLD", _ORDER_OLD) + " END",
+    "trg_search_order_upd": "AFTER UPDATE OF product_name, delivery_info, notes, order_number ON orders BEGIN "
+        + _fts_delete("order_fts", "OLD", _ORDER_OLD)
+        + _fts_row("order_fts", "NEW", _ORDER_NEW) + " END",
+}
+
+
+async def setup_search(db):
+    """Create (or drop) the FTS5 tables and their triggers.
+    A table created here is filled from existing rows once; after that the
+    triggers keep it current, so restarts don't rebuild."""
+    for name in SEARCH_TRIGGERS:
+        await db.execute(f"DROP TRIGGER IF EXISTS {name}")
+    if not SEARCH_INDEX:
+        for table in SEARCH_TABLES:
+            await db.execute(f"DROP TABLE IF EXISTS {table}")
+        return
+
+    for view, sql in SEARCH_SOURCES.items():
+        await db.execute(f"CREATE VIEW IF NOT EXISTS {view} AS {sql}")
+    for table, (source, columns) in SEARCH_TABLES.items():
+        c = await db.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+        exists = await c.fetchone()
+        await db.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({columns}, content='{source}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        if not exists:
+            await db.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+    for name, body in SEARCH_TRIGGERS.items():
+        await db.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def _search_terms(text):
+    """User text -> FTS5 query: every word must match; `word*` matches as a prefix."""
+    words = re.findall(r"(\w+)(\*?)", text.lower())[:16]
+    if not words:
+        return None
+    terms = []
+    for w, star in words:
+        term = f'"{w}"{star}'
+        if w.isdigit() and w[0] == "0" and w.lstrip("0"):
+            # "#0042" should find ticket / order 42, which is indexed without padding
+            term = f'({term} OR "{w.lstrip("0")}")'
+        terms.append(term)
+    return " ".join(terms)
+
+
+def _rank_window(table):
+    """Lowest rowid among the newest SEARCH_RANK_WINDOW matches, so bm25 only
+    ranks those; a common word in a big guild would otherwise rank them all."""
+    return (f"COALESCE((SELECT rowid FROM {table} WHERE {table} MATCH ? "
+            f"ORDER BY rowid DESC LIMIT 1 OFFSET {SEARCH_RANK_WINDOW - 1}), 0)")
+
+
+async def search_tickets(guild_id, text, limit=10, offset=0):
+    """Tickets whose messages or category / close reason / number match, best first.
+    Each result carries `hits` (matching messages) and `snippet` from the best one."""
+    terms = _search_terms(text)
+    if not terms or not SEARCH_INDEX:
+        return []
+    guild = f'guild : "g{guild_id}"'
+    messages = f"{guild} AND {{body author}} : ({terms})"
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        c = await db.execute(
+            "SELECT t.*, h.score, h.hits, h.message_id FROM ("
+            "SELECT ticket_id, MIN(rank) AS score, message_id, SUM(message_id IS NOT NULL) AS hits FROM ("
+            "SELECT m.ticket_id, f.rank, f.rowid AS message_id FROM ticket_message_fts f "
+            "JOIN ticket_messages m ON m.id = f.rowid "
+            f"WHERE ticket_message_fts MATCH ? AND f.rowid >= {_rank_window('ticket_message_fts')} "
+            "UNION ALL "
+            "SELECT f.rowid, f.rank, NULL FROM ticket_fts f WHERE ticket_fts MATCH ?"
+            ") GROUP BY ticket_id"
+            ") h JOIN tickets t ON t.id = h.ticket_id ORDER BY h.score LIMIT ? OFFSET ?",
+            (messages, messages, f"{guild} AND meta : ({terms})", limit, offset)
+        )
+        results = [dict(r) for r in await c.fetchall()]
+
+        # Snippets only for the page being returned, one rowid lookup each
+        for r in results:
+            r["snippet"] = None
+            if r["message_id"]:
+                c = await db.execute(
+                    "SELECT snippet(ticket_message_fts, 0, '**', '**', '…', 12) FROM ticket_message_fts "
+                    "WHERE ticket_message_fts MATCH ? AND rowid=?",
+                    (messages, r["message_id"])
+                )
+                row = await c.fetchone()
+                r["snippet"] = row[0] if row else None
+        return results
+
+
+async def search_orders(guild_id, text, limit=10, offset=0):
+    """Orders whose product name, delivery info or notes match, best first."""
+    terms = _search_terms(text)
+    if not terms or not SEARCH_INDEX:
+        return []
+    match = f'guild : "g{guild_id}" AND {{product notes}} : ({terms})'
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        c = await db.execute(
+            "SELECT o.*, f.score, f.snippet FROM ("
+            "SELECT rowid, rank AS score, snippet(order_fts, 1, '**', '**', '…', 12) AS snippet FROM order_fts "
+            f"WHERE order_fts MATCH ? AND rowid >= {_rank_window('order_fts')} ORDER BY rank LIMIT ? OFFSET ?"
+            ") f JOIN orders o ON o.id = f.rowid ORDER BY f.score",
+            (match, match, limit, offset)
+        )
+        return [dict(r) for r in await c.fetchall()]
+
+
 # ═══════════════════════════════════════════════════════════════
 #  GIVEAWAY FUNCTIONS
 # ═══════════════════════════════════════════════════════════════
 
 async def create_giveaway(guild_id, channel_id, message_id, host_id, prize,
                           description, winner_count, required_role_id, end_time):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "INSERT INTO giveaways (guild_id, channel_id, message_id, host_id, prize, "
             "description, winner_count, required_role_id, end_time) VALUES (?,?,?,?,?,?,?,?,?)",
@@ -463,20 +928,20 @@ async def create_giveaway(guild_id, channel_id, message_id, host_id, prize,
 
 
 async def add_entry(giveaway_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        try:
-            await db.execute(
-                "INSERT INTO giveaway_entries (giveaway_id, user_id) VALUES (?,?)",
-                (giveaway_id, user_id)
-            )
-            await db.commit()
-            return True
-        except aiosqlite.IntegrityError:
-            return False
+    async def op(db):
+        await db.execute(
+            "INSERT INTO giveaway_entries (giveaway_id, user_id) VALUES (?,?)",
+            (giveaway_id, user_id)
+        )
+        return True
+    try:
+        return await _write(op)
+    except aiosqlite.IntegrityError:
+        return False
 
 
 async def remove_entry(giveaway_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "DELETE FROM giveaway_entries WHERE giveaway_id=? AND user_id=?",
             (giveaway_id, user_id)
@@ -486,7 +951,7 @@ async def remove_entry(giveaway_id, user_id):
 
 
 async def get_entry_count(giveaway_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "SELECT COUNT(*) FROM giveaway_entries WHERE giveaway_id=?",
             (giveaway_id,)
@@ -495,7 +960,7 @@ async def get_entry_count(giveaway_id):
 
 
 async def get_entries(giveaway_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "SELECT user_id FROM giveaway_entries WHERE giveaway_id=?",
             (giveaway_id,)
@@ -504,7 +969,7 @@ async def get_entries(giveaway_id):
 
 
 async def get_giveaway_by_message(message_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM giveaways WHERE message_id=?", (message_id,))
         r = await c.fetchone()
@@ -512,7 +977,7 @@ async def get_giveaway_by_message(message_id):
 
 
 async def get_giveaway_by_id(giveaway_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM giveaways WHERE id=?", (giveaway_id,))
         r = await c.fetchone()
@@ -520,14 +985,14 @@ async def get_giveaway_by_id(giveaway_id):
 
 
 async def get_active_giveaways():
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM giveaways WHERE ended=0")
         return [dict(r) for r in await c.fetchall()]
 
 
 async def get_guild_giveaways(guild_id, active_only=True):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         if active_only:
             c = await db.execute(
@@ -543,13 +1008,13 @@ async def get_guild_giveaways(guild_id, active_only=True):
 
 
 async def end_giveaway(giveaway_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute("UPDATE giveaways SET ended=1 WHERE id=?", (giveaway_id,))
         await db.commit()
 
 
 async def save_winners(giveaway_id, winner_ids):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         for uid in winner_ids:
             await db.execute(
                 "INSERT INTO giveaway_winners (giveaway_id, user_id) VALUES (?,?)",
@@ -559,7 +1024,7 @@ async def save_winners(giveaway_id, winner_ids):
 
 
 async def get_winners(giveaway_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "SELECT user_id FROM giveaway_winners WHERE giveaway_id=?",
             (giveaway_id,)
@@ -568,7 +1033,7 @@ async def get_winners(giveaway_id):
 
 
 async def delete_giveaway(giveaway_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute("DELETE FROM giveaway_entries WHERE giveaway_id=?", (giveaway_id,))
         await db.execute("DELETE FROM giveaway_winners WHERE giveaway_id=?", (giveaway_id,))
         await db.execute("DELETE FROM giveaways WHERE id=?", (giveaway_id,))
@@ -576,7 +1041,7 @@ async def delete_giveaway(giveaway_id):
 
 
 async def has_entry(giveaway_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "SELECT 1 FROM giveaway_entries WHERE giveaway_id=? AND user_id=?",
             (giveaway_id, user_id)
@@ -589,7 +1054,7 @@ async def has_entry(giveaway_id, user_id):
 # ═══════════════════════════════════════════════════════════════
 
 async def set_invite_log_channel(guild_id, channel_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "INSERT INTO invite_settings (guild_id, log_channel_id, enabled) VALUES (?,?,1) "
             "ON CONFLICT(guild_id) DO UPDATE SET log_channel_id=excluded.log_channel_id, "
@@ -600,7 +1065,7 @@ async def set_invite_log_channel(guild_id, channel_id):
 
 
 async def get_invite_settings(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM invite_settings WHERE guild_id=?", (guild_id,))
         r = await c.fetchone()
@@ -608,7 +1073,7 @@ async def get_invite_settings(guild_id):
 
 
 async def toggle_invite_tracking(guild_id, enabled):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "INSERT INTO invite_settings (guild_id, enabled) VALUES (?,?) "
             "ON CONFLICT(guild_id) DO UPDATE SET enabled=excluded.enabled, "
@@ -619,7 +1084,7 @@ async def toggle_invite_tracking(guild_id, enabled):
 
 
 async def remove_invite_log_channel(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "UPDATE invite_settings SET log_channel_id=NULL WHERE guild_id=?",
             (guild_id,)
@@ -627,35 +1092,124 @@ async def remove_invite_log_channel(guild_id):
         await db.commit()
 
 
-async def cache_invites(guild_id, invites):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("DELETE FROM invite_cache WHERE guild_id=?", (guild_id,))
-        for inv in invites:
-            await db.execute(
-                "INSERT INTO invite_cache (guild_id, invite_code, inviter_id, uses) VALUES (?,?,?,?)",
-                (guild_id, inv["code"], inv["inviter_id"], inv["uses"])
+async def cache_invites(guild_id, invites, removed=()):
+    """Persist changed invite counts and drop removed codes in one transaction.
+    Only the delta is written; the in-memory snapshot in the Invites cog is authoritative."""
+    if not invites and not removed:
+        return
+    async with _connect() as db:
+        if invites:
+            await db.executemany(
+                "INSERT INTO invite_cache (guild_id, invite_code, inviter_id, uses) VALUES (?,?,?,?) "
+                "ON CONFLICT(guild_id, invite_code) DO UPDATE SET "
+                "inviter_id=excluded.inviter_id, uses=excluded.uses",
+                [(guild_id, inv["code"], inv["inviter_id"], inv["uses"]) for inv in invites]
+            )
+        if removed:
+            await db.executemany(
+                "DELETE FROM invite_cache WHERE guild_id=? AND invite_code=?",
+                [(guild_id, code) for code in removed]
             )
         await db.commit()
 
 
 async def get_cached_invites(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM invite_cache WHERE guild_id=?", (guild_id,))
         return [dict(r) for r in await c.fetchall()]
 
 
-async def track_invite(guild_id, inviter_id, invited_id, invite_code):
-    async with aiosqlite.connect(DB_PATH) as db:
+async def get_all_cached_invites():
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        c = await db.execute("SELECT * FROM invite_cache")
+        return [dict(r) for r in await c.fetchall()]
+
+
+async def get_invite_warmup_plan():
+    """Return ({guild_id, ...} with tracking enabled, {guild_id: last warmed_at})."""
+    async with _connect() as db:
+        c = await db.execute(
+            "SELECT s.guild_id, s.enabled, w.warmed_at FROM invite_settings s "
+            "LEFT JOIN invite_warmup w ON w.guild_id = s.guild_id "
+            "UNION ALL "
+            "SELECT w.guild_id, 0, w.warmed_at FROM invite_warmup w "
+            "WHERE w.guild_id NOT IN (SELECT guild_id FROM invite_settings)"
+        )
+        enabled, warmed = set(), {}
+        for gid, en, warmed_at in await c.fetchall():
+            if en:
+                enabled.add(gid)
+            if warmed_at:
+                warmed[gid] = warmed_at
+        return enabled, warmed
+
+
+async def mark_invites_warmed(guild_id):
+    async with _connect() as db:
         await db.execute(
+            "INSERT INTO invite_warmup (guild_id) VALUES (?) "
+            "ON CONFLICT(guild_id) DO UPDATE SET warmed_at=CURRENT_TIMESTAMP",
+            (guild_id,)
+        )
+        await db.commit()
+
+
+async def backfill_invite_counters(db):
+    """One-time migration: seed invite_counters from existing tracks/leaves."""
+    c = await db.execute("SELECT 1 FROM invite_counters LIMIT 1")
+    if await c.fetchone():
+        return
+    await db.execute("""
+        INSERT INTO invite_counters (guild_id, inviter_id, total, leaves, active)
+        SELECT guild_id, inviter_id, SUM(t), SUM(l), MAX(0, SUM(t) - SUM(l)) FROM (
+            SELECT guild_id, inviter_id, COUNT(*) AS t, 0 AS l FROM invite_tracks GROUP BY guild_id, inviter_id
+            UNION ALL
+            SELECT guild_id, inviter_id, 0, COUNT(*) FROM invite_leaves GROUP BY guild_id, inviter_id
+        ) GROUP BY guild_id, inviter_id
+    """)
+
+
+async def track_invite(guild_id, inviter_id, invited_id, invite_code):
+    async def op(db):
+        c = await db.execute(
             "INSERT INTO invite_tracks (guild_id, inviter_id, invited_id, invite_code) VALUES (?,?,?,?)",
             (guild_id, inviter_id, invited_id, invite_code)
         )
+        await db.execute(
+            "INSERT INTO invite_counters (guild_id, inviter_id, total, active) VALUES (?,?,1,1) "
+            "ON CONFLICT(guild_id, inviter_id) DO UPDATE SET "
+            "total=total+1, active=MAX(0, total+1-leaves)",
+            (guild_id, inviter_id)
+        )
+        return c.lastrowid
+    return await _write(op)
+
+
+async def track_invites(guild_id, rows):
+    """Bulk form of track_invite for join bursts: rows are (inviter_id, invited_id, invite_code)."""
+    if not rows:
+        return
+    per_inviter = {}
+    for inviter_id, _invited, _code in rows:
+        per_inviter[inviter_id] = per_inviter.get(inviter_id, 0) + 1
+    async with _connect() as db:
+        await db.executemany(
+            "INSERT INTO invite_tracks (guild_id, inviter_id, invited_id, invite_code) VALUES (?,?,?,?)",
+            [(guild_id, inviter_id, invited_id, code) for inviter_id, invited_id, code in rows]
+        )
+        await db.executemany(
+            "INSERT INTO invite_counters (guild_id, inviter_id, total, active) VALUES (?,?,?,?) "
+            "ON CONFLICT(guild_id, inviter_id) DO UPDATE SET "
+            "total=total+excluded.total, active=MAX(0, total+excluded.total-leaves)",
+            [(guild_id, inviter_id, n, n) for inviter_id, n in per_inviter.items()]
+        )
         await db.commit()
 
 
 async def track_leave(guild_id, left_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "SELECT inviter_id FROM invite_tracks WHERE guild_id=? AND invited_id=? "
             "ORDER BY joined_at DESC LIMIT 1",
@@ -668,28 +1222,31 @@ async def track_leave(guild_id, left_id):
                 "INSERT INTO invite_leaves (guild_id, inviter_id, left_id) VALUES (?,?,?)",
                 (guild_id, inviter_id, left_id)
             )
+            await db.execute(
+                "INSERT INTO invite_counters (guild_id, inviter_id, leaves) VALUES (?,?,1) "
+                "ON CONFLICT(guild_id, inviter_id) DO UPDATE SET "
+                "leaves=leaves+1, active=MAX(0, total-leaves-1)",
+                (guild_id, inviter_id)
+            )
             await db.commit()
             return inviter_id
         return None
 
 
 async def get_user_invite_stats(guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        c = await db.execute(
-            "SELECT COUNT(*) FROM invite_tracks WHERE guild_id=? AND inviter_id=?",
-            (guild_id, user_id)
-        )
-        total = (await c.fetchone())[0]
+    async with _connect() as db:
         c = await db.execute(
-            "SELECT COUNT(*) FROM invite_leaves WHERE guild_id=? AND inviter_id=?",
+            "SELECT total, leaves, active FROM invite_counters WHERE guild_id=? AND inviter_id=?",
             (guild_id, user_id)
         )
-        leaves = (await c.fetchone())[0]
-        return {"total": total, "leaves": leaves, "active": max(0, total - leaves)}
+        r = await c.fetchone()
+        if not r:
+            return {"total": 0, "leaves": 0, "active": 0}
+        return {"total": r[0], "leaves": r[1], "active": r[2]}
 
 
 async def get_invited_by(guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "SELECT inviter_id FROM invite_tracks WHERE guild_id=? AND invited_id=? "
             "ORDER BY joined_at DESC LIMIT 1",
@@ -700,7 +1257,7 @@ async def get_invited_by(guild_id, user_id):
 
 
 async def get_invite_list(guild_id, inviter_id, limit=20):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("""
             SELECT t.invited_id, t.invite_code, t.joined_at,
@@ -717,37 +1274,33 @@ async def get_invite_list(guild_id, inviter_id, limit=20):
 
 
 async def get_invite_leaderboard(guild_id, limit=10):
-    async with aiosqlite.connect(DB_PATH) as db:
-        c = await db.execute("""
-            SELECT t.inviter_id, COUNT(t.id) as total, COUNT(l.id) as leaves
-            FROM invite_tracks t
-            LEFT JOIN invite_leaves l
-                ON t.guild_id = l.guild_id
-                AND t.invited_id = l.left_id
-                AND t.inviter_id = l.inviter_id
-            WHERE t.guild_id=?
-            GROUP BY t.inviter_id
-            ORDER BY (COUNT(t.id) - COUNT(l.id)) DESC
-            LIMIT ?
-        """, (guild_id, limit))
+    async with _connect() as db:
+        c = await db.execute(
+            "SELECT inviter_id, total, leaves, active FROM invite_counters "
+            "WHERE guild_id=? AND total > 0 ORDER BY active DESC, total DESC LIMIT ?",
+            (guild_id, limit)
+        )
         return [
-            {"inviter_id": r[0], "total": r[1], "leaves": r[2], "active": max(0, r[1] - r[2])}
+            {"inviter_id": r[0], "total": r[1], "leaves": r[2], "active": r[3]}
             for r in await c.fetchall()
         ]
 
 
 async def reset_user_invites(guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute("DELETE FROM invite_tracks WHERE guild_id=? AND inviter_id=?", (guild_id, user_id))
         await db.execute("DELETE FROM invite_leaves WHERE guild_id=? AND inviter_id=?", (guild_id, user_id))
+        await db.execute("DELETE FROM invite_counters WHERE guild_id=? AND inviter_id=?", (guild_id, user_id))
         await db.commit()
 
 
 async def reset_all_invites(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    # invite_cache is left alone: it is the Invites cog's use-count snapshot, not
+    # stats, and the cog only writes it back as deltas
+    async with _connect() as db:
         await db.execute("DELETE FROM invite_tracks WHERE guild_id=?", (guild_id,))
         await db.execute("DELETE FROM invite_leaves WHERE guild_id=?", (guild_id,))
-        await db.execute("DELETE FROM invite_cache WHERE guild_id=?", (guild_id,))
+        await db.execute("DELETE FROM invite_counters WHERE guild_id=?", (guild_id,))
         await db.commit()
 
 
@@ -756,7 +1309,7 @@ async def reset_all_invites(guild_id):
 # ═══════════════════════════════════════════════════════════════
 
 async def get_automod_settings(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM automod_settings WHERE guild_id=?", (guild_id,))
         r = await c.fetchone()
@@ -764,7 +1317,7 @@ async def get_automod_settings(guild_id):
 
 
 async def create_automod_settings(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute("INSERT OR IGNORE INTO automod_settings (guild_id) VALUES (?)", (guild_id,))
         await db.commit()
     return await get_automod_settings(guild_id)
@@ -786,7 +1339,7 @@ async def update_automod_setting(guild_id, key, value):
     ]
     if key not in valid:
         return False
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             f"INSERT INTO automod_settings (guild_id, {key}) VALUES (?, ?) "
             f"ON CONFLICT(guild_id) DO UPDATE SET {key}=excluded.{key}, "
@@ -798,7 +1351,7 @@ async def update_automod_setting(guild_id, key, value):
 
 
 async def add_whitelist(guild_id, wl_type, target_id, added_by):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         try:
             await db.execute(
                 "INSERT INTO automod_whitelist (guild_id, type, target_id, added_by) VALUES (?,?,?,?)",
@@ -811,7 +1364,7 @@ async def add_whitelist(guild_id, wl_type, target_id, added_by):
 
 
 async def remove_whitelist(guild_id, wl_type, target_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "DELETE FROM automod_whitelist WHERE guild_id=? AND type=? AND target_id=?",
             (guild_id, wl_type, target_id)
@@ -821,14 +1374,14 @@ async def remove_whitelist(guild_id, wl_type, target_id):
 
 
 async def get_whitelist(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM automod_whitelist WHERE guild_id=?", (guild_id,))
         return [dict(r) for r in await c.fetchall()]
 
 
 async def is_whitelisted(guild_id, user_id=None, role_ids=None, channel_id=None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         if user_id:
             c = await db.execute(
                 "SELECT 1 FROM automod_whitelist WHERE guild_id=? AND type='user' AND target_id=?",
@@ -855,7 +1408,7 @@ async def is_whitelisted(guild_id, user_id=None, role_ids=None, channel_id=None)
 
 
 async def add_bad_word(guild_id, word, added_by):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         try:
             await db.execute(
                 "INSERT INTO automod_bad_words (guild_id, word, added_by) VALUES (?,?,?)",
@@ -868,7 +1421,7 @@ async def add_bad_word(guild_id, word, added_by):
 
 
 async def remove_bad_word(guild_id, word):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "DELETE FROM automod_bad_words WHERE guild_id=? AND word=?",
             (guild_id, word.lower())
@@ -878,19 +1431,19 @@ async def remove_bad_word(guild_id, word):
 
 
 async def get_bad_words(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute("SELECT word FROM automod_bad_words WHERE guild_id=?", (guild_id,))
         return [r[0] for r in await c.fetchall()]
 
 
 async def clear_bad_words(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute("DELETE FROM automod_bad_words WHERE guild_id=?", (guild_id,))
         await db.commit()
 
 
 async def add_blocked_link(guild_id, domain, added_by):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         try:
             await db.execute(
                 "INSERT INTO automod_blocked_links (guild_id, domain, added_by) VALUES (?,?,?)",
@@ -903,7 +1456,7 @@ async def add_blocked_link(guild_id, domain, added_by):
 
 
 async def remove_blocked_link(guild_id, domain):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "DELETE FROM automod_blocked_links WHERE guild_id=? AND domain=?",
             (guild_id, domain.lower())
@@ -913,32 +1466,33 @@ async def remove_blocked_link(guild_id, domain):
 
 
 async def get_blocked_links(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute("SELECT domain FROM automod_blocked_links WHERE guild_id=?", (guild_id,))
         return [r[0] for r in await c.fetchall()]
 
 
 async def clear_blocked_links(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute("DELETE FROM automod_blocked_links WHERE guild_id=?", (guild_id,))
         await db.commit()
 
 
 async def add_warn(guild_id, user_id, moderator_id, reason, expire_days=30):
     expires_at = (datetime.now(timezone.utc) + timedelta(days=expire_days)).isoformat()
-    async with aiosqlite.connect(DB_PATH) as db:
+
+    async def op(db):
         c = await db.execute(
             "INSERT INTO automod_warns (guild_id, user_id, moderator_id, reason, expires_at) "
             "VALUES (?,?,?,?,?)",
             (guild_id, user_id, moderator_id, reason, expires_at)
         )
-        await db.commit()
         return c.lastrowid
+    return await _write(op)
 
 
 async def get_active_warns(guild_id, user_id):
     now = datetime.now(timezone.utc).isoformat()
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute(
             "SELECT * FROM automod_warns "
@@ -950,7 +1504,7 @@ async def get_active_warns(guild_id, user_id):
 
 
 async def get_all_warns(guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute(
             "SELECT * FROM automod_warns WHERE guild_id=? AND user_id=? "
@@ -961,14 +1515,14 @@ async def get_all_warns(guild_id, user_id):
 
 
 async def remove_warn(warn_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute("UPDATE automod_warns SET active=0 WHERE id=?", (warn_id,))
         await db.commit()
         return c.rowcount > 0
 
 
 async def clear_warns(guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "UPDATE automod_warns SET active=0 WHERE guild_id=? AND user_id=? AND active=1",
             (guild_id, user_id)
@@ -978,17 +1532,18 @@ async def clear_warns(guild_id, user_id):
 
 
 async def log_automod_action(guild_id, user_id, action_type, reason, details=""):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
+    async def op(db):
+        c = await db.execute(
             "INSERT INTO automod_actions (guild_id, user_id, action_type, reason, details) "
             "VALUES (?,?,?,?,?)",
             (guild_id, user_id, action_type, reason, details)
         )
-        await db.commit()
+        return c.lastrowid
+    return await _write(op)
 
 
 async def get_action_log(guild_id, user_id=None, limit=20):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         if user_id:
             c = await db.execute(
@@ -1010,7 +1565,7 @@ async def get_action_log(guild_id, user_id=None, limit=20):
 # ═══════════════════════════════════════════════════════════════
 
 async def get_ticket_settings(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM ticket_settings WHERE guild_id=?", (guild_id,))
         r = await c.fetchone()
@@ -1018,7 +1573,7 @@ async def get_ticket_settings(guild_id):
 
 
 async def create_ticket_settings(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute("INSERT OR IGNORE INTO ticket_settings (guild_id) VALUES (?)", (guild_id,))
         await db.commit()
 
@@ -1032,7 +1587,7 @@ async def update_ticket_setting(guild_id, key, value):
     ]
     if key not in valid:
         return False
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             f"INSERT INTO ticket_settings (guild_id, {key}) VALUES (?, ?) "
             f"ON CONFLICT(guild_id) DO UPDATE SET {key}=excluded.{key}, "
@@ -1044,7 +1599,7 @@ async def update_ticket_setting(guild_id, key, value):
 
 
 async def increment_ticket_counter(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute("SELECT ticket_counter FROM ticket_settings WHERE guild_id=?", (guild_id,))
         r = await c.fetchone()
         new_count = (r[0] if r else 0) + 1
@@ -1055,7 +1610,7 @@ async def increment_ticket_counter(guild_id):
 
 async def add_ticket_category(guild_id, name, emoji="🎫", description="",
                                category_id=None, support_role_id=None, welcome_message=""):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "INSERT INTO ticket_categories "
             "(guild_id, name, emoji, description, category_id, support_role_id, welcome_message) "
@@ -1067,21 +1622,21 @@ async def add_ticket_category(guild_id, name, emoji="🎫", description="",
 
 
 async def get_ticket_categories(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM ticket_categories WHERE guild_id=?", (guild_id,))
         return [dict(r) for r in await c.fetchall()]
 
 
 async def remove_ticket_category(cat_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute("DELETE FROM ticket_categories WHERE id=?", (cat_id,))
         await db.commit()
         return c.rowcount > 0
 
 
 async def get_ticket_category_by_name(guild_id, name):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute(
             "SELECT * FROM ticket_categories WHERE guild_id=? AND name=?",
@@ -1092,7 +1647,7 @@ async def get_ticket_category_by_name(guild_id, name):
 
 
 async def create_ticket(guild_id, channel_id, user_id, category_name, ticket_number):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "INSERT INTO tickets "
             "(guild_id, channel_id, user_id, category_name, ticket_number) "
@@ -1104,7 +1659,7 @@ async def create_ticket(guild_id, channel_id, user_id, category_name, ticket_num
 
 
 async def get_ticket_by_channel(channel_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM tickets WHERE channel_id=?", (channel_id,))
         r = await c.fetchone()
@@ -1112,7 +1667,7 @@ async def get_ticket_by_channel(channel_id):
 
 
 async def get_open_tickets_by_user(guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute(
             "SELECT * FROM tickets WHERE guild_id=? AND user_id=? AND status='open'",
@@ -1122,7 +1677,7 @@ async def get_open_tickets_by_user(guild_id, user_id):
 
 
 async def get_all_open_tickets(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute(
             "SELECT * FROM tickets WHERE guild_id=? AND status='open' ORDER BY created_at DESC",
@@ -1132,7 +1687,7 @@ async def get_all_open_tickets(guild_id):
 
 
 async def close_ticket(channel_id, closed_by, reason=None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "UPDATE tickets SET status='closed', closed_at=CURRENT_TIMESTAMP, "
             "closed_by=?, close_reason=? WHERE channel_id=?",
@@ -1142,39 +1697,48 @@ async def close_ticket(channel_id, closed_by, reason=None):
 
 
 async def claim_ticket(channel_id, staff_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute("UPDATE tickets SET claimed_by=? WHERE channel_id=?", (staff_id, channel_id))
         await db.commit()
 
 
 async def set_ticket_priority(channel_id, priority):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute("UPDATE tickets SET priority=? WHERE channel_id=?", (priority, channel_id))
         await db.commit()
 
 
 async def get_ticket_stats(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        c = await db.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=? AND status='open'", (guild_id,))
-        open_count = (await c.fetchone())[0]
-        c = await db.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=? AND status='closed'", (guild_id,))
-        closed_count = (await c.fetchone())[0]
-        c = await db.execute("SELECT COUNT(*) FROM tickets WHERE guild_id=?", (guild_id,))
-        total = (await c.fetchone())[0]
-        return {"open": open_count, "closed": closed_count, "total": total}
+    async with _connect() as db:
+        if STAT_COUNTERS:
+            cnt = await _read_counters(db, "tickets", guild_id)
+            return {
+                "open": int(cnt.get("status:open", 0)),
+                "closed": int(cnt.get("status:closed", 0)),
+                "total": int(cnt.get("total", 0)),
+            }
+        c = await db.execute(
+            "SELECT COUNT(CASE WHEN status='open' THEN 1 END), "
+            "COUNT(CASE WHEN status='closed' THEN 1 END), COUNT(*) "
+            "FROM tickets WHERE guild_id=?",
+            (guild_id,)
+        )
+        r = await c.fetchone()
+        return {"open": r[0], "closed": r[1], "total": r[2]}
 
 
 async def save_ticket_message(ticket_id, user_id, username, content):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
+    async def op(db):
+        c = await db.execute(
             "INSERT INTO ticket_messages (ticket_id, user_id, username, content) VALUES (?,?,?,?)",
             (ticket_id, user_id, username, content)
         )
-        await db.commit()
+        return c.lastrowid
+    return await _write(op)
 
 
 async def get_ticket_messages(ticket_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute(
             "SELECT * FROM ticket_messages WHERE ticket_id=? ORDER BY created_at ASC",
@@ -1190,7 +1754,7 @@ async def get_ticket_messages(ticket_id):
 # ─── Shop Settings ──────────────────────────────────────────────
 
 async def get_shop_settings(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM shop_settings WHERE guild_id=?", (guild_id,))
         r = await c.fetchone()
@@ -1198,9 +1762,10 @@ async def get_shop_settings(guild_id):
 
 
 async def create_shop_settings(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute("INSERT OR IGNORE INTO shop_settings (guild_id) VALUES (?)", (guild_id,))
         await db.commit()
+    _bump_catalog(guild_id)
 
 
 async def update_shop_setting(guild_id, key, value):
@@ -1213,7 +1778,7 @@ async def update_shop_setting(guild_id, key, value):
     ]
     if key not in valid:
         return False
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             f"INSERT INTO shop_settings (guild_id, {key}) VALUES (?, ?) "
             f"ON CONFLICT(guild_id) DO UPDATE SET {key}=excluded.{key}, "
@@ -1221,11 +1786,12 @@ async def update_shop_setting(guild_id, key, value):
             (guild_id, value)
         )
         await db.commit()
+    _bump_catalog(guild_id)
     return True
 
 
 async def increment_order_counter(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute("SELECT order_counter FROM shop_settings WHERE guild_id=?", (guild_id,))
         r = await c.fetchone()
         new_count = (r[0] if r else 0) + 1
@@ -1239,7 +1805,7 @@ async def increment_order_counter(guild_id):
 async def add_product(guild_id, name, description, price, emoji="🛒",
                       category="General", delivery_time="5M-2H",
                       reseller_price=None, image_url=None, stock_count=None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "INSERT INTO products (guild_id, name, description, price, emoji, category, "
             "delivery_time, reseller_price, image_url, stock_count) "
@@ -1248,11 +1814,12 @@ async def add_product(guild_id, name, description, price, emoji="🛒",
              delivery_time, reseller_price, image_url, stock_count)
         )
         await db.commit()
-        return c.lastrowid
+    _bump_catalog(guild_id)
+    return c.lastrowid
 
 
 async def get_products(guild_id, category=None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         if category:
             c = await db.execute(
@@ -1268,7 +1835,7 @@ async def get_products(guild_id, category=None):
 
 
 async def get_product_by_id(product_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM products WHERE id=?", (product_id,))
         r = await c.fetchone()
@@ -1281,33 +1848,42 @@ async def update_product(product_id, key, value):
              "image_url", "sort_order"]
     if key not in valid:
         return False
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
+        c = await db.execute("SELECT guild_id FROM products WHERE id=?", (product_id,))
+        r = await c.fetchone()
         await db.execute(f"UPDATE products SET {key}=? WHERE id=?", (value, product_id))
         await db.commit()
+    if r:
+        _bump_catalog(r[0])
     return True
 
 
 async def delete_product(product_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
+        c = await db.execute("SELECT guild_id FROM products WHERE id=?", (product_id,))
+        r = await c.fetchone()
         c = await db.execute("DELETE FROM products WHERE id=?", (product_id,))
         await db.commit()
-        return c.rowcount > 0
+    if r:
+        _bump_catalog(r[0])
+    return c.rowcount > 0
 
 
 async def toggle_product_stock(product_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        c = await db.execute("SELECT in_stock FROM products WHERE id=?", (product_id,))
+    async with _connect() as db:
+        c = await db.execute("SELECT in_stock, guild_id FROM products WHERE id=?", (product_id,))
         r = await c.fetchone()
         if not r:
             return False
         new_val = 0 if r[0] else 1
         await db.execute("UPDATE products SET in_stock=? WHERE id=?", (new_val, product_id))
         await db.commit()
-        return new_val
+    _bump_catalog(r[1])
+    return new_val
 
 
 async def get_product_categories(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "SELECT DISTINCT category FROM products WHERE guild_id=? ORDER BY category",
             (guild_id,)
@@ -1316,8 +1892,8 @@ async def get_product_categories(guild_id):
 
 
 async def decrement_stock(product_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        c = await db.execute("SELECT stock_count FROM products WHERE id=?", (product_id,))
+    async with _connect() as db:
+        c = await db.execute("SELECT stock_count, guild_id FROM products WHERE id=?", (product_id,))
         r = await c.fetchone()
         if r and r[0] is not None:
             new_count = max(0, r[0] - 1)
@@ -1325,6 +1901,7 @@ async def decrement_stock(product_id):
             if new_count == 0:
                 await db.execute("UPDATE products SET in_stock=0 WHERE id=?", (product_id,))
             await db.commit()
+            _bump_catalog(r[1])
             return new_count
         return None
 
@@ -1333,7 +1910,7 @@ async def decrement_stock(product_id):
 
 async def create_order(guild_id, order_number, user_id, product_id,
                        product_name, price, channel_id=None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "INSERT INTO orders (guild_id, order_number, user_id, product_id, "
             "product_name, price, channel_id) VALUES (?,?,?,?,?,?,?)",
@@ -1344,7 +1921,7 @@ async def create_order(guild_id, order_number, user_id, product_id,
 
 
 async def get_order_by_id(order_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM orders WHERE id=?", (order_id,))
         r = await c.fetchone()
@@ -1352,7 +1929,7 @@ async def get_order_by_id(order_id):
 
 
 async def get_order_by_channel(channel_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM orders WHERE channel_id=?", (channel_id,))
         r = await c.fetchone()
@@ -1360,7 +1937,7 @@ async def get_order_by_channel(channel_id):
 
 
 async def get_order_by_number(guild_id, order_number):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute(
             "SELECT * FROM orders WHERE guild_id=? AND order_number=?",
@@ -1371,7 +1948,7 @@ async def get_order_by_number(guild_id, order_number):
 
 
 async def get_user_orders(guild_id, user_id, status=None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         if status:
             c = await db.execute(
@@ -1389,7 +1966,7 @@ async def get_user_orders(guild_id, user_id, status=None):
 
 
 async def get_all_orders(guild_id, status=None, limit=50):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         if status:
             c = await db.execute(
@@ -1405,8 +1982,59 @@ async def get_all_orders(guild_id, status=None, limit=50):
         return [dict(r) for r in await c.fetchall()]
 
 
+async def get_orders_page(guild_id, user_id=None, status=None, before=None, after=None, limit=10):
+    """One page of orders, newest first, by keyset rather than OFFSET.
+
+    `before` / `after` are the (created_at, id) of the last / first order on
+    the page currently shown: `before` returns the next older page, `after`
+    the next newer one.
+    """
+    where, args = ["guild_id=?"], [guild_id]
+    if user_id is not None:
+        where.append("user_id=?")
+        args.append(user_id)
+    if status:
+        where.append("status=?")
+        args.append(status)
+    order = "DESC"
+    if before:
+        where.append("(created_at, id) < (?, ?)")
+        args.extend(before)
+    elif after:
+        where.append("(created_at, id) > (?, ?)")
+        args.extend(after)
+        order = "ASC"
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        c = await db.execute(
+            f"SELECT * FROM orders WHERE {' AND '.join(where)} "
+            f"ORDER BY created_at {order}, id {order} LIMIT ?",
+            (*args, limit)
+        )
+        rows = [dict(r) for r in await c.fetchall()]
+    return rows[::-1] if order == "ASC" else rows
+
+
+async def count_orders(guild_id, user_id=None, status=None):
+    """Order count for a guild or one customer, optionally by status."""
+    if user_id is None and STAT_COUNTERS:
+        async with _connect() as db:
+            cnt = await _read_counters(db, "orders", guild_id)
+        return int(cnt.get(f"status:{status}" if status else "total", 0))
+    where, args = ["guild_id=?"], [guild_id]
+    if user_id is not None:
+        where.append("user_id=?")
+        args.append(user_id)
+    if status:
+        where.append("status=?")
+        args.append(status)
+    async with _connect() as db:
+        c = await db.execute(f"SELECT COUNT(*) FROM orders WHERE {' AND '.join(where)}", args)
+        return (await c.fetchone())[0]
+
+
 async def update_order_status(order_id, status, staff_id=None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         if status == "delivered":
             await db.execute(
                 "UPDATE orders SET status=?, staff_id=?, completed_at=CURRENT_TIMESTAMP, "
@@ -1425,7 +2053,7 @@ async def update_order_field(order_id, key, value):
     valid = ["payment_method", "delivery_info", "notes", "channel_id", "staff_id"]
     if key not in valid:
         return False
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             f"UPDATE orders SET {key}=?, updated_at=CURRENT_TIMESTAMP WHERE id=?",
             (value, order_id)
@@ -1434,66 +2062,143 @@ async def update_order_field(order_id, key, value):
     return True
 
 
-async def get_order_stats(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        stats = {}
-        for status in ["pending", "processing", "delivered", "cancelled", "refunded"]:
-            c = await db.execute(
-                "SELECT COUNT(*) FROM orders WHERE guild_id=? AND status=?",
-                (guild_id, status)
-            )
-            stats[status] = (await c.fetchone())[0]
+ORDER_STATUSES = ["pending", "processing", "delivered", "cancelled", "refunded"]
 
-        c = await db.execute("SELECT COUNT(*) FROM orders WHERE guild_id=?", (guild_id,))
-        stats["total"] = (await c.fetchone())[0]
 
+async def get_order_stats(guild_id):
+    async with _connect() as db:
+        if STAT_COUNTERS:
+            cnt = await _read_counters(db, "orders", guild_id)
+            stats = {st: int(cnt.get(f"status:{st}", 0)) for st in ORDER_STATUSES}
+            stats["total"] = int(cnt.get("total", 0))
+            stats["total_revenue"] = cnt.get("revenue", 0)
+            return stats
+
+        cols = ", ".join(f"COUNT(CASE WHEN status='{st}' THEN 1 END)" for st in ORDER_STATUSES)
         c = await db.execute(
-            "SELECT COALESCE(SUM(price), 0) FROM orders WHERE guild_id=? AND status='delivered'",
+            f"SELECT {cols}, COUNT(*), "
+            f"COALESCE(SUM(CASE WHEN status='delivered' THEN price END), 0) "
+            f"FROM orders WHERE guild_id=?",
             (guild_id,)
         )
-        stats["total_revenue"] = (await c.fetchone())[0]
-
+        r = await c.fetchone()
+        stats = dict(zip(ORDER_STATUSES, r))
+        stats["total"] = r[len(ORDER_STATUSES)]
+        stats["total_revenue"] = r[len(ORDER_STATUSES) + 1]
         return stats
 
 
 # ─── Reviews ───────────────────────────────────────────────────
 
+REVIEW_RING_SIZE = 25
+
+_RING_COLUMNS = ("id, guild_id, order_id, user_id, rating, comment, review_message_id, "
+                 "created_at, product_name, order_number")
+_RING_SELECT = ("SELECT r.id, r.guild_id, r.order_id, r.user_id, r.rating, r.comment, "
+                "r.review_message_id, r.created_at, o.product_name, o.order_number "
+                "FROM order_reviews r JOIN orders o ON r.order_id = o.id")
+
+
+async def backfill_review_aggregates(db):
+    """One-time migration: seed review_aggregates / recent_reviews from order_reviews."""
+    c = await db.execute("SELECT 1 FROM review_aggregates LIMIT 1")
+    if await c.fetchone():
+        return
+    await db.execute(
+        "INSERT INTO review_aggregates (guild_id, product_id, rating_sum, rating_count) "
+        "SELECT guild_id, 0, SUM(rating), COUNT(*) FROM order_reviews GROUP BY guild_id"
+    )
+    await db.execute(
+        "INSERT INTO review_aggregates (guild_id, product_id, rating_sum, rating_count) "
+        "SELECT r.guild_id, o.product_id, SUM(r.rating), COUNT(*) FROM order_reviews r "
+        "JOIN orders o ON r.order_id = o.id WHERE o.product_id IS NOT NULL "
+        "GROUP BY r.guild_id, o.product_id"
+    )
+    await db.execute("DELETE FROM recent_reviews")
+    await db.execute(
+        f"INSERT INTO recent_reviews ({_RING_COLUMNS}) SELECT {_RING_COLUMNS} FROM ("
+        f"SELECT x.*, ROW_NUMBER() OVER (PARTITION BY x.guild_id ORDER BY x.created_at DESC, x.id DESC) AS n "
+        f"FROM ({_RING_SELECT}) x) WHERE n <= ?",
+        (REVIEW_RING_SIZE,)
+    )
+
+
+async def _add_to_aggregates(db, guild_id, product_id, rating, count):
+    for pid in (0, product_id) if product_id else (0,):
+        await db.execute(
+            "INSERT INTO review_aggregates (guild_id, product_id, rating_sum, rating_count) VALUES (?,?,?,?) "
+            "ON CONFLICT(guild_id, product_id) DO UPDATE SET "
+            "rating_sum=rating_sum+excluded.rating_sum, rating_count=rating_count+excluded.rating_count",
+            (guild_id, pid, rating * count, count)
+        )
+
+
 async def add_review(guild_id, order_id, user_id, rating, comment="", review_message_id=None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         try:
-            await db.execute(
+            c = await db.execute(
                 "INSERT INTO order_reviews (guild_id, order_id, user_id, rating, comment, review_message_id) "
                 "VALUES (?,?,?,?,?,?)",
                 (guild_id, order_id, user_id, rating, comment, review_message_id)
             )
-            await db.commit()
-            return True
         except aiosqlite.IntegrityError:
             return False
+        review_id = c.lastrowid
+        c = await db.execute("SELECT product_id FROM orders WHERE id=?", (order_id,))
+        r = await c.fetchone()
+        await _add_to_aggregates(db, guild_id, r[0] if r else None, rating, 1)
+        await db.execute(
+            f"INSERT INTO recent_reviews ({_RING_COLUMNS}) {_RING_SELECT} WHERE r.id=?", (review_id,)
+        )
+        await db.execute(
+            "DELETE FROM recent_reviews WHERE guild_id=? AND id NOT IN ("
+            "SELECT id FROM recent_reviews WHERE guild_id=? ORDER BY created_at DESC, id DESC LIMIT ?)",
+            (guild_id, guild_id, REVIEW_RING_SIZE)
+        )
+        await db.commit()
+    _bump_catalog(guild_id)
+    return True
 
 
 async def update_review_message_id(order_id, message_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "UPDATE order_reviews SET review_message_id=? WHERE order_id=?",
             (message_id, order_id)
         )
+        await db.execute(
+            "UPDATE recent_reviews SET review_message_id=? WHERE order_id=?",
+            (message_id, order_id)
+        )
         await db.commit()
 
 
 async def delete_review(review_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
-            "SELECT review_message_id, guild_id FROM order_reviews WHERE id=?", (review_id,)
+            "SELECT r.review_message_id, r.guild_id, r.rating, o.product_id FROM order_reviews r "
+            "LEFT JOIN orders o ON r.order_id = o.id WHERE r.id=?", (review_id,)
         )
         r = await c.fetchone()
         await db.execute("DELETE FROM order_reviews WHERE id=?", (review_id,))
+        if r:
+            await _add_to_aggregates(db, r[1], r[3], r[2], -1)
+            c = await db.execute("DELETE FROM recent_reviews WHERE id=?", (review_id,))
+            if c.rowcount:
+                # Refill the ring with the next-newest review, if any
+                await db.execute(
+                    f"INSERT OR IGNORE INTO recent_reviews ({_RING_COLUMNS}) {_RING_SELECT} "
+                    f"WHERE r.guild_id=? ORDER BY r.created_at DESC, r.id DESC LIMIT ?",
+                    (r[1], REVIEW_RING_SIZE)
+                )
         await db.commit()
+        if r:
+            _bump_catalog(r[1])
         return {"message_id": r[0], "guild_id": r[1]} if r else None
 
 
 async def get_review_by_id(review_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM order_reviews WHERE id=?", (review_id,))
         r = await c.fetchone()
@@ -1501,15 +2206,16 @@ async def get_review_by_id(review_id):
 
 
 async def get_review_count(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
-            "SELECT COUNT(*) FROM order_reviews WHERE guild_id=?", (guild_id,)
+            "SELECT rating_count FROM review_aggregates WHERE guild_id=? AND product_id=0", (guild_id,)
         )
-        return (await c.fetchone())[0]
+        r = await c.fetchone()
+        return r[0] if r else 0
 
 
 async def get_last_staff_request(guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "SELECT requested_at FROM staff_requests WHERE guild_id=? AND user_id=? "
             "ORDER BY requested_at DESC LIMIT 1",
@@ -1520,40 +2226,61 @@ async def get_last_staff_request(guild_id, user_id):
 
 
 async def save_staff_request(guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
+    async def op(db):
+        c = await db.execute(
             "INSERT INTO staff_requests (guild_id, user_id) VALUES (?,?)",
             (guild_id, user_id)
         )
-        await db.commit()
+        return c.lastrowid
+    return await _write(op)
 
 
 async def get_reviews(guild_id, limit=20):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
-        c = await db.execute(
-            "SELECT r.*, o.product_name, o.order_number FROM order_reviews r "
-            "JOIN orders o ON r.order_id = o.id "
-            "WHERE r.guild_id=? ORDER BY r.created_at DESC LIMIT ?",
-            (guild_id, limit)
-        )
+        if limit <= REVIEW_RING_SIZE:
+            c = await db.execute(
+                "SELECT * FROM recent_reviews WHERE guild_id=? ORDER BY created_at DESC, id DESC LIMIT ?",
+                (guild_id, limit)
+            )
+        else:
+            c = await db.execute(
+                f"{_RING_SELECT} WHERE r.guild_id=? ORDER BY r.created_at DESC, r.id DESC LIMIT ?",
+                (guild_id, limit)
+            )
         return [dict(r) for r in await c.fetchall()]
 
 
+def _rating(row):
+    if not row or not row[1]:
+        return {"average": 0, "count": 0}
+    return {"average": round(row[0] / row[1], 1), "count": row[1]}
+
+
 async def get_average_rating(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
-            "SELECT AVG(rating), COUNT(*) FROM order_reviews WHERE guild_id=?",
+            "SELECT rating_sum, rating_count FROM review_aggregates WHERE guild_id=? AND product_id=0",
             (guild_id,)
         )
-        r = await c.fetchone()
-        return {"average": round(r[0], 1) if r[0] else 0, "count": r[1]}
+        return _rating(await c.fetchone())
+
+
+async def get_product_ratings(guild_id):
+    """{product_id: {"average", "count"}} for every reviewed product of the guild."""
+    async with _connect() as db:
+        c = await db.execute(
+            "SELECT product_id, rating_sum, rating_count FROM review_aggregates "
+            "WHERE guild_id=? AND product_id != 0",
+            (guild_id,)
+        )
+        return {r[0]: _rating(r[1:]) for r in await c.fetchall()}
 
 
 # ─── Customer Profiles ─────────────────────────────────────────
 
 async def get_customer_profile(guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute(
             "SELECT * FROM customer_profiles WHERE guild_id=? AND user_id=?",
@@ -1564,7 +2291,7 @@ async def get_customer_profile(guild_id, user_id):
 
 
 async def update_customer_profile(guild_id, user_id, price):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         existing = await get_customer_profile(guild_id, user_id)
         if existing:
             await db.execute(
@@ -1584,7 +2311,7 @@ async def update_customer_profile(guild_id, user_id, price):
 
 
 async def blacklist_customer(guild_id, user_id, reason=""):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "INSERT INTO customer_profiles (guild_id, user_id, blacklisted, blacklist_reason) "
             "VALUES (?,?,1,?) ON CONFLICT(guild_id, user_id) DO UPDATE SET "
@@ -1595,7 +2322,7 @@ async def blacklist_customer(guild_id, user_id, reason=""):
 
 
 async def unblacklist_customer(guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "UPDATE customer_profiles SET blacklisted=0, blacklist_reason=NULL "
             "WHERE guild_id=? AND user_id=?",
@@ -1608,7 +2335,7 @@ async def unblacklist_customer(guild_id, user_id):
 # ═══════════════════════════════════════════════════════════════
 
 async def get_subscription(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM subscriptions WHERE guild_id=?", (guild_id,))
         r = await c.fetchone()
@@ -1626,6 +2353,7 @@ async def get_subscription(guild_id):
                             (guild_id,)
                         )
                         await db.commit()
+                        _bump_catalog(guild_id)
                         sub["plan"] = "free"
                         sub["expires_at"] = None
                 except:
@@ -1644,7 +2372,7 @@ async def create_subscription(guild_id, plan="free", activated_by=None, days=Non
     if days:
         expires_at = (datetime.now(timezone.utc) + timedelta(days=days)).isoformat()
 
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "INSERT INTO subscriptions (guild_id, plan, activated_by, expires_at, total_paid, notes) "
             "VALUES (?,?,?,?,?,?) ON CONFLICT(guild_id) DO UPDATE SET "
@@ -1660,6 +2388,7 @@ async def create_subscription(guild_id, plan="free", activated_by=None, days=Non
             (guild_id, "activate", plan, days, amount, activated_by or 0, notes)
         )
         await db.commit()
+    _bump_catalog(guild_id)
 
 
 async def update_subscription_plan(guild_id, new_plan, performed_by, days=None, amount=0.0, notes=""):
@@ -1670,7 +2399,7 @@ async def update_subscription_plan(guild_id, new_plan, performed_by, days=None,
     if days:
         expires_at = (datetime.now(timezone.utc) + timedelta(days=days)).isoformat()
 
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         if sub:
             if expires_at:
                 await db.execute(
@@ -1696,6 +2425,7 @@ async def update_subscription_plan(guild_id, new_plan, performed_by, days=None,
             (guild_id, "change", old_plan, new_plan, days, amount, performed_by, notes)
         )
         await db.commit()
+    _bump_catalog(guild_id)
 
 
 async def extend_subscription(guild_id, days, performed_by, amount=0.0, notes=""):
@@ -1703,7 +2433,7 @@ async def extend_subscription(guild_id, days, performed_by, amount=0.0, notes=""
     if not sub:
         return False
 
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         current_expires = sub.get("expires_at")
         if current_expires:
             try:
@@ -1729,6 +2459,7 @@ async def extend_subscription(guild_id, days, performed_by, amount=0.0, notes=""
             (guild_id, "extend", sub["plan"], days, amount, performed_by, notes)
         )
         await db.commit()
+    _bump_catalog(guild_id)
     return True
 
 
@@ -1736,7 +2467,7 @@ async def revoke_subscription(guild_id, performed_by, notes=""):
     sub = await get_subscription(guild_id)
     old_plan = sub["plan"] if sub else "free"
 
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "UPDATE subscriptions SET plan='free', expires_at=NULL, "
             "updated_at=CURRENT_TIMESTAMP WHERE guild_id=?",
@@ -1748,10 +2479,11 @@ async def revoke_subscription(guild_id, performed_by, notes=""):
             (guild_id, "revoke", old_plan, "free", performed_by, notes)
         )
         await db.commit()
+    _bump_catalog(guild_id)
 
 
 async def get_all_subscriptions():
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute(
             "SELECT * FROM subscriptions ORDER BY "
@@ -1762,7 +2494,7 @@ async def get_all_subscriptions():
 
 
 async def get_active_subscriptions():
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute(
             "SELECT * FROM subscriptions WHERE plan != 'free' "
@@ -1772,7 +2504,7 @@ async def get_active_subscriptions():
 
 
 async def get_subscription_logs(guild_id=None, limit=20):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         if guild_id:
             c = await db.execute(
@@ -1788,34 +2520,48 @@ async def get_subscription_logs(guild_id=None, limit=20):
         return [dict(r) for r in await c.fetchall()]
 
 
+SUBSCRIPTION_PLANS = ["free", "basic", "premium", "business"]
+
+
 async def get_subscription_stats():
-    async with aiosqlite.connect(DB_PATH) as db:
-        stats = {}
-        for plan in ["free", "basic", "premium", "business"]:
+    now = datetime.now(timezone.utc).isoformat()
+    async with _connect() as db:
+        if STAT_COUNTERS:
+            # Expiry depends on the clock, so it can't be trigger-maintained;
+            # it rides along in the same round trip instead.
             c = await db.execute(
-                "SELECT COUNT(*) FROM subscriptions WHERE plan=?", (plan,)
+                "SELECT name, value FROM stat_counters WHERE scope='subscriptions' AND guild_id=0 "
+                "UNION ALL SELECT 'expired', COUNT(*) FROM subscriptions "
+                "WHERE plan != 'free' AND expires_at IS NOT NULL AND expires_at < ?",
+                (now,)
             )
-            stats[plan] = (await c.fetchone())[0]
-
-        c = await db.execute("SELECT COUNT(*) FROM subscriptions")
-        stats["total"] = (await c.fetchone())[0]
-
-        c = await db.execute("SELECT COALESCE(SUM(total_paid), 0) FROM subscriptions")
-        stats["total_revenue"] = (await c.fetchone())[0]
-
+            cnt = {r[0]: r[1] for r in await c.fetchall()}
+            stats = {plan: int(cnt.get(f"plan:{plan}", 0)) for plan in SUBSCRIPTION_PLANS}
+            stats["total"] = int(cnt.get("total", 0))
+            stats["total_revenue"] = cnt.get("revenue", 0)
+            stats["expired"] = int(cnt.get("expired", 0))
+            return stats
+
+        cols = ", ".join(f"COUNT(CASE WHEN plan='{plan}' THEN 1 END)" for plan in SUBSCRIPTION_PLANS)
         c = await db.execute(
-            "SELECT COUNT(*) FROM subscriptions WHERE plan != 'free' AND expires_at IS NOT NULL "
-            "AND expires_at < ?",
-            (datetime.now(timezone.utc).isoformat(),)
+            f"SELECT {cols}, COUNT(*), COALESCE(SUM(total_paid), 0), "
+            f"COUNT(CASE WHEN plan != 'free' AND expires_at IS NOT NULL AND expires_at < ? THEN 1 END) "
+            f"FROM subscriptions",
+            (now,)
         )
-        stats["expired"] = (await c.fetchone())[0]
-
+        r = await c.fetchone()
+        n = len(SUBSCRIPTION_PLANS)
+        stats = dict(zip(SUBSCRIPTION_PLANS, r))
+        stats["total"] = r[n]
+        stats["total_revenue"] = r[n + 1]
+        stats["expired"] = r[n + 2]
         return stats
 
+
 async def get_expiring_soon(days=7):
     threshold = (datetime.now(timezone.utc) + timedelta(days=days)).isoformat()
     now = datetime.now(timezone.utc).isoformat()
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute(
             "SELECT * FROM subscriptions WHERE plan != 'free' "
@@ -1824,8 +2570,22 @@ async def get_expiring_soon(days=7):
         )
         return [dict(r) for r in await c.fetchall()]
 
+
+async def get_order_eligibility(guild_id, user_id):
+    """Blacklist flag and open (pending + processing) order count in one statement."""
+    async with _connect() as db:
+        c = await db.execute(
+            "SELECT (SELECT blacklisted FROM customer_profiles WHERE guild_id=? AND user_id=?), "
+            "(SELECT COUNT(*) FROM orders WHERE guild_id=? AND user_id=? "
+            "AND status IN ('pending', 'processing'))",
+            (guild_id, user_id, guild_id, user_id)
+        )
+        r = await c.fetchone()
+        return {"blacklisted": bool(r[0]), "active_orders": r[1]}
+
+
 async def is_customer_blacklisted(guild_id, user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute(
             "SELECT blacklisted FROM customer_profiles WHERE guild_id=? AND user_id=?",
             (guild_id, user_id)
@@ -1839,13 +2599,23 @@ async def is_customer_blacklisted(guild_id, user_id):
 # ═══════════════════════════════════════════════════════════════
 
 async def get_logging_settings(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM logging_settings WHERE guild_id=?", (guild_id,))
         r = await c.fetchone()
         return dict(r) if r else None
 
 
+async def get_message_log_guilds():
+    """Guild ids with logging on, message logging on and a log channel set."""
+    async with _connect() as db:
+        c = await db.execute(
+            "SELECT guild_id FROM logging_settings "
+            "WHERE enabled=1 AND log_messages=1 AND log_channel_id IS NOT NULL"
+        )
+        return [r[0] for r in await c.fetchall()]
+
+
 async def update_logging_setting(guild_id, key, value):
     valid = [
         "enabled", "log_channel_id", "log_messages", "log_members",
@@ -1853,7 +2623,7 @@ async def update_logging_setting(guild_id, key, value):
     ]
     if key not in valid:
         return False
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             f"INSERT INTO logging_settings (guild_id, {key}) VALUES (?, ?) "
             f"ON CONFLICT(guild_id) DO UPDATE SET {key}=excluded.{key}, "
@@ -1869,7 +2639,7 @@ async def update_logging_setting(guild_id, key, value):
 # ═══════════════════════════════════════════════════════════════
 
 async def get_auto_role(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM auto_roles WHERE guild_id=?", (guild_id,))
         r = await c.fetchone()
@@ -1877,7 +2647,7 @@ async def get_auto_role(guild_id):
 
 
 async def set_auto_role(guild_id, role_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "INSERT INTO auto_roles (guild_id, role_id) VALUES (?, ?) "
             "ON CONFLICT(guild_id) DO UPDATE SET role_id=excluded.role_id, "
@@ -1888,7 +2658,7 @@ async def set_auto_role(guild_id, role_id):
 
 
 async def remove_auto_role(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute("DELETE FROM auto_roles WHERE guild_id=?", (guild_id,))
         await db.commit()
         return c.rowcount > 0
@@ -1899,7 +2669,7 @@ async def remove_auto_role(guild_id):
 # ═══════════════════════════════════════════════════════════════
 
 async def get_bot_customization(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM bot_customization WHERE guild_id=?", (guild_id,))
         r = await c.fetchone()
@@ -1910,7 +2680,7 @@ async def set_bot_customization(guild_id, key, value):
     valid = ["custom_nickname", "custom_avatar_url"]
     if key not in valid:
         return False
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             f"INSERT INTO bot_customization (guild_id, {key}) VALUES (?, ?) "
             f"ON CONFLICT(guild_id) DO UPDATE SET {key}=excluded.{key}, "
@@ -1922,7 +2692,7 @@ async def set_bot_customization(guild_id, key, value):
 
 
 async def reset_bot_customization(guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute("DELETE FROM bot_customization WHERE guild_id=?", (guild_id,))
         await db.commit()
 
@@ -1932,7 +2702,7 @@ async def reset_bot_customization(guild_id):
 # ═══════════════════════════════════════════════════════════════
 
 async def create_license_key(key, plan, duration_days, created_by, notes=""):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         try:
             await db.execute(
                 "INSERT INTO license_keys (key, plan, duration_days, created_by, notes) "
@@ -1946,7 +2716,7 @@ async def create_license_key(key, plan, duration_days, created_by, notes=""):
 
 
 async def get_license_key(key):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         c = await db.execute("SELECT * FROM license_keys WHERE key=?", (key,))
         r = await c.fetchone()
@@ -1954,7 +2724,7 @@ async def get_license_key(key):
 
 
 async def redeem_license_key(key, user_id, guild_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "UPDATE license_keys SET redeemed=1, redeemed_by=?, redeemed_guild_id=?, "
             "redeemed_at=CURRENT_TIMESTAMP WHERE key=?",
@@ -1964,7 +2734,7 @@ async def redeem_license_key(key, user_id, guild_id):
 
 
 async def get_all_license_keys(redeemed=None):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         if redeemed is not None:
             c = await db.execute(
@@ -1977,21 +2747,144 @@ async def get_all_license_keys(redeemed=None):
 
 
 async def delete_license_key(key):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _connect() as db:
         c = await db.execute("DELETE FROM license_keys WHERE key=?", (key,))
         await db.commit()
         return c.rowcount > 0
 
 
 async def get_license_key_stats():
-    async with aiosqlite.connect(DB_PATH) as db:
-        c = await db.execute("SELECT COUNT(*) FROM license_keys WHERE redeemed=0")
-        available = (await c.fetchone())[0]
-        c = await db.execute("SELECT COUNT(*) FROM license_keys WHERE redeemed=1")
-        used = (await c.fetchone())[0]
-        c = await db.execute("SELECT COUNT(*) FROM license_keys")
-        total = (await c.fetchone())[0]
-        return {"available": available, "used": used, "total": total}
+    async with _connect() as db:
+        if STAT_COUNTERS:
+            cnt = await _read_counters(db, "license_keys")
+            return {
+                "available": int(cnt.get("redeemed:0", 0)),
+                "used": int(cnt.get("redeemed:1", 0)),
+                "total": int(cnt.get("total", 0)),
+            }
+        c = await db.execute(
+            "SELECT COUNT(CASE WHEN redeemed=0 THEN 1 END), "
+            "COUNT(CASE WHEN redeemed=1 THEN 1 END), COUNT(*) FROM license_keys"
+        )
+        r = await c.fetchone()
+        return {"available": r[0], "used": r[1], "total": r[2]}
+
+
+# ═══════════════════════════════════════════════════════════════
+#  CHANGELOG FUNCTIONS
+# ═══════════════════════════════════════════════════════════════
+
+async def create_changelog(version, title, changes, notes, posted_by, targets):
+    """Store a changelog and one pending delivery per (guild_id, channel_id) target."""
+    async with _connect() as db:
+        c = await db.execute(
+            "INSERT INTO changelogs (version, title, changes, notes, posted_by) VALUES (?,?,?,?,?)",
+            (version, title, changes, notes, posted_by)
+        )
+        changelog_id = c.lastrowid
+        await db.executemany(
+            "INSERT INTO changelog_deliveries (changelog_id, guild_id, channel_id) VALUES (?,?,?)",
+            [(changelog_id, gid, cid) for gid, cid in targets]
+        )
+        await db.commit()
+        return changelog_id
+
+
+async def get_changelog(changelog_id=None):
+    """Fetch a changelog by id, or the most recent one."""
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        if changelog_id is None:
+            c = await db.execute("SELECT * FROM changelogs ORDER BY id DESC LIMIT 1")
+        else:
+            c = await db.execute("SELECT * FROM changelogs WHERE id=?", (changelog_id,))
+        r = await c.fetchone()
+        return dict(r) if r else None
+
+
+async def get_undelivered_changelog_guilds(changelog_id):
+    """Guild ids whose delivery is still pending or failed."""
+    async with _connect() as db:
+        c = await db.execute(
+            "SELECT guild_id FROM changelog_deliveries WHERE changelog_id=? AND status != 'sent'",
+            (changelog_id,)
+        )
+        return [r[0] for r in await c.fetchall()]
+
+
+async def record_changelog_deliveries(changelog_id, results):
+    """Persist a batch of (guild_id, channel_id, status, error) results."""
+    if not results:
+        return
+    async with _connect() as db:
+        await db.executemany(
+            "INSERT INTO changelog_deliveries (changelog_id, guild_id, channel_id, status, error, attempts) "
+            "VALUES (?,?,?,?,?,1) ON CONFLICT(changelog_id, guild_id) DO UPDATE SET "
+            "channel_id=excluded.channel_id, status=excluded.status, error=excluded.error, "
+            "attempts=attempts+1, updated_at=CURRENT_TIMESTAMP",
+            [(changelog_id, gid, cid, status, error) for gid, cid, status, error in results]
+        )
+        await db.commit()
+
+
+async def get_changelog_delivery_stats(changelog_id):
+    async with _connect() as db:
+        c = await db.execute(
+            "SELECT status, COUNT(*) FROM changelog_deliveries WHERE changelog_id=? GROUP BY status",
+            (changelog_id,)
+        )
+        return dict(await c.fetchall())
+
+
+# ═══════════════════════════════════════════════════════════════
+#  SERVER SETUP FUNCTIONS
+# ═══════════════════════════════════════════════════════════════
+
+async def get_setup_progress(guild_id):
+    """Completed setup steps for a guild as {step: object_id}."""
+    async with _connect() as db:
+        c = await db.execute("SELECT step, object_id FROM setup_progress WHERE guild_id=?", (guild_id,))
+        return dict(await c.fetchall())
+
+
+async def record_setup_step(guild_id, step, object_id=None):
+    async with _connect() as db:
+        await db.execute(
+            "INSERT INTO setup_progress (guild_id, step, object_id) VALUES (?,?,?) "
+            "ON CONFLICT(guild_id, step) DO UPDATE SET object_id=excluded.object_id, "
+            "completed_at=CURRENT_TIMESTAMP",
+            (guild_id, step, object_id)
+        )
+        await db.commit()
+
+
+async def clear_setup_progress(guild_id):
+    async with _connect() as db:
+        await db.execute("DELETE FROM setup_progress WHERE guild_id=?", (guild_id,))
+        await db.commit()
+
+
+# ═══════════════════════════════════════════════════════════════
+#  COMMAND SYNC FUNCTIONS
+# ═══════════════════════════════════════════════════════════════
+
+async def get_command_sync(scope):
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        c = await db.execute("SELECT * FROM command_sync WHERE scope=?", (scope,))
+        r = await c.fetchone()
+        return dict(r) if r else None
+
+
+async def set_command_sync(scope, fingerprint, duration):
+    async with _connect() as db:
+        await db.execute(
+            "INSERT INTO command_sync (scope, fingerprint, duration) VALUES (?,?,?) "
+            "ON CONFLICT(scope) DO UPDATE SET fingerprint=excluded.fingerprint, "
+            "duration=excluded.duration, synced_at=CURRENT_TIMESTAMP",
+            (scope, fingerprint, duration)
+        )
+        await db.commit()
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -2005,4 +2898,8 @@ async def check_feature(guild_id, feature_key):
     plan = await get_guild_plan(guild_id)
     limits = get_plan_limits(plan)
     allowed = bool(limits.get(feature_key, False))
-    return allowed, plan
\ No newline at end of file
+    return allowed, plan
+
+
+# Time every public function above (hubix_db_seconds). Must stay at the bottom.
+_metrics.instrument_module(globals(), _metrics.DB_SECONDS, __name__)
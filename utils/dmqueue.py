@@ -0,0 +1,131 @@
+"""
+Outbound DMs: per-user coalescing, a closed-DM negative cache and one
+concurrency budget for the whole bot.
+
+DMQueue.add(user, item) buffers `item` for that user. DM_COALESCE_WINDOW
+seconds after the first one, everything buffered for the user goes out as a
+single DM built by `render(items)`, so someone tripping AutoMod thirty times
+in a burst gets one summary instead of thirty rate-limited sends.
+
+send_dm() is the immediate path, for notices that have to land before the
+member is kicked or banned. Both skip users whose DMs were found closed in
+the last DM_CLOSED_TTL seconds, remember new ones when Discord answers
+50007, and hold one of DM_CONCURRENCY slots while the send is in flight.
+"""
+
+import asyncio
+import os
+import time
+
+import discord
+
+from utils.metrics import DMS
+
+DM_COALESCE_WINDOW = float(os.getenv("DM_COALESCE_WINDOW", "5"))
+DM_CONCURRENCY = int(os.getenv("DM_CONCURRENCY", "4"))
+DM_CLOSED_TTL = float(os.getenv("DM_CLOSED_TTL", "3600"))
+CANNOT_DM = 50007   # "Cannot send messages to this user"
+
+_slots = asyncio.Semaphore(DM_CONCURRENCY)
+_closed = {}   # user_id -> monotonic time until which no DM is attempted
+
+
+def dm_closed(user_id):
+    until = _closed.get(user_id)
+    if until is None:
+        return False
+    if until <= time.monotonic():
+        del _closed[user_id]
+        return False
+    return True
+
+
+async def send_dm(user, **kwargs):
+    """DM `user` now, within the shared budget. Returns True if it was delivered."""
+    if dm_closed(user.id):
+        DMS.inc("closed")
+        return False
+    try:
+        async with _slots:
+            await user.send(**kwargs)
+    except discord.Forbidden as e:
+        if e.code == CANNOT_DM:
+            _closed[user.id] = time.monotonic() + DM_CLOSED_TTL
+        DMS.inc("closed")
+        return False
+    except discord.HTTPException:
+        DMS.inc("failed")
+        return False
+    DMS.inc("sent")
+    return True
+
+
+class DMQueue:
+    """Buffers DM items per user and sends each user's batch as one message.
+
+    `render(items)` turns the items collected in a window into send()
+    kwargs (e.g. {"embed": ...}); the most recent user object is the one
+    messaged. Items can carry a `key` (AutoMod uses the guild id) so that
+    discard() drops one source's items without touching the others.
+    """
+
+    def __init__(self, render, window=DM_COALESCE_WINDOW):
+        self.render = render
+        self.window = window
+        self._pending: dict[int, tuple] = {}   # user_id -> (user, [(key, item)])
+        self._timers: dict[int, asyncio.Task] = {}
+
+    def add(self, user, item, key=None):
+        if dm_closed(user.id):
+            DMS.inc("closed")
+            return
+        pending = self._pending.get(user.id)
+        if pending is None:
+            self._pending[user.id] = (user, [(key, item)])
+            self._timers[user.id] = asyncio.create_task(self._later(user.id))
+        else:
+            pending[1].append((key, item))
+            self._pending[user.id] = (user, pending[1])   # message the freshest Member
+            DMS.inc("coalesced")
+
+    def discard(self, user_id, key=None):
+        """Drop what is buffered for the user under `key`, or everything if key is
+        None (a kick / ban notice supersedes that guild's warnings)."""
+        pending = self._pending.get(user_id)
+        if pending is None:
+            return
+        if key is not None:
+            kept = [(k, item) for k, item in pending[1] if k != key]
+            if kept:
+                self._pending[user_id] = (pending[0], kept)
+                return
+        del self._pending[user_id]
+        timer = self._timers.pop(user_id, None)
+        if timer:
+            timer.cancel()
+
+    async def _later(self, user_id):
+        await asyncio.sleep(self.window)
+        self._timers.pop(user_id, None)
+        await self._send(user_id)
+
+    async def _send(self, user_id):
+        pending = self._pending.pop(user_id, None)
+        if not pending:
+            return
+        user, items = pending
+        try:
+            await send_dm(user, **self.render([item for _, item in items]))
+        except Exception as e:
+            print(f"[DM] Send to {user_id} failed: {e}")
+
+    async def drain(self):
+        """Send everything that is buffered now (used on unload)."""
+        for user_id in list(self._pending):
+            timer = self._timers.pop(user_id, None)
+            if timer:
+                timer.cancel()
+            await self._send(user_id)
+
+    def __len__(self):
+        return len(self._pending)
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from collections import deque
+
+RAID_THRESHOLD = 10      # joins inside RAID_WINDOW that switch a guild to batched mode
+RAID_WINDOW = 10.0       # seconds
+RAID_COOLDOWN = 30.0     # stay batched this long after the last burst-level join
+BATCH_DELAY = 3.0        # how long a batch collects joins before it is flushed
+BATCH_MAX = 500          # flush early once a batch gets this big
+
+
+class JoinBurstDetector:
+    """Sliding-window join counter shared by every cog that reacts to joins.
+
+    Each member is counted once per window no matter how many listeners
+    report it, so the Invites and Utility cogs agree on when a guild is
+    being raided.
+    """
+
+    def __init__(self, threshold=RAID_THRESHOLD, window=RAID_WINDOW,
+                 cooldown=RAID_COOLDOWN, clock=time.monotonic):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.clock = clock
+        self._joins: dict[int, deque] = {}
+        self._seen: dict[int, set] = {}
+        self._raid_until: dict[int, float] = {}
+
+    def observe(self, guild_id: int, member_id: int) -> bool:
+        """Record a join and return True while the guild is in raid mode."""
+        now = self.clock()
+        q = self._joins.setdefault(guild_id, deque())
+        seen = self._seen.setdefault(guild_id, set())
+        while q and now - q[0][0] > self.window:
+            seen.discard(q.popleft()[1])
+        if member_id not in seen:
+            q.append((now, member_id))
+            seen.add(member_id)
+        if len(q) >= self.threshold:
+            self._raid_until[guild_id] = now + self.cooldown
+        if not q:
+            self._joins.pop(guild_id, None)
+            self._seen.pop(guild_id, None)
+        return self._raid_until.get(guild_id, 0) > now
+
+    def in_raid(self, guild_id: int) -> bool:
+        return self._raid_until.get(guild_id, 0) > self.clock()
+
+
+def join_detector(bot) -> JoinBurstDetector:
+    """Return the bot-wide detector, creating it on first use."""
+    det = getattr(bot, "join_bursts", None)
+    if det is None:
+        det = bot.join_bursts = JoinBurstDetector()
+    return det
+
+
+class JoinBatcher:
+    """Buffers members per guild and hands each batch to `flush(members)`.
+
+    A batch is flushed BATCH_DELAY seconds after its first member arrives,
+    or immediately once it reaches BATCH_MAX members.
+    """
+
+    def __init__(self, flush, delay=BATCH_DELAY, max_size=BATCH_MAX):
+        self.flush = flush
+        self.delay = delay
+        self.max_size = max_size
+        self._buffers: dict[int, list] = {}
+        self._timers: dict[int, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def add(self, member):
+        gid = member.guild.id
+        buf = self._buffers.setdefault(gid, [])
+        buf.append(member)
+        if len(buf) >= self.max_size:
+            self._spawn(self._run(gid))
+        elif gid not in self._timers:
+            self._timers[gid] = self._spawn(self._later(gid))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _later(self, gid):
+        await asyncio.sleep(self.delay)
+        self._timers.pop(gid, None)
+        await self._run(gid)
+
+    async def _run(self, gid):
+        batch = self._buffers.pop(gid, None)
+        if not batch:
+            return
+        try:
+            await self.flush(batch)
+        except Exception as e:
+            print(f"[JOINS] Batch flush failed for {gid}: {e}")
+
+    async def drain(self):
+        """Flush everything that is buffered (used on unload and by the replay harness)."""
+        for gid in list(self._buffers):
+            timer = self._timers.pop(gid, None)
+            if timer:
+                timer.cancel()
+            await self._run(gid)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,119 @@
+"""
+Event-loop lag monitor.
+
+A sampler coroutine sleeps for `interval` and records how late it woke up;
+that delay is time the loop spent running something else without yielding.
+Because the sampler itself cannot run while the loop is blocked, a watchdog
+thread watches its heartbeat and, once it is more than LOOP_LAG_THRESHOLD_MS
+stale, captures the loop thread's current Python stack — the code holding
+the loop at that moment.
+
+LOOP_DEBUG=1 additionally turns on asyncio debug mode with
+slow_callback_duration = LOOP_SLOW_CALLBACK_MS, so every callback or task
+step that runs longer (synchronous sqlite3, JSON dumps, regex over long
+messages...) is logged by asyncio with the task that ran it.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.25"))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "250"))
+LOOP_DEBUG = os.getenv("LOOP_DEBUG", "0") == "1"
+LOOP_SLOW_CALLBACK_MS = float(os.getenv("LOOP_SLOW_CALLBACK_MS", "100"))
+
+SAMPLE_WINDOW = 240   # lag samples kept (~1 minute at the default interval)
+STALLS_KEPT = 20      # most recent captured stalls
+
+
+class LoopLagMonitor:
+    def __init__(self, interval=LOOP_LAG_INTERVAL, threshold_ms=LOOP_LAG_THRESHOLD_MS,
+                 debug=LOOP_DEBUG, slow_callback_ms=LOOP_SLOW_CALLBACK_MS):
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self.debug = debug
+        self.slow_callback = slow_callback_ms / 1000
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+        self.stalls = deque(maxlen=STALLS_KEPT)
+        self.max_lag = 0.0
+        self.stall_count = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread = None
+        self._task = None
+        self._watchdog = None
+        self._stop = threading.Event()
+
+    def start(self, loop=None):
+        loop = loop or asyncio.get_running_loop()
+        if self.debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.slow_callback
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = loop.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _sample(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            self.samples.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag >= self.threshold:
+                self.stall_count += 1
+                # Watchdog already attached the stack if it caught this one live
+                if not self.stalls or self.stalls[-1]["resolved"]:
+                    self.stalls.append(self._stall(None))
+                self.stalls[-1].update(lag_ms=round(lag * 1000, 1), resolved=True)
+
+    def _watch(self):
+        # One capture per stall: re-armed once the sampler heartbeats again
+        armed = True
+        while not self._stop.wait(self.interval / 2):
+            stale = time.monotonic() - self._heartbeat - self.interval
+            if stale < self.threshold:
+                armed = True
+                continue
+            if not armed:
+                continue
+            armed = False
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = traceback.format_stack(frame) if frame is not None else None
+            stall = self._stall(stack)
+            stall["lag_ms"] = round(stale * 1000, 1)
+            self.stalls.append(stall)
+            print(f"[LOOPLAG] Event loop blocked for {stall['lag_ms']:.0f}ms+, held by:")
+            for line in (stack or ["(no frame)"])[-8:]:
+                print("[LOOPLAG] " + line.rstrip().replace("\n", "\n[LOOPLAG] "))
+
+    def _stall(self, stack):
+        return {"at": time.time(), "lag_ms": 0.0, "resolved": False,
+                "stack": [line.rstrip() for line in stack] if stack else None}
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] if ordered else 0.0
+        return {
+            "last_ms": round(self.samples[-1] * 1000, 1) if self.samples else 0.0,
+            "p99_ms": round(p99 * 1000, 1),
+            "max_ms": round(self.max_lag * 1000, 1),
+            "stalls": self.stall_count,
+            "threshold_ms": round(self.threshold * 1000, 1),
+        }
@@ -0,0 +1,117 @@
+"""
+Member cache policy and on-demand member lookups.
+
+MEMBER_CACHE picks what discord.py keeps, once, at startup:
+
+  full     every member of every guild, chunked at startup (the old default)
+  joined   members who joined since startup, plus guilds chunked on demand
+  voice    members currently in a voice channel
+  none     only the bot's own member
+
+Code that needs one member goes through get_member() (cache, then one REST
+fetch) instead of guild.get_member(). Features that need a guild's whole
+member list (the required-role check when a giveaway is drawn, seeding
+utils.memberstats for serverinfo) go through guild_members() /
+members_by_id() / member_stats(), which chunk that one guild the first
+time it is needed. Under "joined" the chunk stays cached and join / leave
+events keep it current; under "voice" and "none" it is used and dropped.
+
+discord.py only dispatches on_member_remove / on_member_update for cached
+members, so leave handling (invite counters, leave logs, member counters)
+listens to on_raw_member_remove instead. Role and nickname logs have no raw
+equivalent: under any policy but "full" they only cover cached members.
+"""
+
+import os
+import time
+
+import discord
+
+from utils.memberstats import MEMBER_STATS
+
+MEMBER_CACHE_POLICIES = ("none", "voice", "joined", "full")
+MEMBER_CACHE = os.getenv("MEMBER_CACHE", "joined").lower()
+MEMBER_COUNTS_TTL = float(os.getenv("MEMBER_COUNTS_TTL", "600"))
+MEMBER_QUERY_LIMIT = 1000   # unknown ids resolved by query before chunking the whole guild instead
+
+_online = {}   # guild_id -> (monotonic time, approximate_presence_count)
+
+
+def member_cache_flags(policy=MEMBER_CACHE):
+    if policy not in MEMBER_CACHE_POLICIES:
+        raise ValueError(f"MEMBER_CACHE must be one of {', '.join(MEMBER_CACHE_POLICIES)}, not {policy!r}")
+    if policy == "full":
+        return discord.MemberCacheFlags.all()
+    return discord.MemberCacheFlags(voice=policy == "voice", joined=policy == "joined")
+
+
+def chunk_at_startup(policy=MEMBER_CACHE):
+    return policy == "full"
+
+
+async def get_member(guild, user_id):
+    """The member from cache, else fetched; None if they are not in the guild."""
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.HTTPException:
+        return None
+
+
+async def guild_members(guild):
+    """Every member of the guild, chunking it if the cache doesn't have them all."""
+    if guild.chunked:
+        return guild.members
+    # discord.py shares one in-flight chunk request per guild between callers
+    members = await guild.chunk(cache=MEMBER_CACHE == "joined")
+    MEMBER_STATS.seed(guild.id, members)
+    return members
+
+
+async def members_by_id(guild, user_ids):
+    """{user_id: Member} for those of `user_ids` still in the guild."""
+    found, missing = {}, []
+    for user_id in user_ids:
+        member = guild.get_member(user_id)
+        if member is not None:
+            found[user_id] = member
+        else:
+            missing.append(user_id)
+    if not missing or guild.chunked:
+        return found
+
+    if len(missing) > MEMBER_QUERY_LIMIT:
+        wanted = set(missing)
+        found.update((m.id, m) for m in await guild_members(guild) if m.id in wanted)
+        return found
+    for i in range(0, len(missing), 100):
+        batch = missing[i:i + 100]
+        for m in await guild.query_members(user_ids=batch, limit=len(batch), cache=False):
+            found[m.id] = m
+    return found
+
+
+async def member_stats(guild):
+    """The guild's GuildStats, seeded on first use from the cache if it holds
+    every member, else from one chunk; kept current by events after that."""
+    stats = MEMBER_STATS.get(guild.id)
+    if stats is None:
+        members = await guild_members(guild)
+        stats = MEMBER_STATS.get(guild.id) or MEMBER_STATS.seed(guild.id, members)
+    return stats
+
+
+async def approximate_online(client, guild):
+    """Discord's own online estimate for guilds whose presences aren't counted;
+    cached for MEMBER_COUNTS_TTL."""
+    hit = _online.get(guild.id)
+    if hit and time.monotonic() - hit[0] < MEMBER_COUNTS_TTL:
+        return hit[1]
+    try:
+        online = (await client.fetch_guild(guild.id, with_counts=True)).approximate_presence_count or 0
+    except discord.HTTPException:
+        return hit[1] if hit else 0
+    _online[guild.id] = (time.monotonic(), online)
+    return online
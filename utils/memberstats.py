@@ -0,0 +1,112 @@
+"""
+Per-guild member counters for /serverinfo and /api/stats.
+
+Each guild is seeded once from a full member list (the first time it is
+chunked, or from the cache if the policy already holds every member) and
+then kept current from events: GUILD_MEMBER_ADD / REMOVE move humans and
+bots, PRESENCE_UPDATE moves online. Reads are O(1) and never touch the
+member cache, so they work under any MEMBER_CACHE policy.
+
+Presence events only arrive with the presences intent (PRESENCE_INTENT=1).
+Without it nothing is counted online here and /serverinfo shows Discord's
+approximate_presence_count instead. With it, online is the set of user ids
+last seen with a non-offline status, since a raw presence update doesn't say
+what the status was before.
+"""
+
+import os
+
+import discord
+
+PRESENCE_INTENT = os.getenv("PRESENCE_INTENT", "0") == "1"
+
+
+class GuildStats:
+    __slots__ = ("humans", "bots", "online")
+
+    def __init__(self, humans, bots, online):
+        self.humans = humans
+        self.bots = bots
+        self.online = online   # set of user ids, or None when presences aren't tracked
+
+
+class MemberStats:
+    def __init__(self, track_presences=PRESENCE_INTENT):
+        self.track_presences = track_presences
+        self.humans = 0   # running totals over every seeded guild
+        self.bots = 0
+        self.online = 0
+        self._guilds = {}   # guild_id -> GuildStats
+
+    def get(self, guild_id):
+        return self._guilds.get(guild_id)
+
+    def seed(self, guild_id, members):
+        """Replace a guild's counters with a count of `members` (a full member list)."""
+        self.forget(guild_id)
+        total = bots = 0
+        ids = set() if self.track_presences else None
+        for m in members:
+            total += 1
+            bots += m.bot
+            if ids is not None and m.status is not discord.Status.offline:
+                ids.add(m.id)
+        stats = self._guilds[guild_id] = GuildStats(total - bots, bots, ids)
+        self.humans += stats.humans
+        self.bots += stats.bots
+        if ids is not None:
+            self.online += len(ids)
+        return stats
+
+    def forget(self, guild_id):
+        stats = self._guilds.pop(guild_id, None)
+        if stats is not None:
+            self.humans -= stats.humans
+            self.bots -= stats.bots
+            if stats.online is not None:
+                self.online -= len(stats.online)
+
+    def member_join(self, guild_id, user):
+        stats = self._guilds.get(guild_id)
+        if stats is None:
+            return   # counted when the guild is seeded
+        if user.bot:
+            stats.bots += 1
+            self.bots += 1
+        else:
+            stats.humans += 1
+            self.humans += 1
+
+    def member_remove(self, guild_id, user):
+        stats = self._guilds.get(guild_id)
+        if stats is None:
+            return
+        if user.bot:
+            stats.bots -= 1
+            self.bots -= 1
+        else:
+            stats.humans -= 1
+            self.humans -= 1
+        self.presence(guild_id, user.id, discord.Status.offline)
+
+    def presence(self, guild_id, user_id, status):
+        stats = self._guilds.get(guild_id)
+        if stats is None or stats.online is None:
+            return
+        if status is discord.Status.offline:
+            if user_id in stats.online:
+                stats.online.discard(user_id)
+                self.online -= 1
+        elif user_id not in stats.online:
+            stats.online.add(user_id)
+            self.online += 1
+
+    def __len__(self):
+        return len(self._guilds)
+
+    def stats(self):
+        return {"guilds": len(self._guilds), "humans": self.humans, "bots": self.bots,
+                "online": self.online if self.track_presences else None}
+
+
+MEMBER_STATS = MemberStats()
@@ -0,0 +1,155 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Series are keyed by a tuple of label values and updated from the event loop
+thread only, so there is no locking; an observation is a dict lookup, a
+bisect and two adds (see benchmarks/metrics_overhead.py).
+"""
+
+import functools
+import inspect
+import time
+from bisect import bisect_left
+
+# Seconds. Discord handlers and SQLite calls mostly land in the low ms.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name, doc, labelnames=()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.series = {}
+
+    def inc(self, *labels, amount=1):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self.series.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name, doc, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, value, *labels):
+        s = self.series.get(labels)
+        if s is None:
+            s = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        s[0][bisect_left(self.buckets, value)] += 1
+        s[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        les = [f'le="{b}"' for b in self.buckets] + ['le="+Inf"']
+        for labels, (counts, total) in self.series.items():
+            running = 0
+            for le, count in zip(les, counts):
+                running += count
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {running}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {running}"
+
+
+class Gauge:
+    """Value read from `fn()` at scrape time."""
+
+    def __init__(self, name, doc, fn):
+        self.name = name
+        self.doc = doc
+        self.fn = fn
+
+    def render(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {self.fn()}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, doc, labelnames=()):
+        return self.register(Counter(name, doc, labelnames))
+
+    def histogram(self, name, doc, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, doc, labelnames, buckets))
+
+    def gauge(self, name, doc, fn):
+        return self.register(Gauge(name, doc, fn))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+EVENT_SECONDS = REGISTRY.histogram("hubix_event_seconds", "Time spent in event listeners.", ["handler"])
+COMMAND_SECONDS = REGISTRY.histogram("hubix_command_seconds", "Time from dispatch to completion of app commands.", ["command"])
+DB_SECONDS = REGISTRY.histogram("hubix_db_seconds", "Time spent in utils.database functions.", ["function"])
+TASK_SECONDS = REGISTRY.histogram("hubix_task_seconds", "Time spent per background loop iteration.", ["task"])
+WRITE_BATCH = REGISTRY.histogram("hubix_db_write_batch_size", "Writes committed per group-commit transaction.",
+                                 buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+WRITE_SECONDS = REGISTRY.histogram("hubix_db_write_seconds", "Time from queueing a write to its commit.")
+PANEL_RENDER_SECONDS = REGISTRY.histogram("hubix_shop_panel_render_seconds", "Time to build a shop panel embed, data loads included.")
+PANEL_EDITS = REGISTRY.counter("hubix_shop_panel_edits_total", "Shop panel refresh outcomes.", ["result"])
+DMS = REGISTRY.counter("hubix_dms_total", "Outbound DM outcomes (sent, coalesced, closed, failed).", ["result"])
+ERRORS = REGISTRY.counter("hubix_errors_total", "Exceptions raised, by metric and label.", ["metric", "name"])
+
+
+def timed(hist, name):
+    """Decorator for coroutine functions: observe each call in `hist` under `name`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                ERRORS.inc(hist.name, name)
+                raise
+            finally:
+                hist.observe(time.perf_counter() - start, name)
+        return wrapper
+    return deco
+
+
+def instrument_listener(func):
+    owner = getattr(func, "__self__", None)
+    name = f"{type(owner).__name__}.{func.__name__}" if owner is not None else func.__qualname__
+    return timed(EVENT_SECONDS, name)(func)
+
+
+def instrument_module(namespace, hist, module):
+    """Wrap every public coroutine function defined in `module` in place."""
+    for attr, fn in list(namespace.items()):
+        if (not attr.startswith("_") and inspect.iscoroutinefunction(fn)
+                and getattr(fn, "__module__", None) == module):
+            namespace[attr] = timed(hist, attr)(fn)
@@ -0,0 +1,140 @@
+"""
+Recent message content for edit / delete logging.
+
+discord.py's own message cache keeps full Message objects for every guild
+the bot is in, whether or not the guild logs messages, and on_message_delete
+/ on_message_edit only fire for messages still in it. This keeps just what
+the log embeds show (author, channel, content cut to MESSAGE_CACHE_CONTENT
+characters, attachment urls) and only for guilds whose logging settings and
+plan would actually post a message log. Each guild holds at most
+MESSAGE_CACHE_PER_GUILD messages; the least recently seen goes first.
+
+The Utility cog feeds it from on_message and reads it from the raw delete /
+edit events, which fire whether or not discord.py still has the message.
+"""
+
+import os
+from collections import OrderedDict
+
+from config import get_plan_limits
+from utils.database import get_guild_plan, get_logging_settings, get_message_log_guilds
+
+MESSAGE_CACHE_PER_GUILD = int(os.getenv("MESSAGE_CACHE_PER_GUILD", "1000"))
+MESSAGE_CACHE_CONTENT = 1024   # longest content a log embed field shows
+MESSAGE_CACHE_REFRESH_SECONDS = float(os.getenv("MESSAGE_CACHE_REFRESH_SECONDS", "300"))
+
+
+class CachedMessage:
+    __slots__ = ("id", "author_id", "channel_id", "content", "attachments", "edited_at")
+
+    def __init__(self, message_id, author_id, channel_id, content, attachments):
+        self.id = message_id
+        self.author_id = author_id
+        self.channel_id = channel_id
+        self.content = content
+        self.attachments = attachments
+        self.edited_at = None   # edited_timestamp of the last edit written into content
+
+    @classmethod
+    def of(cls, message):
+        return cls(message.id, message.author.id, message.channel.id,
+                   message.content[:MESSAGE_CACHE_CONTENT], tuple(a.url for a in message.attachments))
+
+
+async def wants_message_log(guild_id):
+    """Would _log_event post a log_messages embed for this guild right now?"""
+    settings = await get_logging_settings(guild_id)
+    if not settings or not settings.get("enabled") or not settings.get("log_messages", 1):
+        return False
+    if not settings.get("log_channel_id"):
+        return False
+    return bool(get_plan_limits(await get_guild_plan(guild_id)).get("log_messages"))
+
+
+class MessageCache:
+    def __init__(self, per_guild=MESSAGE_CACHE_PER_GUILD):
+        self.per_guild = per_guild
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._guilds = {}   # guild_id -> OrderedDict(message_id -> CachedMessage), oldest first
+
+    def enabled(self, guild_id):
+        return guild_id in self._guilds
+
+    def add(self, message):
+        messages = self._guilds.get(message.guild.id)
+        if messages is None:
+            return
+        messages[message.id] = CachedMessage.of(message)
+        if len(messages) > self.per_guild:
+            messages.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, guild_id, message_id):
+        messages = self._guilds.get(guild_id)
+        cached = messages.get(message_id) if messages is not None else None
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        messages.move_to_end(message_id)
+        return cached
+
+    def pop(self, guild_id, message_id):
+        messages = self._guilds.get(guild_id)
+        cached = messages.pop(message_id, None) if messages is not None else None
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    def pop_many(self, guild_id, message_ids):
+        """The cached messages among `message_ids`, removed (bulk deletes)."""
+        messages = self._guilds.get(guild_id)
+        if messages is None:
+            return []
+        found = [m for m in (messages.pop(i, None) for i in message_ids) if m is not None]
+        self.hits += len(found)
+        self.misses += len(message_ids) - len(found)
+        return found
+
+    def set_enabled(self, guild_id, enabled):
+        if enabled:
+            self._guilds.setdefault(guild_id, OrderedDict())
+        else:
+            self._guilds.pop(guild_id, None)
+
+    async def refresh_guild(self, guild_id):
+        """Re-check one guild after its logging settings change."""
+        self.set_enabled(guild_id, await wants_message_log(guild_id))
+
+    async def refresh(self):
+        """Re-check every guild: settings rows first, then the plan of those that qualify."""
+        wanted = set()
+        for guild_id in await get_message_log_guilds():
+            if get_plan_limits(await get_guild_plan(guild_id)).get("log_messages"):
+                wanted.add(guild_id)
+        for guild_id in list(self._guilds):
+            if guild_id not in wanted:
+                del self._guilds[guild_id]
+        for guild_id in wanted:
+            self._guilds.setdefault(guild_id, OrderedDict())
+
+    def __len__(self):
+        return sum(len(m) for m in self._guilds.values())
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "guilds": len(self._guilds),
+            "messages": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+MESSAGE_CACHE = MessageCache()
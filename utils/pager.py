@@ -0,0 +1,39 @@
+import discord
+
+
+class ResultPager(discord.ui.View):
+    """◀ / ▶ over ranked results that have no cheap total (search hits).
+
+    `fetch(offset, limit)` returns rows; one extra row is asked for so the
+    ▶ button knows whether another page exists. `render(rows, page)` builds
+    the embed for a page.
+    """
+
+    def __init__(self, fetch, render, per_page=5):
+        super().__init__(timeout=300)
+        self.fetch = fetch
+        self.render = render
+        self.per_page = per_page
+        self.page = 0
+        self.rows = []
+
+    async def load(self):
+        rows = await self.fetch(self.page * self.per_page, self.per_page + 1)
+        self.rows = rows[:self.per_page]
+        self.prev_btn.disabled = self.page <= 0
+        self.next_btn.disabled = len(rows) <= self.per_page
+
+    def build_page(self):
+        return self.render(self.rows, self.page)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def prev_btn(self, interaction, btn):
+        self.page = max(0, self.page - 1)
+        await self.load()
+        await interaction.response.edit_message(embed=self.build_page(), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_btn(self, interaction, btn):
+        self.page += 1
+        await self.load()
+        await interaction.response.edit_message(embed=self.build_page(), view=self)
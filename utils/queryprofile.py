@@ -0,0 +1,247 @@
+"""
+Opt-in statement profiler for utils.database (QUERY_PROFILE=1).
+
+Every statement run through a profiled connection is folded into a "shape"
+(literals replaced by ?, IN lists collapsed, whitespace squashed) and
+accumulates call count, total/p99/max time and rows returned or changed.
+A call's time covers execute plus its first fetch, since SQLite steps most
+of a SELECT lazily inside the fetch. Statements slower than SLOW_QUERY_MS
+are logged with their EXPLAIN QUERY PLAN, which is captured once per shape.
+"""
+
+import json
+import os
+import re
+import time
+from collections import deque
+
+import aiosqlite
+
+QUERY_PROFILE = os.getenv("QUERY_PROFILE", "0") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+QUERY_PROFILE_FILE = os.getenv("QUERY_PROFILE_FILE", "query_profile.json")
+
+SAMPLES_PER_SHAPE = 2048  # recent durations kept per shape for p99
+
+SNAPSHOT_SORTS = {   # snapshot(sort=...) -> key over (shape, stats)
+    "total": lambda i: i[1].total,
+    "p99": lambda i: i[1].p99(),
+    "calls": lambda i: i[1].calls,
+    "rows": lambda i: i[1].rows,
+    "max": lambda i: i[1].max,
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    shape = _STRING.sub("?", sql)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class ShapeStats:
+    __slots__ = ("calls", "total", "max", "rows", "slow", "samples", "plan")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow = 0
+        self.samples = deque(maxlen=SAMPLES_PER_SHAPE)
+        self.plan = None
+
+    def p99(self):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+class QueryProfiler:
+    def __init__(self, enabled=QUERY_PROFILE, slow_ms=SLOW_QUERY_MS):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.shapes = {}
+        self.started_at = time.time()
+
+    def reset(self):
+        self.shapes.clear()
+        self.started_at = time.time()
+
+    def record(self, sql, seconds, rows):
+        """Fold one call into its shape; True if it crossed the slow threshold."""
+        shape = normalize(sql)
+        s = self.shapes.get(shape)
+        if s is None:
+            s = self.shapes[shape] = ShapeStats()
+        s.calls += 1
+        s.total += seconds
+        s.rows += max(rows, 0)
+        s.samples.append(seconds)
+        if seconds > s.max:
+            s.max = seconds
+        if seconds * 1000 >= self.slow_ms:
+            s.slow += 1
+            return True
+        return False
+
+    async def log_slow(self, conn, sql, params, seconds, rows):
+        s = self.shapes[normalize(sql)]
+        if s.plan is None:
+            s.plan = await explain(conn, sql, params)
+        print(f"[SLOWQUERY] {seconds * 1000:.1f}ms rows={rows} :: {normalize(sql)[:300]}")
+        for line in s.plan:
+            print(f"[SLOWQUERY]   {line}")
+
+    def snapshot(self, sort="total", limit=50):
+        if sort not in SNAPSHOT_SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SNAPSHOT_SORTS)}, not {sort!r}")
+        items = sorted(self.shapes.items(), key=SNAPSHOT_SORTS[sort], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "slow_ms": self.slow_ms,
+            "since": self.started_at,
+            "shapes": len(self.shapes),
+            "queries": [{
+                "sql": shape,
+                "calls": s.calls,
+                "total_ms": round(s.total * 1000, 3),
+                "mean_ms": round(s.total * 1000 / s.calls, 3),
+                "p99_ms": round(s.p99() * 1000, 3),
+                "max_ms": round(s.max * 1000, 3),
+                "rows": s.rows,
+                "slow": s.slow,
+                "plan": s.plan,
+            } for shape, s in items[:limit]],
+        }
+
+    def dump(self, path=QUERY_PROFILE_FILE):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(limit=len(self.shapes)), f, indent=2)
+        print(f"[QUERYPROFILE] {len(self.shapes)} statement shapes written to {path}")
+
+
+PROFILER = QueryProfiler()
+
+
+async def explain(conn, sql, params):
+    """EXPLAIN QUERY PLAN rows for `sql` as indented strings ([] for DDL etc.)."""
+    try:
+        cursor = await conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ())
+        rows = await cursor.fetchall()
+    except Exception as e:
+        return [f"(no plan: {e})"]
+    depth = {0: 0}
+    lines = []
+    for row in rows:
+        node, parent, detail = row[0], row[1], row[-1]
+        depth[node] = depth.get(parent, 0) + 1
+        lines.append("  " * (depth[node] - 1) + str(detail))
+    return lines
+
+
+# ═══════════════════════════════════════════════════════════════
+#  PROFILED CONNECTION
+# ═══════════════════════════════════════════════════════════════
+
+class ProfiledCursor:
+    """Cursor whose first fetch completes the call's timing."""
+
+    def __init__(self, conn, cursor, sql, params, elapsed):
+        self._conn = conn
+        self._cursor = cursor
+        self._sql = sql
+        self._params = params
+        self._elapsed = elapsed
+        self._pending = True
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    async def _fetch(self, method, *args):
+        start = time.perf_counter()
+        result = await method(*args)
+        spent = time.perf_counter() - start
+        if self._pending:
+            rows = len(result) if isinstance(result, list) else int(result is not None)
+            await self._conn._finish(self, self._elapsed + spent, rows)
+        else:
+            self._conn.profiler.shapes[normalize(self._sql)].total += spent
+        return result
+
+    async def fetchone(self):
+        return await self._fetch(self._cursor.fetchone)
+
+    async def fetchall(self):
+        return await self._fetch(self._cursor.fetchall)
+
+    async def fetchmany(self, size=None):
+        return await self._fetch(self._cursor.fetchmany, *([size] if size is not None else []))
+
+
+class ProfiledConnection:
+    """Wraps an aiosqlite connection; used as `async with connect(path) as db`."""
+
+    def __init__(self, conn, profiler):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "profiler", profiler)
+        object.__setattr__(self, "_unfetched", [])
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    async def __aenter__(self):
+        await self._conn.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._unfetched:
+            await self._settle()
+        return await self._conn.__aexit__(*exc)
+
+    async def _settle(self):
+        # SELECTs whose results were never read still count as a call
+        for cursor in list(self._unfetched):
+            await self._finish(cursor, cursor._elapsed, 0)
+
+    async def _finish(self, cursor, seconds, rows):
+        cursor._pending = False
+        if cursor in self._unfetched:
+            self._unfetched.remove(cursor)
+        if self.profiler.record(cursor._sql, seconds, rows):
+            await self.profiler.log_slow(self._conn, cursor._sql, cursor._params, seconds, rows)
+
+    async def execute(self, sql, parameters=None):
+        if self._unfetched:
+            await self._settle()
+        start = time.perf_counter()
+        cursor = await self._conn.execute(sql, parameters)
+        elapsed = time.perf_counter() - start
+        wrapped = ProfiledCursor(self, cursor, sql, parameters, elapsed)
+        if cursor.description is None:
+            await self._finish(wrapped, elapsed, max(cursor.rowcount, 0))
+        else:
+            self._unfetched.append(wrapped)
+        return wrapped
+
+    async def executemany(self, sql, parameters):
+        start = time.perf_counter()
+        cursor = await self._conn.executemany(sql, parameters)
+        elapsed = time.perf_counter() - start
+        # No single parameter set to EXPLAIN with, so it is logged without a plan
+        if self.profiler.record(sql, elapsed, cursor.rowcount):
+            print(f"[SLOWQUERY] {elapsed * 1000:.1f}ms rows={cursor.rowcount} (executemany) :: {normalize(sql)[:300]}")
+        return cursor
+
+
+def connect(path, profiler=PROFILER):
+    return ProfiledConnection(aiosqlite.connect(path), profiler)
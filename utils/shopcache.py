@@ -0,0 +1,79 @@
+"""
+Per-guild cache of the shop's hot read-mostly state: plan, shop settings and
+the product catalog.
+
+Entries are keyed by utils.database.get_catalog_version(), which every write
+to settings, products, stock or the guild's subscription bumps, so a hit is
+never older than the last write made through this process. SHOP_CACHE_TTL
+bounds staleness for changes the version cannot see (a subscription that
+quietly passes its expiry, edits from another process). Concurrent misses
+for the same guild share one load, so a launch-day rush on a cold cache
+costs one set of queries instead of one per click.
+"""
+
+import asyncio
+import os
+import time
+
+from utils.database import get_catalog_version, get_guild_plan, get_products, get_shop_settings
+
+SHOP_CACHE_TTL = float(os.getenv("SHOP_CACHE_TTL", "60"))
+
+
+class ShopCache:
+    def __init__(self, ttl=SHOP_CACHE_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self._entries = {}
+        self._loading = {}
+
+    async def get(self, guild_id):
+        """{"version", "at", "plan", "settings", "products"} for the guild."""
+        version = get_catalog_version(guild_id)
+        entry = self._entries.get(guild_id)
+        if entry and entry["version"] == version and time.monotonic() - entry["at"] < self.ttl:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        pending = self._loading.get(guild_id)
+        if pending is None:
+            self.loads += 1
+            pending = asyncio.ensure_future(self._load(guild_id, version))
+            self._loading[guild_id] = pending
+            pending.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+        return await asyncio.shield(pending)
+
+    async def _load(self, guild_id, version):
+        entry = {
+            "version": version,
+            "at": time.monotonic(),
+            "plan": await get_guild_plan(guild_id),
+            "settings": await get_shop_settings(guild_id),
+            "products": await get_products(guild_id),
+        }
+        # A write that landed mid-load leaves the entry behind the version,
+        # so the next get() reloads rather than trusting it.
+        self._entries[guild_id] = entry
+        return entry
+
+    def invalidate(self, guild_id=None):
+        if guild_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(guild_id, None)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "guilds": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+SHOP_CACHE = ShopCache()
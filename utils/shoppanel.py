@@ -0,0 +1,148 @@
+"""
+Rendered shop panels and their background refresh.
+
+The panel embed a guild posts with "Send Shop Panel" is rendered once per
+catalog version (utils.database.get_catalog_version — bumped by product,
+stock, settings and review writes) from the shop cache and the rating
+aggregate. `refresh()` runs every SHOP_PANEL_REFRESH_SECONDS from the Orders
+cog: each guild whose version moved since its panel was last posted gets one
+edit of the stored panel_channel_id / panel_message_id, however many writes
+landed in between, and none if the re-rendered embed is unchanged.
+"""
+
+import os
+import time
+
+import discord
+
+from config import PRODUCT_COLOR
+from utils.database import get_average_rating, get_catalog_version, get_catalog_versions, update_shop_setting
+from utils.metrics import PANEL_EDITS, PANEL_RENDER_SECONDS
+from utils.shopcache import SHOP_CACHE
+
+SHOP_PANEL_REFRESH_SECONDS = float(os.getenv("SHOP_PANEL_REFRESH_SECONDS", "30"))
+
+DEFAULT_INFO = "Click **🛒 Order Now** to browse and purchase our products!"
+
+
+def render_shop_panel(products, settings, rating_data):
+    """Build the shop panel embed."""
+    currency = settings.get("currency", "$") if settings else "$"
+    hide_list = settings.get("hide_product_list", 0) if settings else 0
+
+    desc = ""
+    if rating_data["count"] > 0:
+        stars = "⭐" * round(rating_data["average"])
+        desc += f"**Rating:** {stars} ({rating_data['average']}/5 from {rating_data['count']} reviews)\n\n"
+
+    if hide_list:
+        # Show only info message
+        desc += settings.get("shop_info_message", DEFAULT_INFO) if settings else DEFAULT_INFO
+    else:
+        # Build product list by category
+        categories = {}
+        for p in products:
+            categories.setdefault(p.get("category", "General"), []).append(p)
+
+        for cat_name, cat_products in categories.items():
+            desc += f"**━━━ {cat_name} ━━━**\n"
+            for p in cat_products:
+                stock = "✅" if p["in_stock"] else "❌ OUT OF STOCK"
+                reseller = f" *(Reseller: {currency}{p['reseller_price']:.2f})*" if p.get("reseller_price") else ""
+                desc += (
+                    f"{p['emoji']} **{p['name']}** — `{currency}{p['price']:.2f}`{reseller}\n"
+                    f"  ⏱️ {p.get('delivery_time', '5M-2H')} | {stock}\n"
+                )
+            desc += "\n"
+
+    embed = discord.Embed(
+        title="🏪 Product Shop",
+        description=desc or "*No products added yet.*",
+        color=PRODUCT_COLOR
+    )
+
+    if not hide_list and settings and settings.get("payment_methods"):
+        pay_lines = settings["payment_methods"].strip().split("\n")
+        pay_display = "\n".join([l.strip() for l in pay_lines if l.strip()])
+        embed.add_field(
+            name="💳 Accepted Payments",
+            value=pay_display or "N/A",
+            inline=False
+        )
+
+    embed.set_footer(text="Click 'Order Now' to place an order • Hubix Shop")
+    return embed
+
+
+class ShopPanels:
+    def __init__(self):
+        self.renders = 0
+        self.render_hits = 0
+        self._rendered = {}   # guild_id -> (catalog version, embed)
+        self._seen = {}       # guild_id -> catalog version the refresher last handled
+        self._posted = {}     # guild_id -> embed dict currently on the panel message
+
+    async def render(self, guild_id):
+        version = get_catalog_version(guild_id)
+        cached = self._rendered.get(guild_id)
+        if cached and cached[0] == version:
+            self.render_hits += 1
+            return cached[1]
+
+        started = time.perf_counter()
+        shop = await SHOP_CACHE.get(guild_id)
+        rating = await get_average_rating(guild_id)
+        embed = render_shop_panel(shop["products"], shop["settings"], rating)
+        PANEL_RENDER_SECONDS.observe(time.perf_counter() - started)
+        self.renders += 1
+        self._rendered[guild_id] = (version, embed)
+        return embed
+
+    def posted(self, guild_id, embed):
+        """Record a freshly sent panel so the refresher does not edit it again."""
+        self._seen[guild_id] = get_catalog_version(guild_id)
+        self._posted[guild_id] = embed.to_dict()
+
+    async def refresh(self, get_channel):
+        """One refresher pass over guilds whose catalog changed since the last."""
+        for guild_id, version in get_catalog_versions().items():
+            if self._seen.get(guild_id, 0) == version:
+                continue
+            self._seen[guild_id] = version
+
+            settings = (await SHOP_CACHE.get(guild_id))["settings"]
+            if not settings or not settings.get("panel_message_id"):
+                continue
+            embed = await self.render(guild_id)
+            if embed.to_dict() == self._posted.get(guild_id):
+                PANEL_EDITS.inc("unchanged")
+                continue
+
+            channel = get_channel(settings["panel_channel_id"])
+            if channel is None:
+                PANEL_EDITS.inc("missing")
+                continue
+            try:
+                await channel.get_partial_message(settings["panel_message_id"]).edit(embed=embed)
+            except (discord.NotFound, discord.Forbidden):
+                # Panel deleted or no longer editable; stop refreshing it
+                PANEL_EDITS.inc("missing")
+                await update_shop_setting(guild_id, "panel_message_id", None)
+                continue
+            except discord.HTTPException as e:
+                PANEL_EDITS.inc("error")
+                self._seen.pop(guild_id, None)   # retry next pass
+                print(f"[SHOP] Panel refresh failed for guild {guild_id}: {e}")
+                continue
+            self._posted[guild_id] = embed.to_dict()
+            PANEL_EDITS.inc("edited")
+
+    def stats(self):
+        return {
+            "renders": self.renders,
+            "render_hits": self.render_hits,
+            "edits": {labels[0]: n for labels, n in PANEL_EDITS.series.items()},
+        }
+
+
+SHOP_PANELS = ShopPanels()
@@ -0,0 +1,90 @@
+import asyncio
+
+from utils.ratelimit import TokenBucket
+
+
+class TaskGraph:
+    """Runs async steps as soon as their dependencies finish.
+
+    Each step has a key, a zero-argument coroutine function and the keys it
+    depends on. Steps wrap their REST calls in `graph.limit(route)`; calls on
+    the same route share a TokenBucket (rate looked up by the part before the
+    first ':'), so independent calls overlap while each Discord bucket is
+    still paced, and steps that turn out to be no-ops cost nothing. A failed
+    step marks everything downstream of it as skipped instead of running it.
+    """
+
+    def __init__(self, route_limits=None, default_rate=5.0):
+        self.steps = {}
+        self.route_limits = route_limits or {}
+        self.default_rate = default_rate
+        self._buckets = {}
+
+    def add(self, key, fn, deps=()):
+        if key in self.steps:
+            raise ValueError(f"duplicate step {key!r}")
+        self.steps[key] = (fn, tuple(deps))
+
+    def limit(self, route):
+        if route not in self._buckets:
+            rate, burst = self.route_limits.get(route.split(":")[0], (self.default_rate, None))
+            self._buckets[route] = TokenBucket(rate, burst)
+        return self._buckets[route]
+
+    async def run(self, concurrency=8, on_step=None):
+        """Run every step; returns {key: ("done", value) | ("failed", exc) | ("skipped", dep)}.
+        `on_step(key, outcome)` is awaited after each step settles."""
+        for key, (_, deps) in self.steps.items():
+            missing = [d for d in deps if d not in self.steps]
+            if missing:
+                raise ValueError(f"step {key!r} depends on unknown {missing}")
+
+        results = {}
+        waiting = {k: set(deps) for k, (_, deps) in self.steps.items()}
+        dependents = {k: [] for k in self.steps}
+        for k, deps in waiting.items():
+            for d in deps:
+                dependents[d].append(k)
+
+        sem = asyncio.Semaphore(concurrency)
+        running = set()
+
+        async def settle(key, outcome):
+            results[key] = outcome
+            if on_step:
+                await on_step(key, outcome)
+            for child in dependents[key]:
+                waiting[child].discard(key)
+
+        async def execute(key):
+            async with sem:
+                try:
+                    value = await self.steps[key][0]()
+                    outcome = ("done", value)
+                except Exception as e:
+                    outcome = ("failed", e)
+            await settle(key, outcome)
+
+        try:
+            while len(results) < len(self.steps):
+                ready = [k for k, w in waiting.items() if not w]
+                for key in ready:
+                    failed = next((d for d in self.steps[key][1] if results[d][0] != "done"), None)
+                    del waiting[key]
+                    if failed:
+                        await settle(key, ("skipped", failed))
+                    else:
+                        running.add(asyncio.create_task(execute(key)))
+                if not running:
+                    if ready:
+                        continue  # skips may have unblocked more steps
+                    if len(results) < len(self.steps):
+                        raise RuntimeError("dependency cycle in task graph")
+                    break
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+        finally:
+            for task in running:
+                task.cancel()
+        return results
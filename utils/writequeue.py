@@ -0,0 +1,118 @@
+import asyncio
+import contextvars
+import time
+
+from utils import metrics
+
+
+class WriteQueue:
+    """Group commit for SQLite writes.
+
+    `submit(op)` hands an `async op(db)` to a single writer task and waits for
+    its result. The writer collects whatever arrives within `max_delay`
+    seconds (up to `max_batch` ops), runs them in one BEGIN IMMEDIATE
+    transaction with a SAVEPOINT around each op, and commits once, so a burst
+    of small inserts costs one fsync instead of one each. An op that raises
+    is rolled back to its savepoint and only its caller sees the exception.
+    Ops must not commit themselves. Results are delivered after the commit,
+    so a caller never observes a write that could still be lost.
+    """
+
+    def __init__(self, connect, target, max_batch=256, max_delay=0.002):
+        self._connect = connect      # () -> async context manager yielding a connection
+        self._target = target        # () -> current database path; reconnects on change
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._loop = None
+        self._queue = None
+        self._task = None
+
+    async def submit(self, op):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            # Fresh context: the writer must not inherit the first caller's contextvars
+            self._task = loop.create_task(self._run(), context=contextvars.Context())
+        fut = loop.create_future()
+        self._queue.put_nowait((op, fut, time.perf_counter()))
+        return await fut
+
+    async def close(self):
+        """Finish queued writes and stop the writer."""
+        if self._task is None or self._task.done():
+            return
+        # Always wait for the marker: the writer may be holding a batch it has
+        # already taken off the queue (sleeping out max_delay or committing)
+        done = self._loop.create_future()
+        self._queue.put_nowait((None, done, time.perf_counter()))
+        await done
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        cm = db = path = None
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                await asyncio.sleep(self.max_delay)
+                while len(batch) < self.max_batch and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                if self._target() != path:
+                    if cm is not None:
+                        await cm.__aexit__(None, None, None)
+                    path = self._target()
+                    cm = self._connect()
+                    db = await cm.__aenter__()
+                await self._commit(db, batch)
+                batch = []
+        finally:
+            # Cancelled or crashed: nobody will commit these, so don't leave callers waiting
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            for _, fut, _ in batch:
+                if not fut.done():
+                    fut.set_exception(RuntimeError("write queue closed before the write was committed"))
+            if cm is not None:
+                await cm.__aexit__(None, None, None)
+
+    async def _commit(self, db, batch):
+        results = []
+        try:
+            await db.execute("BEGIN IMMEDIATE")
+            for op, fut, _ in batch:
+                if op is None or fut.done():   # close() marker / caller gave up
+                    results.append((fut, True, None))
+                    continue
+                await db.execute("SAVEPOINT op")
+                try:
+                    value = await op(db)
+                    await db.execute("RELEASE op")
+                    results.append((fut, True, value))
+                except Exception as e:
+                    await db.execute("ROLLBACK TO op")
+                    await db.execute("RELEASE op")
+                    results.append((fut, False, e))
+            await db.commit()
+        except Exception as e:
+            try:
+                await db.rollback()
+            except Exception:
+                pass
+            results = [(fut, False, e) for _, fut, _ in batch]
+
+        now = time.perf_counter()
+        metrics.WRITE_BATCH.observe(len(batch))
+        for (_, _, queued), (fut, ok, value) in zip(batch, results):
+            metrics.WRITE_SECONDS.observe(now - queued)
+            if fut.done():
+                continue
+            if ok:
+                fut.set_result(value)
+            else:
+                metrics.ERRORS.inc(metrics.WRITE_SECONDS.name, "write")
+                fut.set_exception(value)